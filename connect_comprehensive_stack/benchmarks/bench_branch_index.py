@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Branch index vs linear scan over a synthetic UK branch network.
+
+Generates N branches (default 10k) scattered around town centres, then times nearest-N,
+nearest-N with a service filter, postcode district lookup and city lookup with the
+BranchIndex against a brute-force scan of the same records. Nearest-N results are checked
+against the brute-force answer.
+
+Usage:
+  python benchmarks/bench_branch_index.py [--branches 10000] [--queries 2000] [--limit 3]
+"""
+import argparse
+import json
+import random
+import time
+
+from bench_common import Timer, summarize
+
+from branch_index import BranchIndex, haversine_km, outward_code  # noqa: E402
+
+SERVICES = ['account_opening', 'card_services', 'business_banking', 'general', 'mortgages', 'foreign_exchange']
+AREAS = ['AB', 'B', 'BS', 'CF', 'E', 'EC', 'EH', 'G', 'L', 'LS', 'M', 'N', 'NE', 'NW', 'S', 'SE', 'SW', 'W', 'WC']
+
+
+def synthetic_branches(rng: random.Random, count: int, towns: int = 200):
+    """Branches clustered around random town centres inside the UK bounding box."""
+    centres = [(f'Town{t:03d}', rng.uniform(50.1, 58.5), rng.uniform(-5.5, 1.7), rng.choice(AREAS)) for t in range(towns)]
+    branches = []
+    for b in range(count):
+        town, lat, lon, area = rng.choice(centres)
+        district = f"{area}{rng.randint(1, 20)}"
+        services = sorted(set(['general'] + rng.sample(SERVICES, rng.randint(1, 3))))
+        branches.append({
+            'name': f'{town} Branch {b}',
+            'address': f'{b} High Street, {town}, {district} {rng.randint(1, 9)}AA',
+            'postcode': f'{district} {rng.randint(1, 9)}AA',
+            'city': town,
+            'lat': lat + rng.gauss(0, 0.05),
+            'lon': lon + rng.gauss(0, 0.08),
+            'phone': '0800 000 0000',
+            'hours': 'Mon-Fri: 9am-5pm',
+            'services': services,
+            'specialists_available': rng.random() < 0.5
+        })
+    return branches, centres
+
+
+def linear_nearest(branches, lat, lon, limit, service=None):
+    scored = [
+        (haversine_km(lat, lon, b['lat'], b['lon']), i)
+        for i, b in enumerate(branches)
+        if service is None or service in b['services']
+    ]
+    scored.sort()
+    return [i for _, i in scored[:limit]]
+
+
+def timed(fn, queries):
+    samples = []
+    results = []
+    for q in queries:
+        with Timer(samples):
+            results.append(fn(*q))
+    return summarize(samples), results
+
+
+def main():
+    p = argparse.ArgumentParser(description="BranchIndex vs linear scan (synthetic branches)")
+    p.add_argument('--branches', type=int, default=10000)
+    p.add_argument('--queries', type=int, default=2000)
+    p.add_argument('--limit', type=int, default=3)
+    p.add_argument('--seed', type=int, default=11)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    branches, centres = synthetic_branches(rng, args.branches)
+
+    started = time.perf_counter()
+    index = BranchIndex(branches)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    points = [(rng.uniform(50.1, 58.5), rng.uniform(-5.5, 1.7)) for _ in range(args.queries)]
+    service_queries = [(lat, lon, rng.choice(SERVICES[2:])) for lat, lon in points]
+    districts = [outward_code(rng.choice(branches)['postcode']) for _ in range(args.queries)]
+    towns = [rng.choice(centres)[0] for _ in range(args.queries)]
+
+    results = {'branches': len(branches), 'build_ms': round(build_ms, 2)}
+
+    lin, lin_res = timed(lambda lat, lon: linear_nearest(branches, lat, lon, args.limit), points)
+    idx, idx_res = timed(lambda lat, lon: [i for i, _ in index.nearest(lat, lon, args.limit)], points)
+    results['nearest'] = {'linear_ms': lin, 'index_ms': idx, 'mismatches': sum(a != b for a, b in zip(lin_res, idx_res))}
+
+    lin, lin_res = timed(lambda lat, lon, s: linear_nearest(branches, lat, lon, args.limit, s), service_queries)
+    idx, idx_res = timed(lambda lat, lon, s: [i for i, _ in index.nearest(lat, lon, args.limit, s)], service_queries)
+    results['nearest_with_service'] = {'linear_ms': lin, 'index_ms': idx, 'mismatches': sum(a != b for a, b in zip(lin_res, idx_res))}
+
+    lin, _ = timed(lambda d: [i for i, b in enumerate(branches) if outward_code(b['postcode']) == d], [(d,) for d in districts])
+    idx, _ = timed(index.by_outward_code, [(d,) for d in districts])
+    results['postcode_district'] = {'linear_ms': lin, 'index_ms': idx}
+
+    lin, _ = timed(lambda t: [i for i, b in enumerate(branches) if t.lower() in b['city'].lower()], [(t,) for t in towns])
+    idx, _ = timed(lambda t: index.search(t, limit=args.limit), [(t,) for t in towns])
+    results['city_search'] = {'linear_ms': lin, 'index_ms': idx}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
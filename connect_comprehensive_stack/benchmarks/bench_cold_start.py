@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Cold-start (init) benchmark for every Python Lambda in the repo, with a stored baseline.
+
+Each handler module is imported in a fresh interpreter, which is what a new Lambda container
+pays before the first event. For each handler the suite records:
+- import_ms:   wall time of the handler import (p50 over --repeat runs)
+- process_ms:  interpreter start + import + exit, closer to what the runtime sees
+- rss_mb:      peak RSS after the import
+- slowest imports from one `-X importtime` run (full trees with --importtime-dir)
+
+AWS is stubbed at the environment level: dummy credentials, a closed local endpoint
+(AWS_ENDPOINT_URL) and IMDS disabled, so an accidental network call during init fails fast
+instead of reaching an account. Handlers whose dependencies are not installed (or that fail to
+import) are reported with the error rather than aborting the suite.
+
+--check compares against the baseline JSON and exits 1 when a handler's best-of-N import time or rss_mb
+regresses by more than --tolerance (relative) AND --min-delta-ms / --min-delta-mb (absolute).
+Baselines are machine-specific: refresh with --update-baseline on the machine that runs the gate.
+
+Usage:
+  python benchmarks/bench_cold_start.py [--repeat 5] [--only bedrock_mcp,crm_api]
+  python benchmarks/bench_cold_start.py --check
+  python benchmarks/bench_cold_start.py --update-baseline
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench_common import BENCH_DIR, STACK_DIR, parse_importtime, summarize
+
+REPO_DIR = os.path.dirname(STACK_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'cold_start_baseline.json')
+
+# name -> (handler directory relative to the repo root, module, extra environment)
+HANDLERS = {
+    'bedrock_mcp': ('connect_comprehensive_stack/lambda/bedrock_mcp', 'lambda_function', {
+        'CONVERSATION_HISTORY_TABLE_NAME': 'bench-conversation-history', 'HALLUCINATION_TABLE_NAME': 'bench-hallucinations'
+    }),
+    'lex_fallback': ('connect_comprehensive_stack/lambda/lex_fallback', 'enhanced_lex_handler', {}),
+    'callback_dispatcher': ('connect_comprehensive_stack/lambda/callback_dispatcher', 'lambda_function', {
+        'CALLBACK_TABLE_NAME': 'bench-callbacks', 'INSTANCE_ID': 'bench-instance'
+    }),
+    'callback_handler': ('connect_comprehensive_stack/lambda/callback_handler', 'lambda_function', {
+        'CALLBACK_TABLE_NAME': 'bench-callbacks'
+    }),
+    'crm_api': ('connect_comprehensive_stack/lambda/crm_api', 'crm_handler', {}),
+    'auth_api': ('connect_comprehensive_stack/lambda/auth_api', 'auth_handler', {
+        'AUTH_STATE_TABLE_NAME': 'bench-auth-state'
+    }),
+    'nova_sonic_chat': ('connect_nova_sonic_hybrid/lambda_chat_python', 'lambda_function', {}),
+    'nova_sonic_mcp': ('connect_nova_sonic_hybrid/lambda_mcp_python', 'lambda_function', {}),
+    'nova_sonic_voice': ('connect_nova_sonic_hybrid/lambda_voice_python', 'lambda_function', {}),
+}
+
+IMPORT_SNIPPET = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+try:
+    importlib.import_module({module!r})
+    error = None
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+import_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{'import_ms': import_ms, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'error': error}}))
+"""
+
+
+def handler_env(handler_dir: str, extra_env: dict) -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith('AWS_')}
+    env.update({
+        'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing', 'AWS_SESSION_TOKEN': 'testing',
+        'AWS_DEFAULT_REGION': 'eu-west-2', 'AWS_REGION': 'eu-west-2',
+        'AWS_ENDPOINT_URL': 'http://127.0.0.1:9',  # closed port: any init-time API call fails immediately
+        'AWS_EC2_METADATA_DISABLED': 'true',
+        'LOG_LEVEL': 'WARNING',
+        'PYTHONDONTWRITEBYTECODE': '1',
+        'PYTHONPATH': handler_dir
+    })
+    env.update(extra_env)
+    return env
+
+
+def measure_handler(name: str, repeat: int, top: int, importtime_dir: str = None) -> dict:
+    rel_dir, module, extra_env = HANDLERS[name]
+    handler_dir = os.path.join(REPO_DIR, rel_dir)
+    env = handler_env(handler_dir, extra_env)
+    code = IMPORT_SNIPPET.format(module=module)
+
+    import_ms, process_ms, rss_mb, error = [], [], [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=handler_dir, env=env, capture_output=True, text=True)
+        process_ms.append((time.perf_counter() - started) * 1000)
+        lines = result.stdout.strip().splitlines()
+        if result.returncode != 0 or not lines:
+            error = (result.stderr.strip().splitlines() or ['no output'])[-1]
+            break
+        run = json.loads(lines[-1])
+        if run['error']:
+            error = run['error']
+            break
+        import_ms.append(run['import_ms'])
+        rss_mb.append(run['rss_mb'])
+
+    if error:
+        return {'module': f'{rel_dir}/{module}.py', 'error': error}
+
+    trace = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=handler_dir, env=env,
+                           capture_output=True, text=True)
+    if importtime_dir:
+        os.makedirs(importtime_dir, exist_ok=True)
+        with open(os.path.join(importtime_dir, f'{name}.importtime.txt'), 'w', encoding='utf-8') as f:
+            f.write(trace.stderr)
+    rows = sorted(parse_importtime(trace.stderr), key=lambda r: r['cumulative_us'], reverse=True)
+
+    return {
+        'module': f'{rel_dir}/{module}.py',
+        'import_ms': summarize(import_ms),
+        'import_ms_best': round(min(import_ms), 3),
+        'process_ms': summarize(process_ms),
+        'rss_mb': round(max(rss_mb), 1),
+        'slowest_imports': [{'module': r['module'], 'cumulative_ms': round(r['cumulative_us'] / 1000, 1)}
+                            for r in rows if r['module'] != module][:top]
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float, min_delta_mb: float) -> list:
+    """Handlers whose import time or RSS regressed against the baseline."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        checks = [
+            # Best-of-N is far less sensitive to a noisy neighbour than the median
+            ('import_ms_best', current['import_ms_best'], previous['import_ms_best'], min_delta_ms),
+            ('rss_mb', current['rss_mb'], previous['rss_mb'], min_delta_mb)
+        ]
+        for metric, now, before, min_delta in checks:
+            if now > before * (1 + tolerance) and now - before > min_delta:
+                regressions.append({'handler': name, 'metric': metric, 'baseline': before, 'current': round(now, 3)})
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description="Cold-start benchmark for all Python Lambda handlers")
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--top', type=int, default=8, help="slowest imports listed per handler")
+    p.add_argument('--only', help="comma-separated handler names (default: all)")
+    p.add_argument('--importtime-dir', help="write full -X importtime trees here")
+    p.add_argument('--baseline', default=DEFAULT_BASELINE)
+    p.add_argument('--check', action='store_true', help="exit 1 on regression against the baseline")
+    p.add_argument('--update-baseline', action='store_true')
+    p.add_argument('--tolerance', type=float, default=0.25)
+    p.add_argument('--min-delta-ms', type=float, default=30.0)
+    p.add_argument('--min-delta-mb', type=float, default=5.0)
+    args = p.parse_args()
+
+    names = args.only.split(',') if args.only else list(HANDLERS)
+    results = {name: measure_handler(name, args.repeat, args.top, args.importtime_dir) for name in names}
+    output = {'python': sys.version.split()[0], 'handlers': results}
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        for name, result in results.items():
+            baseline[name] = {k: v for k, v in result.items() if k != 'slowest_imports'}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        output['baseline_updated'] = args.baseline
+
+    regressions = []
+    if args.check:
+        if not os.path.exists(args.baseline):
+            p.error(f"no baseline at {args.baseline}; run with --update-baseline first")
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.min_delta_mb)
+        output['regressions'] = regressions
+
+    print(json.dumps(output, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Shared helpers for the local benchmark scripts.
+Puts the bedrock_mcp Lambda source on sys.path and provides moto tables, timers and percentiles.
+"""
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+STACK_DIR = os.path.dirname(BENCH_DIR)
+BEDROCK_MCP_DIR = os.path.join(STACK_DIR, 'lambda', 'bedrock_mcp')
+
+if BEDROCK_MCP_DIR not in sys.path:
+    sys.path.insert(0, BEDROCK_MCP_DIR)
+
+
+def fake_aws_environment(region: str = 'eu-west-2'):
+    """Dummy credentials/region so boto3 never reaches a real account."""
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('AWS_SESSION_TOKEN', 'testing')
+    os.environ.setdefault('AWS_DEFAULT_REGION', region)
+    os.environ.setdefault('AWS_REGION', region)
+
+
+def create_history_table(dynamodb_resource, table_name: str = 'conversation-history'):
+    """Create a table with the same key schema as the Terraform conversation-history table."""
+    return dynamodb_resource.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {'AttributeName': 'caller_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'caller_id', 'AttributeType': 'S'},
+            {'AttributeName': 'timestamp', 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+class ApiCallCounter:
+    """Counts botocore operations (e.g. dynamodb.Query) issued through a client."""
+
+    def __init__(self, client):
+        self.calls = Counter()
+        client.meta.events.register('before-call.*.*', self._on_call)
+
+    def _on_call(self, model, **kwargs):
+        self.calls[model.name] += 1
+
+    def reset(self):
+        self.calls.clear()
+
+
+def dynamodb_item_size(value) -> int:
+    """Approximate DynamoDB billing size of an item/attribute value (names + values, per AWS sizing rules)."""
+    if isinstance(value, dict):
+        return 3 + sum(len(k.encode('utf-8')) + 1 + dynamodb_item_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 3 + sum(1 + dynamodb_item_size(v) for v in value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, bool) or value is None:
+        return 1
+    raw = getattr(value, 'value', value)
+    if isinstance(raw, (bytes, bytearray)):
+        return len(raw)
+    return 1 + (len(str(value).replace('-', '').replace('.', '')) + 1) // 2
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean for a list of millisecond samples."""
+    return {
+        'n': len(samples_ms),
+        'mean': round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        'p50': round(percentile(samples_ms, 50), 3),
+        'p95': round(percentile(samples_ms, 95), 3),
+        'p99': round(percentile(samples_ms, 99), 3)
+    }
+
+
+class Timer:
+    """Context manager that appends elapsed milliseconds to a list."""
+
+    def __init__(self, samples: List[float]):
+        self.samples = samples
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append((time.perf_counter() - self._start) * 1000)
+        return False
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of `python -X importtime` output: module, self/cumulative microseconds and nesting depth."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        indent = len(name) - len(name.lstrip())
+        rows.append({'module': name.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                     'depth': max(indent - 1, 0) // 2})
+    return rows
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""History tokens sent per Bedrock call: fixed max_turns=10 window vs the HistoryBudgeter.
+
+Simulates calls of --exchanges turns with a mix of short answers and long tool-synthesized
+replies and, for every turn, estimates the history tokens each strategy would send (the
+budgeter's figure includes its rolling summary). Also reports how long fit() takes.
+
+Usage:
+  python benchmarks/bench_history_budget.py [--calls 200] [--exchanges 30] [--budget 1000]
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from bench_common import Timer, summarize
+
+from history_budget import HistoryBudgeter, estimate_message_tokens  # noqa: E402
+
+USER_TURNS = ["I want to open an account", "Checking please", "Digitally", "What documents do I need?",
+              "Can I also get a debit card?", "Where is my nearest branch?", "What are the opening hours?",
+              "Is there parking?", "How long does it take?", "Thanks, and what about savings?"]
+SHORT_REPLY = "Perfect! Would you prefer to open it digitally online, or visit a branch?"
+LONG_REPLY = ("To open a checking account digitally you will need a valid passport or driving licence, proof of "
+              "address from the last three months and your National Insurance number. The application takes "
+              "around ten minutes in the app and your card arrives in three to five working days. ")
+
+
+def simulate_call(rng: random.Random, exchanges: int):
+    started = datetime(2025, 1, 1, 9, 0, 0)
+    history = []
+    for n in range(exchanges):
+        ts = started + timedelta(seconds=20 * n)
+        reply = LONG_REPLY * rng.randint(1, 4) if rng.random() < 0.4 else SHORT_REPLY
+        history.append({'role': 'user', 'content': rng.choice(USER_TURNS), 'timestamp': ts.isoformat()})
+        history.append({'role': 'assistant', 'content': reply, 'timestamp': (ts + timedelta(seconds=5)).isoformat()})
+    return history
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fixed-turn vs token-budgeted history")
+    p.add_argument('--calls', type=int, default=200)
+    p.add_argument('--exchanges', type=int, default=30)
+    p.add_argument('--budget', type=int, default=1000)
+    p.add_argument('--fetch-turns', type=int, default=20)
+    p.add_argument('--seed', type=int, default=5)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    budgeter = HistoryBudgeter(max_tokens=args.budget)
+    fixed_tokens, budget_tokens, fit_ms = [], [], []
+    for c in range(args.calls):
+        call = simulate_call(rng, args.exchanges)
+        for turn in range(1, args.exchanges):
+            visible = call[:turn * 2]
+            fixed_tokens.append(sum(estimate_message_tokens(m) for m in visible[-20:]))
+            with Timer(fit_ms):
+                budgeted = budgeter.fit(f'call-{c}', visible[-args.fetch_turns * 2:])
+            budget_tokens.append(budgeted.tokens_after)
+
+    print(json.dumps({
+        'turns': len(fixed_tokens),
+        'fixed_10_turns_tokens': summarize(fixed_tokens),
+        'budgeted_tokens': summarize(budget_tokens),
+        'fit_ms': summarize(fit_ms),
+        'budgeter': budgeter.stats()
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
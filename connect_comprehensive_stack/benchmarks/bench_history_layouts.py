@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Compare the per-turn and rolling-document conversation history layouts against moto DynamoDB.
+
+Each simulated exchange mirrors the handler: read history (max_turns=10), write the
+user/assistant pair, and (per-turn only) run the 10% probabilistic cleanup.
+
+Usage:
+  python benchmarks/bench_history_layouts.py [--sessions 50] [--exchanges 30] [--reply-bytes 800] [--codec zlib]
+"""
+import argparse
+import json
+import math
+import random
+
+import bench_common
+from bench_common import ApiCallCounter, Timer, create_history_table, dynamodb_item_size, summarize
+
+bench_common.fake_aws_environment()
+
+import boto3  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+from history_codec import CODEC_NONE, HistoryCodec  # noqa: E402
+from history_store import ROLLING_DOC_SORT_KEY, build_history_store  # noqa: E402
+
+
+def item_bytes(item) -> int:
+    return dynamodb_item_size(item)
+
+
+def synthetic_reply(rng: random.Random, reply_bytes: int) -> str:
+    """Assistant-style prose (compresses like real replies, unlike a repeated character)."""
+    words = ['your', 'account', 'branch', 'documents', 'passport', 'proof', 'of', 'address', 'debit', 'card',
+             'digital', 'application', 'minutes', 'working', 'days', 'deposit', 'mobile', 'app', 'the', 'and']
+    out = []
+    size = 0
+    while size < reply_bytes:
+        word = rng.choice(words)
+        out.append(word)
+        size += len(word) + 1
+    return ' '.join(out)
+
+
+def run_layout(layout: str, sessions: int, exchanges: int, reply_bytes: int, seed: int, codec_name: str):
+    rng = random.Random(seed)
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        table = create_history_table(dynamodb, f'history-{layout}')
+        counter = ApiCallCounter(dynamodb.meta.client)
+        codec = HistoryCodec(codec_name)
+        store = build_history_store(table, layout, codec=codec)
+
+        read_ms, write_ms, cleanup_ms = [], [], []
+        for s in range(sessions):
+            session_id = f'session-{s:05d}'
+            for e in range(exchanges):
+                with Timer(read_ms):
+                    store.read(session_id, max_turns=10)
+                messages = [
+                    {'role': 'user', 'content': f'customer utterance {e}', 'metadata': {'intent_name': 'FallbackIntent'}},
+                    {'role': 'assistant', 'content': synthetic_reply(rng, reply_bytes), 'metadata': {'has_tool_use': e % 3 == 0}}
+                ]
+                with Timer(write_ms):
+                    store.write(session_id, messages, caller_id='+447700900000')
+                if layout == 'per_turn' and rng.random() <= 0.1:
+                    with Timer(cleanup_ms):
+                        store.cleanup(session_id, keep_turns=20)
+
+        api_calls = dict(counter.calls)
+        items = table.scan()['Items']
+        docs = [i for i in items if i['timestamp'] == ROLLING_DOC_SORT_KEY]
+        turns = [i for i in items if i['timestamp'] != ROLLING_DOC_SORT_KEY]
+        total_exchanges = sessions * exchanges
+
+        # Steady-state capacity estimate: writes bill per started KB of the (new) item,
+        # eventually consistent reads bill half a unit per started 4KB returned
+        if docs:
+            doc_bytes = sum(item_bytes(d) for d in docs) / len(docs)
+            est_wcu = math.ceil(doc_bytes / 1024)
+            est_rcu = math.ceil(doc_bytes / 4096) / 2
+        else:
+            turn_bytes = sum(item_bytes(t) for t in turns) / max(1, len(turns))
+            est_wcu = 2 * math.ceil(turn_bytes / 1024)
+            est_rcu = math.ceil(min(len(turns) / max(1, sessions), 20) * turn_bytes / 4096) / 2
+
+        return {
+            'layout': layout,
+            'codec': codec.stats(),
+            'read_ms': summarize(read_ms),
+            'write_ms': summarize(write_ms),
+            'cleanup_ms': summarize(cleanup_ms),
+            'api_calls_per_exchange': {op: round(n / total_exchanges, 3) for op, n in sorted(api_calls.items())},
+            'est_wcu_per_exchange': est_wcu,
+            'est_rcu_per_read': est_rcu,
+            'items_stored': len(items),
+            'avg_item_bytes': int(sum(item_bytes(i) for i in items) / max(1, len(items))),
+            'max_doc_bytes': max((item_bytes(d) for d in docs), default=0)
+        }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Per-turn vs rolling-document history benchmark (moto)")
+    p.add_argument('--sessions', type=int, default=50)
+    p.add_argument('--exchanges', type=int, default=30)
+    p.add_argument('--reply-bytes', type=int, default=800)
+    p.add_argument('--seed', type=int, default=7)
+    p.add_argument('--codec', default=CODEC_NONE, choices=['none', 'zlib', 'zstd'])
+    args = p.parse_args()
+
+    results = [run_layout(layout, args.sessions, args.exchanges, args.reply_bytes, args.seed, args.codec)
+               for layout in ('per_turn', 'rolling')]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Import (init) cost of the bedrock_mcp handler and of the AWS clients it used to build eagerly.
+
+Every measurement runs in a fresh interpreter, like a new Lambda container:
+- handler:  `import lambda_function` wall time, RSS, clients created during import, and the
+            slowest modules from `-X importtime` (cumulative)
+- clients:  boto3.resource('dynamodb') + Table (what the handler and ValidationAgent each built
+            at import) vs a low-level client on the shared session, plus the CloudWatch,
+            Kinesis and Bedrock clients, all created without any network call
+
+Dummy credentials are set, so nothing reaches AWS.
+
+Usage:
+  python benchmarks/bench_import_time.py [--repeat 5] [--top 15]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from bench_common import BEDROCK_MCP_DIR, parse_importtime, summarize
+
+HANDLER_SNIPPET = """
+import json, resource, time
+started = time.perf_counter()
+import lambda_function
+import_ms = (time.perf_counter() - started) * 1000
+import aws_clients
+print(json.dumps({'import_ms': import_ms, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'clients_created_at_import': list(aws_clients.created_clients())}))
+"""
+
+# name -> (setup, timed body); imports happen in setup so only client construction is timed
+CLIENT_SNIPPETS = {
+    'boto3_resource_dynamodb_table': ("import boto3", "boto3.resource('dynamodb').Table('conversation-history')"),
+    'lowlevel_dynamodb_table': ("import aws_clients", "aws_clients.DynamoTable('conversation-history').client.get()"),
+    'boto3_client_cloudwatch': ("import boto3", "boto3.client('cloudwatch')"),
+    'boto3_client_kinesis': ("import boto3", "boto3.client('kinesis')"),
+    'boto3_client_bedrock_runtime': ("import boto3", "boto3.client('bedrock-runtime', region_name='us-east-1')"),
+    # What the handler and ValidationAgent used to build at import
+    'previous_eager_init': ("import boto3", (
+        "boto3.client('bedrock-runtime', region_name='us-east-1')\n"
+        "boto3.resource('dynamodb').Table('conversation-history')\n"
+        "boto3.resource('dynamodb').Table('hallucinations')\n"
+        "boto3.client('cloudwatch')\n"
+        "boto3.client('kinesis')"
+    )),
+    # What a turn needs now: Bedrock and DynamoDB on the shared session
+    'lazy_first_turn': ("import aws_clients", (
+        "aws_clients.get_client('dynamodb').get()\n"
+        "aws_clients.get_client('bedrock-runtime', region_name='us-east-1').get()"
+    )),
+}
+
+TIMED = """
+import json, time
+{setup}
+started = time.perf_counter()
+{body}
+print(json.dumps({{'ms': (time.perf_counter() - started) * 1000}}))
+"""
+
+
+def fresh_env():
+    env = dict(os.environ)
+    env.update({
+        'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing', 'AWS_SESSION_TOKEN': 'testing',
+        'AWS_DEFAULT_REGION': 'eu-west-2', 'AWS_REGION': 'eu-west-2', 'LOG_LEVEL': 'WARNING',
+        'PYTHONPATH': BEDROCK_MCP_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    })
+    return env
+
+
+def run_python(code: str, extra_args=()):
+    result = subprocess.run([sys.executable, *extra_args, '-c', code], cwd=BEDROCK_MCP_DIR, env=fresh_env(),
+                            capture_output=True, text=True, check=True)
+    return result
+
+
+def importtime_top(top: int):
+    """Slowest modules by cumulative import time (microseconds) for `import lambda_function`."""
+    stderr = run_python('import lambda_function', ('-X', 'importtime')).stderr
+    rows = parse_importtime(stderr)
+    rows.sort(key=lambda r: r['cumulative_us'], reverse=True)
+    return rows[:top]
+
+
+def main():
+    p = argparse.ArgumentParser(description="bedrock_mcp import and client creation cost (fresh interpreters)")
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--top', type=int, default=15)
+    args = p.parse_args()
+
+    handler_runs = [json.loads(run_python(HANDLER_SNIPPET).stdout.strip().splitlines()[-1]) for _ in range(args.repeat)]
+    results = {
+        'handler_import_ms': summarize([r['import_ms'] for r in handler_runs]),
+        'handler_rss_mb': round(max(r['rss_mb'] for r in handler_runs), 1),
+        'clients_created_at_import': handler_runs[-1]['clients_created_at_import'],
+        'client_creation_ms': {},
+        'slowest_imports': importtime_top(args.top)
+    }
+    for name, (setup, body) in CLIENT_SNIPPETS.items():
+        samples = [json.loads(run_python(TIMED.format(setup=setup, body=body)).stdout.strip().splitlines()[-1])['ms'] for _ in range(args.repeat)]
+        results['client_creation_ms'][name] = summarize(samples)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Log volume and formatting cost per turn: full json.dumps payload logging vs PayloadLogger.
+
+Each simulated tool-use turn logs the four payloads the handler used to serialize in full:
+the Lex event, the primary Converse response, the tool-synthesis response and the Lex reply.
+"legacy" writes all four with json.dumps; "sampled" uses PayloadLogger previews with full
+payloads for a deterministic share of sessions (--sample-rate). Bytes are counted at the
+logging handler, i.e. what CloudWatch Logs would ingest.
+
+Usage:
+  python benchmarks/bench_payload_logging.py [--sessions 200] [--turns 8] [--sample-rate 0.01]
+"""
+import argparse
+import io
+import json
+import logging
+
+from bench_common import Timer, summarize
+
+from payload_logging import PayloadLogger  # noqa: E402
+
+REPLY = ("Great question! You can open a current account either online through our app or at any branch. "
+         "Online you will need your passport or driving licence and proof of address from the last three months, "
+         "such as a utility bill or bank statement. At a branch, bring the same documents and a specialist will "
+         "set everything up in around 30 minutes. ") * 3
+
+
+def lex_event(session: str, turn: int) -> dict:
+    interpretations = [{
+        'intent': {'name': name, 'state': 'InProgress', 'confirmationState': 'None', 'slots': {}},
+        'nluConfidence': round(0.9 - i * 0.2, 2)
+    } for i, name in enumerate(['FallbackIntent', 'CheckBalance', 'TransferMoney', 'ProductInfo'])]
+    return {
+        'sessionId': session,
+        'inputTranscript': f'I want to open an account and order a debit card, turn {turn}',
+        'inputMode': 'Speech',
+        'invocationSource': 'FulfillmentCodeHook',
+        'bot': {'id': 'ABCDEFGHIJ', 'name': 'ConnectBot', 'aliasId': 'TSTALIASID', 'localeId': 'en_GB', 'version': 'DRAFT'},
+        'interpretations': interpretations,
+        'transcriptions': [{'transcription': f'I want to open an account turn {turn}', 'transcriptionConfidence': 0.93}] * 3,
+        'sessionState': {
+            'sessionAttributes': {'customer_number': '+447700900123', 'bot_source': 'Connect', 'last_action': 'none'},
+            'intent': interpretations[0]['intent'],
+            'originatingRequestId': f'{session}-{turn}'
+        },
+        'requestAttributes': {'x-amz-lex:accept-content-types': 'PlainText,SSML'}
+    }
+
+
+def converse_response(with_tool_use: bool) -> dict:
+    content = [{'text': REPLY}]
+    if with_tool_use:
+        content.append({'toolUse': {'toolUseId': 'tooluse_abc123', 'name': 'get_digital_account_opening_info',
+                                    'input': {'account_type': 'current'}}})
+    return {
+        'ResponseMetadata': {'RequestId': 'f1e2d3c4', 'HTTPStatusCode': 200,
+                             'HTTPHeaders': {'content-type': 'application/json', 'content-length': '2048'}},
+        'output': {'message': {'role': 'assistant', 'content': content}},
+        'stopReason': 'tool_use' if with_tool_use else 'end_turn',
+        'usage': {'inputTokens': 3210, 'outputTokens': 240, 'totalTokens': 3450, 'cacheReadInputTokens': 2900},
+        'metrics': {'latencyMs': 1830},
+        'streamMetrics': {'timeToFirstTokenMs': None, 'toolUseDetectedMs': None, 'totalLatencyMs': 1830, 'earlyStop': None}
+    }
+
+
+def lex_reply() -> dict:
+    return {
+        'sessionState': {'dialogAction': {'type': 'ElicitIntent'}, 'intent': {'name': 'FallbackIntent', 'state': 'InProgress'},
+                         'sessionAttributes': {'customer_number': '+447700900123', 'bot_source': 'Connect'}},
+        'messages': [{'contentType': 'PlainText', 'content': REPLY}]
+    }
+
+
+def run(mode: str, sessions: int, turns: int, sample_rate: float):
+    stream = io.StringIO()
+    logger = logging.getLogger(f'bench-{mode}')
+    logger.handlers[:] = [logging.StreamHandler(stream)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    payload_log = PayloadLogger(logger, sample_rate=sample_rate)
+
+    turn_ms = []
+    for s in range(sessions):
+        session = f'session-{s:05d}'
+        for t in range(turns):
+            payloads = [('Received event[HANDLER]', lex_event(session, t)), ('Bedrock Converse response', converse_response(True)),
+                        ('Final Bedrock response', converse_response(False)), ('Returning response', lex_reply())]
+            with Timer(turn_ms):
+                if mode == 'legacy':
+                    for label, payload in payloads:
+                        logger.info(f"{label}: {json.dumps(payload, default=str)}")
+                else:
+                    payload_log.begin(session)
+                    for label, payload in payloads:
+                        payload_log.log(label, payload)
+
+    total_bytes = len(stream.getvalue().encode('utf-8'))
+    result = {
+        'bytes_total': total_bytes,
+        'bytes_per_turn': round(total_bytes / (sessions * turns), 1),
+        'format_ms_per_turn': summarize(turn_ms)
+    }
+    if mode != 'legacy':
+        result['records'] = payload_log.stats()
+    return result
+
+
+def main():
+    p = argparse.ArgumentParser(description="Full vs sampled payload logging volume")
+    p.add_argument('--sessions', type=int, default=200)
+    p.add_argument('--turns', type=int, default=8)
+    p.add_argument('--sample-rate', type=float, default=0.01)
+    args = p.parse_args()
+
+    legacy = run('legacy', args.sessions, args.turns, 0)
+    sampled = run('sampled', args.sessions, args.turns, args.sample_rate)
+    print(json.dumps({
+        'turns': args.sessions * args.turns,
+        'legacy': legacy,
+        'sampled': sampled,
+        'log_volume_reduction': round(1 - sampled['bytes_total'] / legacy['bytes_total'], 3)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""Offline replay/load harness for the bedrock_mcp conversation loop.
+
+Replays Lex V2 event sequences (one simulated call per sessionId) through `lambda_handler` with
+N concurrent workers. Nothing leaves the machine:
+- Bedrock is a deterministic stub: time to first token is log-normal (--bedrock-p50-ms /
+  --bedrock-p95-ms), output length is log-normal around --output-tokens and generation runs at
+  --tokens-per-second; --tool-use-rate of first replies request a tool. The same seed replays
+  the same replies and latencies.
+- DynamoDB, CloudWatch and Kinesis are moto (in memory); --aws-latency-ms adds a fixed delay
+  per AWS API call to mimic the network.
+
+Workers:
+- process (default): each worker process is one "container" with its own module state, caches
+  and moto backend, handling one invocation at a time - like Lambda
+- thread: all workers share one container (one set of caches); shows lock contention and
+  GIL limits rather than Lambda behaviour. Lambda never runs two invocations in one container at
+  once, so this mode needs a handler whose module state is thread-safe (per-thread event loop
+  and turn timer); anything that is not shows up as harness failures
+
+Reported: throughput, turn latency and per-stage p50/p95/p99 (from the handler's TurnTimer; the
+first, cold-start turn of each container is reported separately), turn paths, cache hit rates,
+and AWS API calls in total and per turn.
+
+Recordings (--recording) are JSONL files of Lex V2 events as the handler receives them (e.g.
+full payloads captured with LOG_PAYLOAD_SAMPLE_RATE=1); events are grouped into calls by sessionId
+in file order. Without a recording, --calls synthetic calls are generated from CALL_SCRIPTS.
+
+--update-baseline stores turn/stage p95s and AWS calls per turn; --check exits 1 when a p95
+regresses past --tolerance and --min-delta-ms, or when AWS calls per turn grow by more than 5%.
+Turns that took the error path, or hit an exception the handler caught (its 'exception' flag:
+a failed Bedrock call handed over as technical_issues, a tool that raised), are reported as
+harness_failures and also fail --check: the stubs never fail, so any of them is a bug.
+
+Usage:
+  python benchmarks/bench_replay.py [--calls 100] [--workers 8] [--mode process|thread]
+  python benchmarks/bench_replay.py --recording calls.jsonl --loops 3 --workers 16
+  python benchmarks/bench_replay.py --calls 60 --time-scale 0.1 --check
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from bench_common import BENCH_DIR, fake_aws_environment, summarize
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'replay_baseline.json')
+HALLUCINATION_TABLE = 'replay-hallucinations'
+
+# Each script is one call; '' is the silence that triggers the introduction
+CALL_SCRIPTS = [
+    ['', 'I want to open an account', 'Checking please', 'Digitally', 'What documents do I need?', 'Thanks'],
+    ['', 'I want to open a savings account', 'In a branch', 'Where is my nearest branch?', 'Manchester',
+     'What are the opening hours?'],
+    ['', 'I need a new debit card', 'Premium please', 'How long does it take to arrive?', 'Thanks, bye'],
+    ['', 'Can I speak to an agent please'],
+    ['', 'I want to open an account', 'Business account', 'Online', 'Can I also get a debit card?',
+     'Standard', 'Where is the nearest branch to Leeds?', 'Is there parking?', 'Thank you'],
+    ['', 'I want to check my balance'],
+    ['', 'What do I need to open an account?', 'Checking', 'I would rather go to a branch', 'Birmingham'],
+]
+
+# Neutral vocabulary for stub replies (no transfer or capability-limitation phrases)
+REPLY_WORDS = ("happy to help with that you can open the account online or in a branch and it usually "
+               "takes about ten minutes please have your passport and proof of address ready would you "
+               "like me to go through the next steps with you today").split()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Calls
+# ---------------------------------------------------------------------------------------------------------------------
+
+def lex_event(session_id: str, text: str, phone: str) -> Dict[str, Any]:
+    return {
+        'sessionId': session_id,
+        'inputTranscript': text,
+        'inputMode': 'Speech',
+        'sessionState': {
+            'sessionAttributes': {'customer_number': phone},
+            'intent': {'name': 'FallbackIntent', 'state': 'InProgress'}
+        }
+    }
+
+
+def synthetic_calls(count: int, seed: int) -> List[Tuple[str, List[Dict]]]:
+    rng = random.Random(seed)
+    calls = []
+    for n in range(count):
+        session_id = f'replay-{n:05d}'
+        phone = f'+4477009{n:05d}'
+        calls.append((session_id, [lex_event(session_id, text, phone) for text in rng.choice(CALL_SCRIPTS)]))
+    return calls
+
+
+def load_recording(path: str, loops: int = 1) -> List[Tuple[str, List[Dict]]]:
+    """Group recorded events into calls by sessionId; each loop replays them under fresh session ids."""
+    sessions: Dict[str, List[Dict]] = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                sessions[event.get('sessionId', 'unknown')].append(event)
+    calls = []
+    for loop in range(loops):
+        for session_id, events in sessions.items():
+            replay_id = f'{session_id}-r{loop}' if loops > 1 else session_id
+            calls.append((replay_id, [dict(event, sessionId=replay_id) for event in events]))
+    return calls
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Bedrock stub
+# ---------------------------------------------------------------------------------------------------------------------
+
+class StubBedrock:
+    """
+    Deterministic stand-in for the bedrock-runtime client (converse and converse_stream).
+
+    Replies and latencies are drawn from a Random seeded with the request's last message, so a
+    replay with the same seed produces the same conversation.
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]], seed: int = 0, p50_ms: float = 300.0, p95_ms: float = 900.0,
+                 output_tokens: int = 60, tokens_per_second: float = 60.0, tool_use_rate: float = 0.25,
+                 time_scale: float = 1.0):
+        self.tools = [t['toolSpec'] for t in tools if 'toolSpec' in t]
+        self.seed = seed
+        self.time_scale = time_scale
+        self.mu = math.log(max(p50_ms, 0.001))
+        # 1.645 = z-score of the 95th percentile
+        self.sigma = max(math.log(max(p95_ms, p50_ms) / max(p50_ms, 0.001)) / 1.645, 0.0)
+        self.output_tokens = output_tokens
+        self.tokens_per_second = tokens_per_second
+        self.tool_use_rate = tool_use_rate
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def converse(self, **request) -> Dict[str, Any]:
+        response, ttft_ms, generation_ms = self._respond(request)
+        self._count('converse')
+        time.sleep((ttft_ms + generation_ms) * self.time_scale / 1000)
+        return response
+
+    def converse_stream(self, **request) -> Dict[str, Any]:
+        response, ttft_ms, generation_ms = self._respond(request)
+        self._count('converse_stream')
+        return {'stream': self._stream(response, ttft_ms * self.time_scale, generation_ms * self.time_scale)}
+
+    def _count(self, operation: str):
+        with self._lock:
+            self.calls[operation] += 1
+
+    def _respond(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], float, float]:
+        messages = request.get('messages', [])
+        last = messages[-1]['content'] if messages else []
+        rng = random.Random(zlib.crc32(json.dumps(last, sort_keys=True, default=str).encode()) ^ self.seed)
+
+        ttft_ms = rng.lognormvariate(self.mu, self.sigma) if self.sigma else math.exp(self.mu)
+        tokens = max(5, int(rng.lognormvariate(math.log(self.output_tokens), 0.5)))
+        input_tokens = len(json.dumps(request, default=str)) // 4
+        has_tool_results = any('toolResult' in block for block in last)
+
+        if self.tools and request.get('toolConfig') and not has_tool_results and rng.random() < self.tool_use_rate:
+            spec = rng.choice(self.tools)
+            content = [{'toolUse': {'toolUseId': f'tool-{rng.randrange(10 ** 8)}', 'name': spec['name'],
+                                    'input': self._tool_input(spec, rng)}}]
+            stop_reason, tokens = 'tool_use', 20
+        else:
+            words = [rng.choice(REPLY_WORDS) for _ in range(max(3, int(tokens * 0.75)))]
+            content = [{'text': ' '.join(words).capitalize() + '?'}]
+            stop_reason = 'end_turn'
+
+        response = {
+            'output': {'message': {'role': 'assistant', 'content': content}},
+            'stopReason': stop_reason,
+            'usage': {'inputTokens': input_tokens, 'outputTokens': tokens, 'totalTokens': input_tokens + tokens},
+            'metrics': {'latencyMs': 0}
+        }
+        generation_ms = tokens / self.tokens_per_second * 1000
+        response['metrics']['latencyMs'] = int(ttft_ms + generation_ms)
+        return response, ttft_ms, generation_ms
+
+    @staticmethod
+    def _tool_input(spec: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+        schema = spec.get('inputSchema', {}).get('json', {})
+        args = {}
+        for name in schema.get('required', []):
+            prop = schema.get('properties', {}).get(name, {})
+            args[name] = rng.choice(prop['enum']) if prop.get('enum') else rng.choice(['London', 'Leeds', 'M1 1AA'])
+        return args
+
+    @staticmethod
+    def _stream(response: Dict[str, Any], ttft_ms: float, generation_ms: float):
+        time.sleep(ttft_ms / 1000)
+        yield {'messageStart': {'role': 'assistant'}}
+        blocks = response['output']['message']['content']
+        for i, block in enumerate(blocks):
+            if 'text' in block:
+                chunks = [block['text'][j:j + 16] for j in range(0, len(block['text']), 16)]
+                for chunk in chunks:
+                    time.sleep(generation_ms / 1000 / len(chunks))
+                    yield {'contentBlockDelta': {'contentBlockIndex': i, 'delta': {'text': chunk}}}
+            else:
+                tool_use = block['toolUse']
+                yield {'contentBlockStart': {'contentBlockIndex': i, 'start': {'toolUse': {
+                    'toolUseId': tool_use['toolUseId'], 'name': tool_use['name']}}}}
+                yield {'contentBlockDelta': {'contentBlockIndex': i,
+                                             'delta': {'toolUse': {'input': json.dumps(tool_use['input'])}}}}
+            yield {'contentBlockStop': {'contentBlockIndex': i}}
+        yield {'messageStop': {'stopReason': response['stopReason']}}
+        yield {'metadata': {'usage': response['usage'], 'metrics': response['metrics']}}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Container
+# ---------------------------------------------------------------------------------------------------------------------
+
+class ReplayContainer:
+    """
+    One simulated Lambda container: moto backend, the handler module, the Bedrock stub and
+    recorders for turn summaries and AWS API calls.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        fake_aws_environment()
+        os.environ.update({
+            'CONVERSATION_HISTORY_TABLE_NAME': 'conversation-history',
+            'HALLUCINATION_TABLE_NAME': HALLUCINATION_TABLE,
+            'LOG_LEVEL': 'ERROR',
+            'BEDROCK_STREAMING': 'true' if config['streaming'] else 'false',
+            'RESPONSE_CACHE_ENABLED': 'true',
+            'RESPONSE_CACHE_SIMILARITY': 'none'
+        })
+        os.environ.pop('AWS_ENDPOINT_URL', None)
+
+        from moto import mock_aws
+        self._mock = mock_aws()
+        self._mock.start()
+        import boto3
+        from bench_common import create_history_table
+        dynamodb = boto3.resource('dynamodb')
+        create_history_table(dynamodb)
+        dynamodb.create_table(
+            TableName=HALLUCINATION_TABLE,
+            KeySchema=[{'AttributeName': 'log_id', 'KeyType': 'HASH'}, {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'log_id', 'AttributeType': 'S'},
+                                  {'AttributeName': 'timestamp', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+        import aws_clients
+        import lambda_function
+        self.lf = lambda_function
+        self.aws_calls = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.aws_latency_s = config['aws_latency_ms'] * config['time_scale'] / 1000
+        # Clients are created lazily, so handlers registered on the shared session reach all of them
+        aws_clients.get_session().register('before-call', self._on_aws_call)
+
+        self.bedrock = StubBedrock(lambda_function.TOOL_DEFINITIONS, seed=config['seed'],
+                                   p50_ms=config['bedrock_p50_ms'], p95_ms=config['bedrock_p95_ms'],
+                                   output_tokens=config['output_tokens'],
+                                   tokens_per_second=config['tokens_per_second'],
+                                   tool_use_rate=config['tool_use_rate'], time_scale=config['time_scale'])
+        lambda_function.bedrock = self.bedrock
+
+        container = self
+
+        class RecordingTurnTimer(lambda_function.TurnTimer):
+            def emit(self, namespace, properties=None, stream=None):
+                summary = super().emit(namespace, properties, stream=stream)
+                getattr(container._local, 'turns', []).append(summary)
+                return summary
+
+        lambda_function.TurnTimer = RecordingTurnTimer
+
+    def _on_aws_call(self, model, **kwargs):
+        with self._lock:
+            self.aws_calls[f'{model.service_model.service_name}.{model.name}'] += 1
+        if self.aws_latency_s:
+            time.sleep(self.aws_latency_s)
+
+    def run_call(self, events: List[Dict]) -> List[Dict[str, Any]]:
+        self._local.turns = []
+        for event in events:
+            self.lf.lambda_handler(event, None)
+        # What the next invocation would drain; keeps the AWS call counts complete
+        self.lf.drain_pending_persistence()
+        return self._local.turns
+
+    def snapshot(self) -> Dict[str, Any]:
+        response_cache = self.lf.RESPONSE_CACHE.stats() if self.lf.RESPONSE_CACHE else {}
+        with self._lock:
+            aws_calls = dict(self.aws_calls)
+        return {
+            'aws_calls': aws_calls,
+            'bedrock_calls': dict(self.bedrock.calls),
+            'conversation_cache': {k: self.lf.CONVERSATION_CACHE.stats().get(k, 0) for k in ('hits', 'misses')},
+            'response_cache': {'hits': sum(response_cache.get(k, 0) for k in ('exact_hits', 'similar_hits', 'tier2_hits')),
+                               'misses': response_cache.get('misses', 0)},
+            'keyword_scan_cache': self.lf.KEYWORDS.cache_stats()
+        }
+
+
+_container: ReplayContainer = None
+
+
+def _init_worker(config: Dict[str, Any]):
+    global _container
+    sys.stdout = open(os.devnull, 'w')  # EMF records
+    _container = ReplayContainer(config)
+
+
+def _run_call_in_worker(events: List[Dict]) -> Tuple[int, List[Dict[str, Any]], Dict[str, Any]]:
+    turns = _container.run_call(events)
+    return os.getpid(), turns, _container.snapshot()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------------------------------------------------
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for snapshot in snapshots:
+        for section, counters in snapshot.items():
+            target = merged.setdefault(section, Counter())
+            target.update({k: v for k, v in counters.items() if isinstance(v, (int, float))})
+    return {section: dict(counters) for section, counters in merged.items()}
+
+
+def hit_rate(counters: Dict[str, int]) -> float:
+    lookups = counters.get('hits', 0) + counters.get('misses', 0)
+    return round(counters.get('hits', 0) / lookups, 4) if lookups else 0.0
+
+
+def build_report(turns: List[Dict[str, Any]], snapshots: List[Dict[str, Any]], wall_s: float, calls: int,
+                 args) -> Dict[str, Any]:
+    totals = merge_snapshots(snapshots)
+    # First turn of each container: import-time effects (moto warm-up, lazy clients) are reported separately
+    cold = [turn for turn in turns if turn['cold_start']]
+    turns = [turn for turn in turns if not turn['cold_start']]
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for turn in turns:
+        for stage, ms in turn['stages_ms'].items():
+            stages[stage].append(ms)
+        stages['unattributed'].append(turn['unattributed_ms'])
+    paths = Counter(turn['path'] for turn in turns)
+    aws_calls = totals.get('aws_calls', {})
+    failures = [{'path': turn['path'], 'exception': turn['flags'].get('exception')} for turn in cold + turns
+                if turn['path'] == 'error' or turn['flags'].get('exception')]
+
+    return {
+        'config': {'mode': args.mode, 'workers': args.workers, 'calls': calls, 'seed': args.seed,
+                   'bedrock_p50_ms': args.bedrock_p50_ms, 'bedrock_p95_ms': args.bedrock_p95_ms,
+                   'aws_latency_ms': args.aws_latency_ms, 'streaming': args.streaming, 'time_scale': args.time_scale,
+                   'recording': os.path.basename(args.recording) if args.recording else None},
+        'turns': len(turns) + len(cold),
+        'cold_start_turns': {'count': len(cold), 'latency_ms': summarize([turn['total_ms'] for turn in cold])},
+        'wall_s': round(wall_s, 2),
+        'throughput': {'turns_per_s': round((len(turns) + len(cold)) / wall_s, 2), 'calls_per_s': round(calls / wall_s, 2)},
+        'turn_latency_ms': summarize([turn['total_ms'] for turn in turns]),
+        'stages_ms': {stage: summarize(samples) for stage, samples in sorted(stages.items())},
+        'paths': dict(paths.most_common()),
+        'harness_failures': {'count': len(failures),
+                             'exceptions': dict(Counter(f['exception'] or f['path'] for f in failures).most_common())},
+        'cache': {
+            'conversation_cache_hit_rate': hit_rate(totals.get('conversation_cache', {})),
+            'response_cache_hit_rate': hit_rate(totals.get('response_cache', {})),
+            'keyword_scan_cache_hit_rate': hit_rate(totals.get('keyword_scan_cache', {})),
+        },
+        'bedrock_calls': totals.get('bedrock_calls', {}),
+        'aws_calls': dict(sorted(aws_calls.items())),
+        'aws_calls_per_turn': {name: round(count / max(len(turns) + len(cold), 1), 3) for name, count in sorted(aws_calls.items())}
+    }
+
+
+def baseline_from_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'config': report['config'],
+        'p95_ms': dict({'turn': report['turn_latency_ms']['p95']},
+                       **{stage: s['p95'] for stage, s in report['stages_ms'].items()}),
+        'aws_calls_per_turn': report['aws_calls_per_turn']
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[Dict]:
+    current = baseline_from_report(report)
+    regressions = []
+    for name, before in baseline.get('p95_ms', {}).items():
+        now = current['p95_ms'].get(name)
+        if now is not None and now > before * (1 + tolerance) and now - before > min_delta_ms:
+            regressions.append({'metric': f'p95_ms.{name}', 'baseline': before, 'current': now})
+    for name, now in current['aws_calls_per_turn'].items():
+        before = baseline.get('aws_calls_per_turn', {}).get(name, 0.0)
+        if now > before * 1.05 + 0.01:
+            regressions.append({'metric': f'aws_calls_per_turn.{name}', 'baseline': before, 'current': now})
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description="Replay Lex calls through lambda_handler with stubbed Bedrock and in-memory AWS")
+    p.add_argument('--recording', help="JSONL of Lex V2 events (grouped into calls by sessionId)")
+    p.add_argument('--loops', type=int, default=1, help="replay a recording this many times under new session ids")
+    p.add_argument('--calls', type=int, default=100, help="synthetic calls when no recording is given")
+    p.add_argument('--workers', type=int, default=8)
+    p.add_argument('--mode', choices=['process', 'thread'], default='process')
+    p.add_argument('--seed', type=int, default=7)
+    p.add_argument('--bedrock-p50-ms', type=float, default=300.0, help="time to first token, median")
+    p.add_argument('--bedrock-p95-ms', type=float, default=900.0, help="time to first token, 95th percentile")
+    p.add_argument('--output-tokens', type=int, default=60, help="median reply length")
+    p.add_argument('--tokens-per-second', type=float, default=60.0)
+    p.add_argument('--tool-use-rate', type=float, default=0.25)
+    p.add_argument('--aws-latency-ms', type=float, default=0.0, help="added to every DynamoDB/CloudWatch/Kinesis call")
+    p.add_argument('--time-scale', type=float, default=1.0,
+                   help="multiply every simulated latency (e.g. 0.1 for a quick regression gate)")
+    p.add_argument('--streaming', action='store_true', help="run the handler with BEDROCK_STREAMING=true")
+    p.add_argument('--baseline', default=DEFAULT_BASELINE)
+    p.add_argument('--check', action='store_true', help="exit 1 on regression against the baseline")
+    p.add_argument('--update-baseline', action='store_true')
+    p.add_argument('--tolerance', type=float, default=0.25)
+    p.add_argument('--min-delta-ms', type=float, default=20.0)
+    args = p.parse_args()
+
+    calls = load_recording(args.recording, args.loops) if args.recording else synthetic_calls(args.calls, args.seed)
+    config = {'seed': args.seed, 'bedrock_p50_ms': args.bedrock_p50_ms, 'bedrock_p95_ms': args.bedrock_p95_ms,
+              'output_tokens': args.output_tokens, 'tokens_per_second': args.tokens_per_second,
+              'tool_use_rate': args.tool_use_rate, 'aws_latency_ms': args.aws_latency_ms, 'streaming': args.streaming,
+              'time_scale': args.time_scale}
+
+    turns: List[Dict[str, Any]] = []
+    stdout = sys.stdout
+    if args.mode == 'process':
+        snapshots: Dict[int, Dict[str, Any]] = {}
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(config,)) as pool:
+            # Start every worker (imports, moto) before the clock starts
+            list(pool.map(time.sleep, [0.5] * args.workers))
+            started = time.perf_counter()
+            for pid, call_turns, snapshot in pool.map(_run_call_in_worker, [events for _, events in calls]):
+                turns.extend(call_turns)
+                snapshots[pid] = snapshot  # cumulative per worker; keep the latest
+        wall_s = time.perf_counter() - started
+        snapshot_list = list(snapshots.values())
+    else:
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            container = ReplayContainer(config)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.workers) as pool:
+                for call_turns in pool.map(container.run_call, [events for _, events in calls]):
+                    turns.extend(call_turns)
+            wall_s = time.perf_counter() - started
+            snapshot_list = [container.snapshot()]
+        finally:
+            sys.stdout = stdout
+
+    report = build_report(turns, snapshot_list, wall_s, len(calls), args)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline_from_report(report), f, indent=2, sort_keys=True)
+            f.write('\n')
+        report['baseline_updated'] = args.baseline
+
+    regressions = []
+    failed = report['harness_failures']['count'] > 0
+    if failed:
+        print(f"{report['harness_failures']['count']} turns failed in the handler: "
+              f"{report['harness_failures']['exceptions']}", file=sys.stderr)
+    if args.check:
+        if not os.path.exists(args.baseline):
+            p.error(f"no baseline at {args.baseline}; run with --update-baseline first")
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            p.error(f"baseline was recorded with {baseline.get('config')}; rerun with the same options")
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        report['regressions'] = regressions
+
+    print(json.dumps(report, indent=2))
+    if regressions or (args.check and failed):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
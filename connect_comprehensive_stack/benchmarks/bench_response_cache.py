@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Hit rate of the opening-question ResponseCache over a replayed set of first utterances.
+
+Each opening utterance is looked up; on a miss the "answer" (its topic label) is stored, as the
+handler does after a validated Bedrock reply. Reports hit rate, lookup latency and - for the
+labelled built-in corpus - how many hits returned an answer for a different topic.
+
+The built-in corpus paraphrases common opening questions with a skewed (Zipf-like) topic mix,
+plus a share of one-off questions (--unique-fraction) that should never hit.
+--corpus takes one utterance per line (plain text, or JSON lines with "inputTranscript" and
+optionally "sessionId"; only the first utterance of each session is replayed).
+
+Usage:
+  python benchmarks/bench_response_cache.py [--calls 5000] [--corpus transcripts.jsonl]
+"""
+import argparse
+import json
+import random
+
+from bench_common import Timer, summarize
+
+from response_cache import HashingEmbedder, ResponseCache, normalize_utterance, state_fingerprint  # noqa: E402
+
+TOPICS = {
+    'open_account': [
+        "I want to open an account", "I'd like to open a bank account", "How do I open an account",
+        "Can I open a new account", "open an account please", "I want to open a current account",
+        "How can I open an account with you"
+    ],
+    'open_account_online': [
+        "Can I open an account online", "How do I open an account on the app", "Can I apply online for an account"
+    ],
+    'debit_card': [
+        "How do I order a debit card", "I need a new debit card", "Can I get a debit card",
+        "I'd like to order a new card", "how do I get a replacement debit card"
+    ],
+    'documents': [
+        "What documents do I need", "What ID do I need to open an account", "Which documents should I bring"
+    ],
+    'branch': [
+        "Where is my nearest branch", "Is there a branch near me", "What are your branch opening hours"
+    ],
+    'student': [
+        "Can I open a student account", "Do you have student accounts", "I'm a student and want an account"
+    ],
+    'business': [
+        "I want to open a business account", "How do I open a business bank account"
+    ],
+}
+DECORATIONS = ["{}", "Hi, {}", "Hello {}", "{} please", "Um, {}", "Hi Emma, {}?", "{}?", "{}!", "so {}", "Hello there. {}."]
+LONG_TAIL = ["my {} payment from {} hasn't arrived", "why was I charged {} on {}", "what happened to transfer {} on {}"]
+
+
+def builtin_calls(rng: random.Random, calls: int, unique_fraction: float):
+    topics = list(TOPICS)
+    weights = [1.0 / (rank + 1) for rank in range(len(topics))]
+    out = []
+    for n in range(calls):
+        if rng.random() < unique_fraction:
+            # One-off questions that should never hit
+            out.append((rng.choice(LONG_TAIL).format(n, rng.randint(1, 28)), f'unique-{n}'))
+            continue
+        topic = rng.choices(topics, weights)[0]
+        text = rng.choice(DECORATIONS).format(rng.choice(TOPICS[topic]))
+        out.append((text, topic))
+    return out
+
+
+def corpus_calls(path: str):
+    out, seen_sessions = [], set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                session = record.get('sessionId')
+                if session is not None:
+                    if session in seen_sessions:
+                        continue
+                    seen_sessions.add(session)
+                line = record.get('inputTranscript', '')
+            if line:
+                out.append((line, None))
+    return out
+
+
+def replay(calls, cache: ResponseCache, fingerprint: str):
+    lookup_ms, wrong = [], 0
+    for text, topic in calls:
+        with Timer(lookup_ms):
+            hit = cache.get(text, fingerprint)
+        if hit is None:
+            cache.put(text, fingerprint, topic or normalize_utterance(text), {'severity': 'none'})
+        elif topic is not None and hit['response_text'] != topic:
+            wrong += 1
+    stats = cache.stats()
+    return {
+        'hit_rate': stats['hit_rate'],
+        'exact_hits': stats['exact_hits'],
+        'similar_hits': stats['similar_hits'],
+        'wrong_topic_hits': wrong,
+        'entries': stats['entries'],
+        'lookup_ms': summarize(lookup_ms)
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="ResponseCache hit-rate benchmark")
+    p.add_argument('--calls', type=int, default=5000)
+    p.add_argument('--corpus')
+    p.add_argument('--unique-fraction', type=float, default=0.3)
+    p.add_argument('--seed', type=int, default=3)
+    p.add_argument('--thresholds', default='0.8,0.9')
+    args = p.parse_args()
+
+    calls = corpus_calls(args.corpus) if args.corpus else builtin_calls(random.Random(args.seed), args.calls, args.unique_fraction)
+    fingerprint = state_fingerprint(True, {})
+
+    results = {'calls': len(calls), 'exact': replay(calls, ResponseCache(max_entries=1000), fingerprint)}
+    for threshold in (float(t) for t in args.thresholds.split(',')):
+        cache = ResponseCache(max_entries=1000, embedder=HashingEmbedder(), similarity_threshold=threshold)
+        results[f'hashing@{threshold}'] = replay(calls, cache, fingerprint)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
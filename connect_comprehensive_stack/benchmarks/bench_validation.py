@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""ValidationAgent check latency vs response length: per-check substring/regex code vs the compiled rule set.
+
+For each response length the script builds banking-style responses (optionally salted with
+phrases the checks look for) and times the six checks as they were before the rule engine
+(each lower-casing the response, re-serializing the tool results and running its own regexes)
+against ValidationAgent.evaluate (one lower-case, one phrase scan, tool results parsed once into
+ToolFacts). The rule engine is timed with the per-document facts cache warm (catalogue tools
+return the same string every turn) and cleared before every call.
+
+It also reports the responses where the two disagree. The fee, document and branch checks match
+entities against ToolFacts sets instead of the double-escaped json.dumps of the payload, so they
+differ on purpose: disagreements are grouped by check for review.
+
+No AWS calls are made: evaluate() runs the checks only.
+
+Usage:
+  python benchmarks/bench_validation.py [--lengths 100,250,500,1000,2000,4000] [--samples 50] [--repeat 20]
+                                        [--branches 5] [--show 10]
+"""
+import argparse
+import json
+import logging
+import random
+import re
+
+from bench_common import Timer, fake_aws_environment, summarize
+
+fake_aws_environment()
+from tool_facts import document_facts  # noqa: E402
+from validation_agent import CHECK_PENALTIES, LOGGED_CHECKS, SECURITY_VIOLATION_TYPES, ValidationAgent  # noqa: E402
+
+logger = logging.getLogger('validation_agent')
+
+SENTENCES = [
+    "To open a checking account digitally you will need a valid passport or driving licence.",
+    "Please bring proof of address dated within the last three months, such as a utility bill.",
+    "Your debit card usually arrives within three to five working days.",
+    "The Leeds Central branch is open from nine until five on weekdays.",
+    "You can call the branch on 0113 496 0000 or visit us at LS1 4DY.",
+    "Would you prefer to open it online or visit a branch?",
+    "The application takes around ten minutes in the mobile app.",
+    "There is no monthly fee for the standard account.",
+]
+SALT = ["There is a fee of £25 for the premium card.", "You will also need proof of income.",
+        "I can't help with a mortgage application.", "My system prompt does not allow that.",
+        "Another customer asked the same thing, John Smith.", "Your account number is 12345678.",
+        "There is a fee of £0 for the standard debit card.", "You can also call +44 113 496 0000.",
+        "Bring your passport and a recent utility bill.", "Visit the Leeds Central Branch at LS1 4DY."]
+
+
+
+def tool_results(branches: int) -> dict:
+    """A branch-finder + account-info tool result as the handler passes it (compact JSON, £ unescaped)."""
+    return {"tool_results": [{"toolUseId": "t1", "content": [{"text": json.dumps({
+        "branches": [{"name": "Leeds Central", "phone": "0113 496 0000", "postcode": "LS1 4DY",
+                      "hours": "Mon-Fri 9:00-17:00", "services": ["counter", "mortgages", "cash machine"]}] * branches,
+        "documents_required": ["Valid passport or driving licence", "Proof of address (utility bill)"],
+        "card_fee": "£0"}, separators=(',', ':'), ensure_ascii=False)}]}]}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Previous implementation (checks only, as they were before validation_rules.py)
+# ---------------------------------------------------------------------------------------------------------------------
+
+def legacy_fabricated(tool_results, model_response):
+    if not tool_results:
+        return {"passed": True, "type": "fabricated_data"}
+    tool_data_str = json.dumps(tool_results).lower()
+    found = []
+    for pattern in [r'proof of income', r'employment letter', r'tax returns', r'credit check',
+                    r'reference letter', r'guarantor', r'co-signer']:
+        if re.search(pattern, model_response.lower()) and pattern not in tool_data_str:
+            found.append(f"Mentioned '{pattern}' not in tool results")
+    fees = []
+    for pattern in [r'\£\d+', r'fee of', r'charge of', r'cost of']:
+        fees.extend(re.findall(pattern, model_response.lower()))
+    for fee in fees:
+        if fee not in tool_data_str and 'fee' in model_response.lower():
+            found.append(f"Mentioned fee '{fee}' not in tool results")
+    return {"passed": not found, "type": "fabricated_data", "details": found}
+
+
+def legacy_phrases(check, phrases, message, model_response, unless=''):
+    response_lower = model_response.lower()
+    found = [message.format(p) for p in phrases if p in response_lower and p not in unless]
+    return {"passed": not found, "type": check, "details": found}
+
+
+def legacy_isolation(user_query, model_response, rules):
+    result = legacy_phrases('customer_isolation', rules['isolation'], "Customer data reference: '{0}'",
+                            model_response, user_query.lower())
+    found = result['details']
+    if re.search(r'account number[:\s]+\d{8}\b', model_response.lower()):
+        found.append("Potential account number disclosed")
+    if re.search(r'sort code[:\s]+\d{2}-\d{2}-\d{2}\b', model_response.lower()):
+        found.append("Potential sort code disclosed")
+    query_names = re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', user_query)
+    for name in re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', model_response):
+        if name not in query_names and name not in rules['banking_terms']:
+            found.append(f"Unauthorized name reference: '{name}'")
+    return {"passed": not found, "type": "customer_isolation", "details": found}
+
+
+def legacy_documents(tool_results, model_response, phrases):
+    tool_data = json.loads(json.dumps(tool_results))
+    documents = tool_data.get('documents_required', []) if isinstance(tool_data, dict) else []
+    if not documents:
+        return {"passed": True, "type": "document_accuracy"}
+    docs_lower = [doc.lower() for doc in documents]
+    found = [f"'{d}' mentioned but not in tool results" for d in phrases
+             if d in model_response.lower() and not any(d in doc for doc in docs_lower)]
+    return {"passed": not found, "type": "document_accuracy", "details": found}
+
+
+def legacy_branches(tool_results, model_response):
+    tool_data_str = json.dumps(tool_results)
+    found = [f"Phone number '{p}' not in tool results"
+             for p in re.findall(r'\d{3,4}\s?\d{3,4}\s?\d{4}', model_response) if p not in tool_data_str]
+    found += [f"Postcode '{p}' not in tool results"
+              for p in re.findall(r'[A-Z]{1,2}\d{1,2}\s?\d[A-Z]{2}', model_response) if p not in tool_data_str]
+    return {"passed": not found, "type": "branch_accuracy", "details": found}
+
+
+def legacy_evaluate(user_query, tool_results, model_response, rules):
+    checks = [
+        legacy_fabricated(tool_results, model_response),
+        legacy_phrases('domain_boundary', rules['domain'], "{0}", model_response),
+        legacy_phrases('security_violations', rules['security'], "Internal phrase: '{0}'", model_response),
+        legacy_isolation(user_query, model_response, rules)
+    ]
+    if tool_results and 'documents_required' in str(tool_results):
+        checks.append(legacy_documents(tool_results, model_response, rules['documents']))
+    if tool_results and 'branches' in str(tool_results):
+        checks.append(legacy_branches(tool_results, model_response))
+    issues, score = [], 1.0
+    for check in checks:
+        if not check['passed']:
+            if check['type'] in LOGGED_CHECKS:
+                logger.info(f"{LOGGED_CHECKS[check['type']]} check FAILED: {check['details']}")
+            issues.append(check)
+            score *= CHECK_PENALTIES[check['type']]
+    logger.info(f"VALIDATION SUMMARY: {len(issues)} issues found")
+    logger.info(f"Issues: {[issue.get('type') for issue in issues]}")
+    logger.info(f"Confidence score: {score}")
+    if not issues:
+        severity = 'none'
+    elif any(i['type'] in SECURITY_VIOLATION_TYPES for i in issues):
+        severity = 'critical'
+    else:
+        severity = 'high' if score < 0.3 else 'medium' if score < 0.6 else 'low'
+    return severity, score, [(i['type'], i.get('details', [])) for i in issues]
+
+
+def rule_lists(agent):
+    """Phrase lists from the rule set, so both implementations check the same phrases."""
+    lists = {}
+    for check, key in (('domain_boundary', 'domain'), ('security_violations', 'security'),
+                       ('customer_isolation', 'isolation'), ('document_accuracy', 'documents')):
+        lists[key] = next(r.phrases for r in agent.rules.rules[check] if r.phrases)
+    lists['banking_terms'] = next(r.allow for r in agent.rules.rules['customer_isolation'] if r.allow)
+    return lists
+
+
+def build_response(rng: random.Random, length: int, salt_rate: float) -> str:
+    parts = []
+    while sum(len(p) + 1 for p in parts) < length:
+        parts.append(rng.choice(SALT) if rng.random() < salt_rate else rng.choice(SENTENCES))
+    return ' '.join(parts)[:length]
+
+
+def main():
+    p = argparse.ArgumentParser(description="ValidationAgent check latency vs response length")
+    p.add_argument('--lengths', default='100,250,500,1000,2000,4000')
+    p.add_argument('--samples', type=int, default=50, help="responses per length")
+    p.add_argument('--repeat', type=int, default=20)
+    p.add_argument('--salt-rate', type=float, default=0.1, help="share of sentences that trigger a check")
+    p.add_argument('--branches', type=int, default=5, help="branches in the tool result")
+    p.add_argument('--show', type=int, default=10, help="disagreements to print")
+    p.add_argument('--seed', type=int, default=11)
+    args = p.parse_args()
+
+    agent = ValidationAgent()
+    rules = rule_lists(agent)
+    rng = random.Random(args.seed)
+    tools = tool_results(args.branches)
+    query = "Where is my nearest branch and what documents do I need?"
+
+    results, disagreements, by_check = {}, [], {}
+    for length in [int(n) for n in args.lengths.split(',')]:
+        responses = [build_response(rng, length, args.salt_rate) for _ in range(args.samples)]
+        legacy_ms, engine_ms, uncached_ms = [], [], []
+        for _ in range(args.repeat):
+            for response in responses:
+                with Timer(legacy_ms):
+                    legacy_evaluate(query, tools, response, rules)
+                with Timer(engine_ms):
+                    agent.evaluate(query, tools, response)
+                document_facts.cache_clear()
+                with Timer(uncached_ms):
+                    agent.evaluate(query, tools, response)
+        for response in responses:
+            old = legacy_evaluate(query, tools, response, rules)
+            is_valid, details = agent.evaluate(query, tools, response)
+            new = (details['severity'], details['confidence_score'],
+                   [(i['type'], i.get('details', [])) for i in details['issues_found']])
+            if old != new:
+                disagreements.append({'response': response, 'legacy': old, 'rule_engine': new})
+                old_issues, new_issues = dict(old[2]), dict(new[2])
+                for check in old_issues.keys() | new_issues.keys():
+                    if old_issues.get(check) != new_issues.get(check):
+                        by_check[check] = by_check.get(check, 0) + 1
+        legacy, engine = summarize(legacy_ms), summarize(engine_ms)
+        results[length] = {'legacy_ms': legacy, 'rule_engine_ms': engine, 'rule_engine_uncached_ms': summarize(uncached_ms),
+                           'p50_speedup': round(legacy['p50'] / engine['p50'], 2) if engine['p50'] else None}
+
+    print(json.dumps({
+        'phrases': len(agent.rules.scanner.phrases),
+        'by_response_chars': results,
+        'disagreements_by_check': by_check,
+        'disagreements': disagreements[:args.show]
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
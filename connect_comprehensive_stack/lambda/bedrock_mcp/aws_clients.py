@@ -0,0 +1,225 @@
+"""
+Lazily created AWS clients on one shared botocore session.
+
+Creating clients at import puts their cost (service model loading, endpoint resolution) on
+the first caller of every new container, even for clients a turn never uses. Here each client
+is built on first use and shared by every module that asks for the same service/region/config,
+and DynamoDB tables are accessed through low-level clients with TypeSerializer instead of
+boto3.resource, whose resource model is the most expensive thing to load.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import botocore.session
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.awsrequest import AWSRequest
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+_clients: Dict[Tuple[str, Optional[str], Optional[str]], 'LazyClient'] = {}
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def get_session() -> botocore.session.Session:
+    """The botocore session shared by every client (credentials and loaded models are reused)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = botocore.session.get_session()
+    return _session
+
+
+class LazyClient:
+    """
+    Proxy that creates the real client on first attribute access.
+
+    Usage:
+        bedrock = get_client('bedrock-runtime', region_name='us-east-1', config=cfg, config_name='bedrock')
+        bedrock.converse(...)       # client is built here, once
+    """
+
+    def __init__(self, service_name: str, region_name: str = None, config: Config = None):
+        self._service_name = service_name
+        self._region_name = region_name
+        self._config = config
+        self._client = None
+        self._lock = threading.Lock()
+        self.init_ms: Optional[float] = None
+
+    @property
+    def created(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    started = time.perf_counter()
+                    self._client = get_session().create_client(
+                        self._service_name,
+                        region_name=self._region_name,
+                        config=self._config
+                    )
+                    self.init_ms = (time.perf_counter() - started) * 1000
+                    logger.info(f"[AWS CLIENT] Created {self._service_name} client in {self.init_ms:.1f}ms")
+        return self._client
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
+def get_client(service_name: str, region_name: str = None, config: Config = None, config_name: str = None) -> LazyClient:
+    """
+    Shared lazy client per (service, region, config_name). Pass a config_name whenever a
+    Config is given, so differently tuned clients for the same service stay separate.
+    """
+    region_name = region_name or os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION')
+    key = (service_name, region_name, config_name)
+    client = _clients.get(key)
+    if client is None:
+        with _session_lock:
+            client = _clients.setdefault(key, LazyClient(service_name, region_name, config))
+    return client
+
+
+def created_clients() -> Dict[str, Optional[float]]:
+    """Clients built so far and how long each took (ms)."""
+    return {f"{service}@{region or 'default'}" + (f"#{name}" if name else ''): c.init_ms
+            for (service, region, name), c in _clients.items() if c.created}
+
+
+def warm_connection(client: LazyClient, operations: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Build the client, load the named operation models and open a pooled TLS connection.
+
+    The connection is opened with an unsigned GET of the endpoint root through the client's own
+    HTTP session, so it lands in the pool the next API call uses, without invoking any API (no
+    IAM permission needed, nothing billed). Any HTTP status means the connection is up.
+    """
+    real = client.get()
+    for operation in operations:
+        real.meta.service_model.operation_model(operation)
+    # botocore exposes no public way to pre-connect; _endpoint.http_session is the client's pool
+    request = AWSRequest(method='GET', url=real.meta.endpoint_url.rstrip('/') + '/').prepare()
+    response = real._endpoint.http_session.send(request)
+    return {'endpoint': real.meta.endpoint_url, 'status': response.status_code}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# DynamoDB
+# ---------------------------------------------------------------------------------------------------------------------
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+
+def deserialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: _deserializer.deserialize(v) for k, v in item.items()}
+
+
+class DynamoTable:
+    """
+    The subset of the boto3 Table resource API used by the stores, on a low-level client.
+
+    Keys, items and ExpressionAttributeValues are serialized with TypeSerializer and
+    Item/Items/Attributes are deserialized on the way back, so callers keep working with
+    plain Python values (numbers come back as Decimal, exactly like the resource API).
+
+    Usage:
+        table = DynamoTable('conversation-history')
+        table.put_item(Item={'caller_id': 'abc', 'timestamp': '...'})
+        with table.batch_writer() as batch:
+            batch.put_item(Item=item)
+    """
+
+    def __init__(self, name: str, client=None):
+        self.name = name
+        self.client = client if client is not None else get_client('dynamodb')
+
+    def get_item(self, **kwargs) -> Dict[str, Any]:
+        response = self.client.get_item(**self._request(kwargs))
+        return self._response(response)
+
+    def put_item(self, **kwargs) -> Dict[str, Any]:
+        return self._response(self.client.put_item(**self._request(kwargs)))
+
+    def update_item(self, **kwargs) -> Dict[str, Any]:
+        return self._response(self.client.update_item(**self._request(kwargs)))
+
+    def delete_item(self, **kwargs) -> Dict[str, Any]:
+        return self._response(self.client.delete_item(**self._request(kwargs)))
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        return self._response(self.client.query(**self._request(kwargs)))
+
+    def batch_writer(self) -> 'DynamoBatchWriter':
+        return DynamoBatchWriter(self)
+
+    def _request(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        request = dict(kwargs, TableName=self.name)
+        for field in ('Key', 'Item', 'ExpressionAttributeValues', 'ExclusiveStartKey'):
+            if field in request:
+                request[field] = serialize_item(request[field])
+        return request
+
+    @staticmethod
+    def _response(response: Dict[str, Any]) -> Dict[str, Any]:
+        for field in ('Item', 'Attributes', 'LastEvaluatedKey'):
+            if field in response:
+                response[field] = deserialize_item(response[field])
+        if 'Items' in response:
+            response['Items'] = [deserialize_item(item) for item in response['Items']]
+        return response
+
+
+class DynamoBatchWriter:
+    """BatchWriteItem in chunks of 25, resubmitting UnprocessedItems (like Table.batch_writer)."""
+
+    BATCH_SIZE = 25
+
+    def __init__(self, table: DynamoTable, max_attempts: int = 5):
+        self.table = table
+        self.max_attempts = max_attempts
+        self._requests: List[Dict[str, Any]] = []
+
+    def put_item(self, Item: Dict[str, Any]):
+        self._add({'PutRequest': {'Item': serialize_item(Item)}})
+
+    def delete_item(self, Key: Dict[str, Any]):
+        self._add({'DeleteRequest': {'Key': serialize_item(Key)}})
+
+    def _add(self, request: Dict[str, Any]):
+        self._requests.append(request)
+        if len(self._requests) >= self.BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        pending, self._requests = self._requests[:self.BATCH_SIZE], self._requests[self.BATCH_SIZE:]
+        for attempt in range(self.max_attempts):
+            if not pending:
+                return
+            response = self.table.client.batch_write_item(RequestItems={self.table.name: pending})
+            pending = response.get('UnprocessedItems', {}).get(self.table.name, [])
+            if pending:
+                time.sleep(min(0.05 * (2 ** attempt), 1.0))
+        if pending:
+            raise RuntimeError(f"{len(pending)} batch writes to {self.table.name} unprocessed after {self.max_attempts} attempts")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        while self._requests:
+            self._flush()
+        return False
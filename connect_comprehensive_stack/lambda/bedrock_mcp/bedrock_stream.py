@@ -0,0 +1,136 @@
+"""
+Assembles a Bedrock `converse_stream` event stream into the same shape as a `converse` response.
+
+Text deltas are accumulated incrementally and an optional early-stop check runs on the partial
+text, so a transfer phrase can short-circuit generation before the model finishes. With a window,
+the check only sees the tail a phrase completed by the latest delta can lie in, so each delta costs
+work proportional to its size rather than to the reply so far.
+"""
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def tail_window(text: str, delta_chars: int, window: Optional[int]) -> str:
+    """
+    The last window + delta_chars characters of text, starting at a word boundary so a cut word
+    cannot complete a phrase that is not there. The whole text when there is no window.
+    """
+    start = len(text) - delta_chars - (window or 0)
+    if window is None or start <= 0:
+        return text
+    while start < len(text) and (text[start].isalnum() or text[start] == "'") and text[start - 1].isalnum():
+        start += 1
+    return text[start:]
+
+
+def assemble_converse_stream(events: Iterable[Dict[str, Any]], started_at: float = None,
+                             early_stop: Optional[Callable[[str], Optional[str]]] = None,
+                             on_close: Optional[Callable[[], None]] = None,
+                             early_stop_window: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Consume converse_stream events and build a converse-style response.
+
+    Args:
+        events: the `stream` from bedrock.converse_stream(...)
+        started_at: time.time() when the request was sent (defaults to now)
+        early_stop: called with the accumulated text after each text delta; returning a
+                    reason string stops consuming the stream
+        on_close: called when generation is abandoned early (e.g. stream.close)
+        early_stop_window: characters before the latest delta that early_stop needs to see (the
+                           longest phrase it looks for, plus slack); None passes the whole text
+
+    Returns:
+        {'output': {'message': {...}}, 'stopReason', 'usage', 'metrics', 'streamMetrics'}
+        where streamMetrics has timeToFirstTokenMs, toolUseDetectedMs, totalLatencyMs and earlyStop.
+    """
+    started_at = started_at or time.time()
+    blocks: Dict[int, Dict[str, Any]] = {}
+    text_so_far = ''
+    stop_reason = None
+    usage: Dict[str, Any] = {}
+    metrics: Dict[str, Any] = {}
+    first_token_ms = None
+    tool_use_ms = None
+    early_stop_reason = None
+
+    def _elapsed_ms() -> int:
+        return int((time.time() - started_at) * 1000)
+
+    for event in events:
+        if 'contentBlockStart' in event:
+            start = event['contentBlockStart']
+            tool_use = start.get('start', {}).get('toolUse')
+            if tool_use:
+                blocks[start.get('contentBlockIndex', len(blocks))] = {
+                    'toolUse': {'toolUseId': tool_use.get('toolUseId'), 'name': tool_use.get('name')},
+                    '_input': []
+                }
+                if tool_use_ms is None:
+                    tool_use_ms = _elapsed_ms()
+                    logger.info(f"[STREAM] Tool use block '{tool_use.get('name')}' detected at {tool_use_ms}ms")
+
+        elif 'contentBlockDelta' in event:
+            delta_event = event['contentBlockDelta']
+            index = delta_event.get('contentBlockIndex', 0)
+            delta = delta_event.get('delta', {})
+            if first_token_ms is None:
+                first_token_ms = _elapsed_ms()
+
+            if 'text' in delta:
+                block = blocks.setdefault(index, {'text': ''})
+                block['text'] = block.get('text', '') + delta['text']
+                text_so_far += delta['text']
+                if early_stop is not None:
+                    early_stop_reason = early_stop(tail_window(text_so_far, len(delta['text']), early_stop_window))
+                    if early_stop_reason:
+                        logger.info(f"[STREAM] Early stop ({early_stop_reason}) at {_elapsed_ms()}ms")
+                        break
+            elif 'toolUse' in delta:
+                block = blocks.setdefault(index, {'toolUse': {}, '_input': []})
+                block.setdefault('_input', []).append(delta['toolUse'].get('input', ''))
+
+        elif 'messageStop' in event:
+            stop_reason = event['messageStop'].get('stopReason')
+
+        elif 'metadata' in event:
+            usage = event['metadata'].get('usage', {})
+            metrics = event['metadata'].get('metrics', {})
+
+    if early_stop_reason and on_close is not None:
+        try:
+            on_close()
+        except Exception as e:
+            logger.warning(f"[STREAM] Error closing stream: {str(e)}")
+
+    content = []
+    for index in sorted(blocks):
+        block = blocks[index]
+        if 'toolUse' in block:
+            raw_input = ''.join(block.pop('_input', []))
+            try:
+                block['toolUse']['input'] = json.loads(raw_input) if raw_input else {}
+            except ValueError:
+                block['toolUse']['input'] = {}
+                logger.warning(f"[STREAM] Could not parse tool input for {block['toolUse'].get('name')}")
+        content.append(block)
+
+    if stop_reason is None:
+        # Stream abandoned early - infer from what arrived
+        stop_reason = 'tool_use' if tool_use_ms is not None and not early_stop_reason else 'end_turn'
+
+    return {
+        'output': {'message': {'role': 'assistant', 'content': content}},
+        'stopReason': stop_reason,
+        'usage': usage,
+        'metrics': metrics,
+        'streamMetrics': {
+            'timeToFirstTokenMs': first_token_ms,
+            'toolUseDetectedMs': tool_use_ms,
+            'totalLatencyMs': _elapsed_ms(),
+            'earlyStop': early_stop_reason
+        }
+    }
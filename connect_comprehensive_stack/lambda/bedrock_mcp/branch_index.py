@@ -0,0 +1,308 @@
+"""
+In-memory branch index for find_nearest_branch.
+
+Branches are loaded from a data file (branches.json) and indexed three ways:
+  - a prefix trie over UK outward codes ("EC1A", "M1", ...) for postcode/district lookup
+  - an inverted index of service type -> branch ids
+  - a fixed-size lat/long grid for nearest-N search with haversine distances
+A postcode whose district has no branch is placed by a centroid table of outward codes and postcode
+areas (postcode_centroids in the data file), so it still reaches the nearest-N search. Free text that
+is not a postcode, city or "lat,lon" falls back to a substring match on branch addresses.
+Queries touch only the grid cells / trie nodes they need, so lookups stay sub-millisecond
+with thousands of branches.
+"""
+import bisect
+import json
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_BRANCH_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'branches.json')
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Full postcode ("EC1A 1BB") or outward code only ("EC1A", "M1")
+_POSTCODE_RE = re.compile(r'^([A-Z]{1,2}[0-9][A-Z0-9]?)(?:\s*([0-9][A-Z]{2}))?$')
+_LAT_LON_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def outward_code(postcode: str) -> Optional[str]:
+    """Outward code of a UK postcode or district ("ec1a 1bb" -> "EC1A"), None if it is not one."""
+    match = _POSTCODE_RE.match(postcode.strip().upper())
+    return match.group(1) if match else None
+
+
+class _TrieNode:
+    __slots__ = ('children', 'branch_ids')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.branch_ids: List[int] = []
+
+
+class BranchIndex:
+    """
+    Postcode trie + service inverted index + lat/long grid over a list of branches.
+
+    Each branch record needs name, postcode, lat, lon and services; any other fields
+    (address, phone, hours, ...) are returned as-is.
+
+    Usage:
+        index = BranchIndex.from_file()
+        for branch, distance_km in index.search("EC1A 1BB", service_type="card_services", limit=3):
+            ...
+    """
+
+    def __init__(self, branches: List[Dict[str, Any]], places: Dict[str, Tuple[float, float]] = None,
+                 cell_degrees: float = 0.1, version: str = None,
+                 postcode_centroids: Dict[str, Tuple[float, float]] = None):
+        self.branches = branches
+        self.version = version
+        self.cell_degrees = cell_degrees
+        # Named places (cities/towns) -> (lat, lon); branch cities are added from their branches
+        self.places: Dict[str, Tuple[float, float]] = {name.lower(): tuple(point) for name, point in (places or {}).items()}
+        # Outward code ("SW1A") or postcode area ("SW") -> (lat, lon), for postcodes with no branch nearby
+        self.postcode_centroids: Dict[str, Tuple[float, float]] = {
+            code.upper(): tuple(point) for code, point in (postcode_centroids or {}).items()
+        }
+
+        self._trie = _TrieNode()
+        self._services: Dict[str, Set[int]] = {}
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        self._city_branches: Dict[str, List[int]] = {}
+        self._addresses: List[Tuple[str, int]] = []
+
+        for branch_id, branch in enumerate(branches):
+            self._index_branch(branch_id, branch)
+
+        for city, branch_ids in self._city_branches.items():
+            if city not in self.places:
+                self.places[city] = self._centroid(branch_ids)
+        self._place_names = sorted(self.places)
+
+        rows = [cell[0] for cell in self._grid] or [0]
+        cols = [cell[1] for cell in self._grid] or [0]
+        self._grid_bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    @classmethod
+    def from_file(cls, path: str = None, **kwargs) -> 'BranchIndex':
+        with open(path or DEFAULT_BRANCH_DATA_PATH, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        return cls(document.get('branches', []), document.get('places'), version=document.get('version'),
+                   postcode_centroids=document.get('postcode_centroids'), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.branches)
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Individual indexes
+    # ------------------------------------------------------------------------------------------------------------
+
+    def by_outward_prefix(self, prefix: str) -> List[int]:
+        """Branch ids whose outward code starts with prefix ("EC" -> EC1A, EC2V, ...)."""
+        node = self._trie
+        for char in prefix.upper():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            found.extend(current.branch_ids)
+            stack.extend(current.children.values())
+        return found
+
+    def by_postcode_area(self, area: str) -> List[int]:
+        """Branch ids in a postcode area ("E" -> E1, E14, ... but not EC1A)."""
+        node = self._trie
+        for char in area.upper():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [child for char, child in node.children.items() if char.isdigit()]
+        while stack:
+            current = stack.pop()
+            found.extend(current.branch_ids)
+            stack.extend(current.children.values())
+        return found
+
+    def by_outward_code(self, code: str) -> List[int]:
+        """Branch ids in exactly this outward code."""
+        node = self._trie
+        for char in code.upper():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return list(node.branch_ids)
+
+    def with_service(self, service_type: str) -> Set[int]:
+        return self._services.get(service_type, set())
+
+    def nearest(self, lat: float, lon: float, limit: int = 3, service_type: str = None,
+                max_km: float = None) -> List[Tuple[int, float]]:
+        """
+        Nearest branches to (lat, lon) as (branch id, km), closest first.
+        Searches grid rings outwards and stops once no unvisited cell can hold a closer branch.
+        """
+        allowed = self.with_service(service_type) if service_type else None
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self._grid_bounds
+        # Rings beyond this cover no occupied cells
+        last_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+        best: List[Tuple[float, int]] = []
+
+        for ring in range(last_ring + 1):
+            for cell in self._ring_cells(row, col, ring):
+                for branch_id in self._grid.get(cell, ()):
+                    if allowed is not None and branch_id not in allowed:
+                        continue
+                    branch = self.branches[branch_id]
+                    best.append((haversine_km(lat, lon, branch['lat'], branch['lon']), branch_id))
+            best.sort()
+            del best[limit:]
+
+            # Anything outside this ring is at least `ring` whole cells away in latitude or longitude
+            bound = ring * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(min(89.0, abs(lat) + (ring + 1) * self.cell_degrees)))
+            if max_km is not None and bound > max_km:
+                break
+            if len(best) == limit and best[-1][0] <= bound:
+                break
+
+        return [(branch_id, distance) for distance, branch_id in best if max_km is None or distance <= max_km]
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Free-text search used by the tool
+    # ------------------------------------------------------------------------------------------------------------
+
+    def resolve_location(self, location: str) -> Tuple[Optional[Tuple[float, float]], List[int]]:
+        """
+        Turn a tool `location` into a search point and the branch ids that match it directly.
+        Accepts "lat,lon", a postcode or outward code, or a city/town name (exact, then prefix);
+        anything else is matched as a substring of branch addresses ("Oxford Street").
+        """
+        text = location.strip()
+        if not text:
+            return None, []
+
+        lat_lon = _LAT_LON_RE.match(text)
+        if lat_lon:
+            return (float(lat_lon.group(1)), float(lat_lon.group(2))), []
+
+        code = outward_code(text)
+        if code:
+            # Exact district first ("E1" must not pull in E14), then sub-districts ("EC1" -> EC1A, EC1V)
+            direct = self.by_outward_code(code) or self.by_outward_prefix(code)
+            if direct:
+                return self._centroid(direct), direct
+            # No branch in that district: search from the district's own centroid, else the centre of
+            # its postcode area ("SW1A" -> "SW"), from the table or from the area's branches
+            area_code = re.match(r'[A-Z]+', code).group(0)
+            point = self.postcode_centroids.get(code) or self.postcode_centroids.get(area_code)
+            if point:
+                return point, []
+            area = self.by_postcode_area(area_code)
+            if area:
+                return self._centroid(area), []
+
+        name = text.lower()
+        if name in self.places:
+            return self.places[name], list(self._city_branches.get(name, []))
+        for place in self._iter_prefixed(name):
+            return self.places[place], list(self._city_branches.get(place, []))
+
+        # Last resort: street or area name inside a branch address. Linear, but only reached for text
+        # the indexes above cannot place; very short text would match nearly every address
+        if len(name) >= 3:
+            direct = [branch_id for address, branch_id in self._addresses if name in address]
+            if direct:
+                return self._centroid(direct), direct
+        return None, []
+
+    def search(self, location: str, service_type: str = None, limit: int = 3,
+               max_km: float = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Branches for a location, as (branch record, km from the search point).
+        Branches matching the postcode/address/city directly come first, closest first; the rest of
+        the limit is filled with the nearest other branches within max_km.
+        """
+        point, direct = self.resolve_location(location)
+        if point is None:
+            return []
+        allowed = self.with_service(service_type) if service_type else None
+
+        candidates = [branch_id for branch_id in direct if allowed is None or branch_id in allowed]
+        ranked = [(i, distance) for distance, i in sorted(
+            (haversine_km(point[0], point[1], self.branches[i]['lat'], self.branches[i]['lon']), i)
+            for i in candidates
+        )[:limit]]
+        if len(ranked) < limit:
+            seen = {i for i, _ in ranked}
+            nearby = self.nearest(point[0], point[1], limit + len(seen), service_type, max_km)
+            ranked.extend((i, distance) for i, distance in nearby if i not in seen)
+        return [(self.branches[i], distance) for i, distance in ranked[:limit]]
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------------------------------------------------
+
+    def _index_branch(self, branch_id: int, branch: Dict[str, Any]):
+        code = outward_code(branch.get('postcode', ''))
+        if code:
+            node = self._trie
+            for char in code:
+                node = node.children.setdefault(char, _TrieNode())
+            node.branch_ids.append(branch_id)
+
+        for service in branch.get('services', []):
+            self._services.setdefault(service, set()).add(branch_id)
+
+        self._grid.setdefault(self._cell(branch['lat'], branch['lon']), []).append(branch_id)
+
+        city = branch.get('city')
+        if city:
+            self._city_branches.setdefault(city.lower(), []).append(branch_id)
+
+        address = branch.get('address')
+        if address:
+            self._addresses.append((address.lower(), branch_id))
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees))
+
+    @staticmethod
+    def _ring_cells(row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+        if ring == 0:
+            yield row, col
+            return
+        for d_col in range(-ring, ring + 1):
+            yield row - ring, col + d_col
+            yield row + ring, col + d_col
+        for d_row in range(-ring + 1, ring):
+            yield row + d_row, col - ring
+            yield row + d_row, col + ring
+
+    def _centroid(self, branch_ids: List[int]) -> Tuple[float, float]:
+        lat = sum(self.branches[i]['lat'] for i in branch_ids) / len(branch_ids)
+        lon = sum(self.branches[i]['lon'] for i in branch_ids) / len(branch_ids)
+        return lat, lon
+
+    def _iter_prefixed(self, name: str) -> Iterable[str]:
+        """Place names starting with name, via binary search over the sorted name list."""
+        position = bisect.bisect_left(self._place_names, name)
+        while position < len(self._place_names) and self._place_names[position].startswith(name):
+            yield self._place_names[position]
+            position += 1
@@ -0,0 +1,201 @@
+"""
+In-memory LRU/TTL cache for conversation history.
+Persists across warm Lambda invocations and keeps every operation O(1).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough per-message overhead (dict + two str objects) used for byte accounting
+_MESSAGE_OVERHEAD_BYTES = 120
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def estimate_history_size(history: List[Dict[str, Any]]) -> int:
+    """Cheap size estimate in bytes for a list of {'role', 'content'} messages."""
+    size = _ENTRY_OVERHEAD_BYTES
+    for msg in history:
+        content = msg.get('content', '')
+        size += _MESSAGE_OVERHEAD_BYTES + len(msg.get('role', ''))
+        size += len(content) if isinstance(content, str) else len(str(content))
+    return size
+
+
+class ConversationCache:
+    """
+    LRU cache with per-entry TTL, bounded by entry count and approximate bytes.
+
+    Entries are keyed by (session_id, max_turns). A secondary index maps each
+    session to its keys so invalidation does not scan the whole cache.
+
+    Usage:
+        cache = ConversationCache(max_entries=100, max_bytes=8 * 1024 * 1024, ttl_seconds=300)
+        history = cache.get(session_id, max_turns)
+        if history is None:
+            history = load_from_dynamodb(...)
+            cache.put(session_id, max_turns, history)
+    """
+
+    def __init__(self, max_entries: int = 100, max_bytes: int = 8 * 1024 * 1024,
+                 ttl_seconds: float = 300, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        # key -> (history, expires_at, size_bytes); ordered oldest -> most recently used
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[List[Dict], float, int]]" = OrderedDict()
+        self._session_index: Dict[str, Set[Tuple[str, Hashable]]] = {}
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.write_throughs = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[str, Hashable]) -> bool:
+        return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, session_id: str, variant: Hashable) -> Optional[List[Dict]]:
+        """
+        Return a copy of the cached history or None on miss/expiry. Refreshes LRU position on hit.
+        A copy is returned so callers can extend their working history without mutating the cache.
+        """
+        key = (session_id, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            history, expires_at, _ = entry
+            if self._clock() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(history)
+
+    def put(self, session_id: str, variant: Hashable, history: List[Dict]):
+        """Insert or replace an entry, then evict least recently used entries until within limits."""
+        key = (session_id, variant)
+        history = list(history)
+        size = estimate_history_size(history)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (history, self._clock() + self.ttl_seconds, size)
+            self._session_index.setdefault(session_id, set()).add(key)
+            self._total_bytes += size
+            self._evict_if_needed()
+
+    def append(self, session_id: str, messages: List[Dict]) -> int:
+        """
+        Write-through update: append freshly persisted messages to every cached
+        variant of a session instead of invalidating it.
+
+        Integer variants are treated as max_turns and trimmed to the newest
+        max_turns * 2 messages, mirroring the DynamoDB query limit. The TTL is
+        refreshed because the entry now reflects what was just written; entries
+        that had already expired are dropped rather than revived.
+        Returns the number of entries updated.
+        """
+        with self._lock:
+            keys = self._session_index.get(session_id)
+            if not keys:
+                return 0
+
+            now = self._clock()
+            expires_at = now + self.ttl_seconds
+            updated_count = 0
+            for key in list(keys):
+                history, old_expires_at, old_size = self._entries[key]
+                if now >= old_expires_at:
+                    self._remove(key)
+                    self.expirations += 1
+                    continue
+                updated = history + list(messages)
+                variant = key[1]
+                if isinstance(variant, int) and variant > 0:
+                    updated = updated[-variant * 2:]
+                size = estimate_history_size(updated)
+                self._entries[key] = (updated, expires_at, size)
+                self._entries.move_to_end(key)
+                self._total_bytes += size - old_size
+                updated_count += 1
+
+            self.write_throughs += updated_count
+            self._evict_if_needed()
+            return updated_count
+
+    def invalidate(self, session_id: str) -> int:
+        """Drop every entry belonging to a session. Returns the number of entries removed."""
+        with self._lock:
+            keys = self._session_index.pop(session_id, None)
+            if not keys:
+                return 0
+            for key in keys:
+                _, _, size = self._entries.pop(key)
+                self._total_bytes -= size
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Remove all entries (counters are preserved)."""
+        with self._lock:
+            self._entries.clear()
+            self._session_index.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging/monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'write_throughs': self.write_throughs
+        }
+
+    def _remove(self, key: Tuple[str, Hashable]):
+        """Remove a single entry and its secondary index reference. Caller holds the lock."""
+        _, _, size = self._entries.pop(key)
+        self._total_bytes -= size
+        session_keys = self._session_index.get(key[0])
+        if session_keys is not None:
+            session_keys.discard(key)
+            if not session_keys:
+                del self._session_index[key[0]]
+
+    def _evict_if_needed(self):
+        """Evict from the LRU end until entry count and byte limits hold. Caller holds the lock."""
+        # Always keep the most recent entry, even if it alone exceeds max_bytes
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+            logger.info(f"[CACHE EVICTION] Removed least recently used entry: {oldest_key[0]}:{oldest_key[1]}")
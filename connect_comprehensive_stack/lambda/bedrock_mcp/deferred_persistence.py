@@ -0,0 +1,139 @@
+"""
+Deferred persistence pipeline for writes that do not need to block the Lex response.
+Work is queued in memory and flushed on a small background thread pool.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredWriter:
+    """
+    Bounded background executor for fire-and-forget persistence.
+
+    - submit() queues a callable and returns immediately
+    - When max_pending writes are already in flight, the write runs inline
+      (backpressure) rather than being dropped
+    - A callable that raises or returns False is counted as a failure (and, unless
+      log_failures is False, logged)
+    - drain() waits for in-flight writes; call it at the start of the next
+      invocation and at shutdown so nothing is lost when the sandbox freezes
+
+    Usage:
+        writer = DeferredWriter(max_workers=2, max_pending=50)
+        writer.submit(save_conversation_batch, session_id, messages, caller_id)
+        ...
+        writer.drain(timeout=2.0)
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 50, name: str = "persistence", enabled: bool = True,
+                 log_failures: bool = True):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.name = name
+        self.enabled = enabled
+        self.log_failures = log_failures
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending: Set[Future] = set()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failures = 0
+        self.inline_writes = 0
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> bool:
+        """
+        Queue a write. Returns True if it was deferred, False if it ran inline
+        (pipeline disabled or queue full).
+        """
+        if not self.enabled:
+            self._run(func, *args, **kwargs)
+            return False
+
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                queue_full = True
+            else:
+                queue_full = False
+                future = self._get_executor().submit(self._run, func, *args, **kwargs)
+                self._pending.add(future)
+                self.submitted += 1
+
+        if queue_full:
+            logger.warning(f"[{self.name}] Queue full ({self.max_pending} pending), writing inline")
+            self.inline_writes += 1
+            self._run(func, *args, **kwargs)
+            return False
+
+        future.add_done_callback(self._discard)
+        return True
+
+    def drain(self, timeout: float = None) -> int:
+        """Wait for in-flight writes. Returns the number still pending after the timeout."""
+        with self._lock:
+            pending = list(self._pending)
+        if not pending:
+            return 0
+
+        start = time.time()
+        _, not_done = wait(pending, timeout=timeout)
+        elapsed_ms = int((time.time() - start) * 1000)
+        if not_done:
+            logger.warning(f"[{self.name}] Drain timed out after {elapsed_ms}ms with {len(not_done)} writes pending")
+        else:
+            logger.info(f"[{self.name}] Drained {len(pending)} deferred writes in {elapsed_ms}ms")
+        return len(not_done)
+
+    def shutdown(self, timeout: float = None):
+        """Drain and stop the executor (used on SIGTERM/exit)."""
+        self.drain(timeout)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging/monitoring."""
+        return {
+            'pending': len(self._pending),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failures': self.failures,
+            'inline_writes': self.inline_writes
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool on first use. Caller holds the lock."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _run(self, func: Callable[..., Any], *args, **kwargs):
+        """Execute a write, counting exceptions and explicit False results as failures."""
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            if self.log_failures:
+                logger.error(f"[{self.name}] Deferred write {getattr(func, '__name__', func)} failed: {str(e)}")
+            return None
+        with self._lock:
+            if result is False:
+                self.failures += 1
+            else:
+                self.completed += 1
+        return result
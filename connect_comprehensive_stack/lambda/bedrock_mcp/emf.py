@@ -0,0 +1,58 @@
+"""
+CloudWatch Embedded Metric Format (EMF) helpers.
+
+An EMF record is a JSON log line that CloudWatch Logs turns into metrics on ingestion,
+so publishing a metric costs no PutMetricData call. Records are written straight to
+stdout because the Lambda log prefix added by the logging module would break parsing.
+"""
+import json
+import sys
+import time
+from typing import Any, Dict, Tuple, Union
+
+MetricValue = Union[float, int, Tuple[Union[float, int], str]]
+
+
+def build_emf_record(namespace: str, metrics: Dict[str, MetricValue], dimensions: Dict[str, str] = None,
+                     properties: Dict[str, Any] = None, timestamp_ms: int = None) -> Dict[str, Any]:
+    """
+    Build an EMF record.
+
+    Args:
+        namespace: CloudWatch namespace
+        metrics: name -> value, or name -> (value, unit); unit defaults to 'None'. A value may be
+            a list of up to 100 samples
+        dimensions: dimension name -> value (one dimension set)
+        properties: extra searchable fields that are not metrics
+        timestamp_ms: record time (epoch milliseconds); defaults to now
+    """
+    dimensions = dimensions or {}
+    record: Dict[str, Any] = dict(properties or {})
+    definitions = []
+    for name, value in metrics.items():
+        if isinstance(value, tuple):
+            value, unit = value
+        else:
+            unit = 'None'
+        record[name] = value
+        definitions.append({'Name': name, 'Unit': unit})
+
+    record.update(dimensions)
+    record['_aws'] = {
+        'Timestamp': timestamp_ms if timestamp_ms is not None else int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': namespace,
+            'Dimensions': [list(dimensions.keys())] if dimensions else [[]],
+            'Metrics': definitions
+        }]
+    }
+    return record
+
+
+def emit_emf(namespace: str, metrics: Dict[str, MetricValue], dimensions: Dict[str, str] = None,
+             properties: Dict[str, Any] = None, stream=None):
+    """Write one EMF record as a single stdout line."""
+    record = build_emf_record(namespace, metrics, dimensions, properties)
+    out = stream or sys.stdout
+    out.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
+    out.flush()
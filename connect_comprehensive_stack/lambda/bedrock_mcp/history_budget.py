@@ -0,0 +1,195 @@
+"""
+Token budget for the conversation history sent to Bedrock.
+
+Instead of a fixed number of turns, the newest messages are kept while their estimated token
+count fits HISTORY_TOKEN_BUDGET. Messages that fall out of the window are folded into a rolling
+summary of the call: each message is summarized once, the summary is extended incrementally and
+stored with the session (in memory for warm containers, plus one DynamoDB item), and it is sent
+as part of the per-turn system context.
+"""
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from history_store import HISTORY_TTL_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Rough English average for Claude tokenizers; deliberately conservative
+CHARS_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# '!' sorts before '#conversation' and every ISO timestamp, so per-turn queries never return it
+SUMMARY_SORT_KEY = '!summary'
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+
+
+def estimate_tokens(text: str) -> int:
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    content = message.get('content', '')
+    return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content if isinstance(content, str) else str(content))
+
+
+def extractive_summary_line(message: Dict[str, Any], max_chars: int = 160) -> str:
+    """One line per message: speaker plus its first sentence, truncated."""
+    content = message.get('content', '')
+    content = (content if isinstance(content, str) else str(content)).strip()
+    first = _SENTENCE_END_RE.split(content, maxsplit=1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars].rstrip() + '...'
+    speaker = 'Customer' if message.get('role') == 'user' else 'Emma'
+    return f"{speaker}: {first}"
+
+
+class BudgetedHistory(NamedTuple):
+    messages: List[Dict]          # newest messages within the budget, starting with a user turn
+    summary: Optional[str]        # rolling summary of everything older, or None
+    summary_changed: bool         # True when this turn extended the summary (persist it)
+    tokens_before: int            # estimated tokens of the full fetched history
+    tokens_after: int             # estimated tokens of messages + summary
+
+
+class SessionSummaryStore:
+    """Rolling summary persisted as one item per session in the conversation-history table."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(
+            Key={'caller_id': session_id, 'timestamp': SUMMARY_SORT_KEY},
+            ProjectionExpression='summary_lines, through_ts'
+        ).get('Item')
+        if not item:
+            return None
+        return {'lines': list(item.get('summary_lines', [])), 'through_ts': item.get('through_ts', '')}
+
+    def put(self, session_id: str, state: Dict[str, Any]):
+        self.table.put_item(Item={
+            'caller_id': session_id,
+            'timestamp': SUMMARY_SORT_KEY,
+            'summary_lines': state['lines'],
+            'through_ts': state['through_ts'],
+            'ttl': int((datetime.utcnow() + timedelta(days=HISTORY_TTL_DAYS)).timestamp()),
+            'updated_at': datetime.utcnow().isoformat()
+        })
+
+
+class HistoryBudgeter:
+    """
+    Keep the newest history within a token budget and summarize the rest.
+
+    Usage:
+        budgeter = HistoryBudgeter(max_tokens=1000, summary_store=SessionSummaryStore(table))
+        budgeted = budgeter.fit(session_id, conversation_history)
+        call_bedrock_with_tools(..., budgeted.messages, conversation_summary=budgeted.summary)
+        if budgeted.summary_changed:
+            budgeter.save(session_id)
+    """
+
+    def __init__(self, max_tokens: int = 1000, min_recent_messages: int = 2, summary_max_tokens: int = 300,
+                 summary_store: SessionSummaryStore = None, max_sessions: int = 200,
+                 summarize_line: Callable[[Dict[str, Any]], str] = extractive_summary_line):
+        self.max_tokens = max_tokens
+        self.min_recent_messages = min_recent_messages
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_store = summary_store
+        self.max_sessions = max_sessions
+        self.summarize_line = summarize_line
+        self._lock = threading.Lock()
+        # session_id -> {'lines': [...], 'through_ts': iso timestamp of the last summarized message}
+        self._summaries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+        self.stats_counters = {'turns': 0, 'trimmed_turns': 0, 'summarized_messages': 0, 'store_reads': 0,
+                               'store_errors': 0, 'tokens_before': 0, 'tokens_after': 0}
+
+    def fit(self, session_id: str, history: List[Dict]) -> BudgetedHistory:
+        costs = [estimate_message_tokens(m) for m in history]
+        tokens_before = sum(costs)
+
+        start, used = len(history), 0
+        for i in range(len(history) - 1, -1, -1):
+            if used + costs[i] > self.max_tokens and len(history) - i > self.min_recent_messages:
+                break
+            used += costs[i]
+            start = i
+        # Converse requires the message list to start with the customer
+        while start < len(history) and history[start].get('role') != 'user':
+            used -= costs[start]
+            start += 1
+
+        kept, dropped = history[start:], history[:start]
+        summary_changed = False
+        state = self._summary_state(session_id, load=bool(dropped))
+        if dropped:
+            summary_changed = self._extend(state, dropped)
+            with self._lock:
+                self._summaries[session_id] = state
+                self._summaries.move_to_end(session_id)
+                while len(self._summaries) > self.max_sessions:
+                    self._summaries.popitem(last=False)
+
+        summary = '\n'.join(state['lines']) if state and state['lines'] else None
+        tokens_after = used + estimate_tokens(summary or '')
+
+        self.stats_counters['turns'] += 1
+        self.stats_counters['tokens_before'] += tokens_before
+        self.stats_counters['tokens_after'] += tokens_after
+        if dropped:
+            self.stats_counters['trimmed_turns'] += 1
+        return BudgetedHistory(kept, summary, summary_changed, tokens_before, tokens_after)
+
+    def save(self, session_id: str) -> bool:
+        """Persist the session's summary (run on the deferred persistence pipeline)."""
+        with self._lock:
+            state = self._summaries.get(session_id)
+        if self.summary_store is None or state is None:
+            return True
+        self.summary_store.put(session_id, {'lines': list(state['lines']), 'through_ts': state['through_ts']})
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self.stats_counters)
+        counters['sessions'] = len(self._summaries)
+        return counters
+
+    def _summary_state(self, session_id: str, load: bool) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._summaries.get(session_id)
+        if state is not None or not load:
+            return state
+        if self.summary_store is not None:
+            # Another container may have started this call; only long calls pay for this read
+            self.stats_counters['store_reads'] += 1
+            try:
+                state = self.summary_store.get(session_id)
+            except Exception as e:
+                self.stats_counters['store_errors'] += 1
+                logger.warning(f"[HISTORY BUDGET] Could not read summary for {session_id}: {str(e)}")
+        return state or {'lines': [], 'through_ts': ''}
+
+    def _extend(self, state: Dict[str, Any], dropped: List[Dict]) -> bool:
+        """Summarize messages newer than the summary; older ones were summarized on an earlier turn."""
+        through_ts = state['through_ts']
+        new = [m for m in dropped if not through_ts or (m.get('timestamp') or '') > through_ts]
+        if not new:
+            return False
+
+        # The '[silence]' placeholder saved with the introduction carries nothing worth summarizing
+        lines = state['lines'] + [self.summarize_line(m) for m in new if m.get('content') != '[silence]']
+        # Keep the opening line (why the customer called) and as many recent lines as fit
+        while len(lines) > 2 and estimate_tokens('\n'.join(lines)) > self.summary_max_tokens:
+            del lines[1]
+        state['lines'] = lines
+        state['through_ts'] = max((m.get('timestamp') or '' for m in new), default=through_ts) or through_ts
+        self.stats_counters['summarized_messages'] += len(new)
+        return True
+
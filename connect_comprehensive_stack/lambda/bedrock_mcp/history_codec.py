@@ -0,0 +1,160 @@
+"""
+Optional compression codec for conversation history payloads.
+
+Large `content` strings and `metadata` maps are stored as compressed binary attributes
+(`content_z` / `metadata_z`, with the codec name in `codec`). Items without those attributes
+are legacy rows and are read back unchanged, so the codec can be switched on at any time.
+"""
+import json
+import logging
+import threading
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency - only needed for HISTORY_CODEC=zstd
+    zstandard = None
+
+CODEC_NONE = 'none'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+# Upper bounds (bytes) for the size histogram buckets
+_HISTOGRAM_BOUNDS = (256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+
+def _bucket(size: int) -> str:
+    for bound in _HISTOGRAM_BOUNDS:
+        if size < bound:
+            return f"<{bound}"
+    return f">={_HISTOGRAM_BOUNDS[-1]}"
+
+
+def _binary_value(value) -> bytes:
+    """boto3 returns Binary wrappers for B attributes; unwrap to bytes."""
+    return getattr(value, 'value', value)
+
+
+class HistoryCodec:
+    """
+    Encodes/decodes conversation payloads and records raw vs stored size histograms.
+
+    Usage:
+        codec = HistoryCodec(CODEC_ZLIB, min_bytes=256)
+        item.update(codec.encode(content, metadata))
+        content, metadata = codec.decode(item)
+    """
+
+    def __init__(self, name: str = CODEC_NONE, min_bytes: int = 256, level: int = None):
+        if name == CODEC_ZSTD and zstandard is None:
+            logger.warning("HISTORY_CODEC=zstd but the zstandard package is not installed, using zlib")
+            name = CODEC_ZLIB
+        if name not in (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD):
+            logger.warning(f"Unknown HISTORY_CODEC '{name}', storing history uncompressed")
+            name = CODEC_NONE
+
+        self.name = name
+        self.min_bytes = min_bytes
+        self.level = level if level is not None else (6 if name == CODEC_ZLIB else 3)
+        self._lock = threading.Lock()
+        self._zstd_lock = threading.Lock()
+        self._zstd_compressor = zstandard.ZstdCompressor(level=self.level) if name == CODEC_ZSTD else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+        self.encoded = 0
+        self.compressed = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.raw_histogram: Dict[str, int] = {}
+        self.stored_histogram: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.name != CODEC_NONE
+
+    def encode(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Return the DynamoDB attributes for a turn's content and metadata.
+        Payloads below min_bytes (or with the codec disabled) keep the plain attributes.
+        """
+        raw = content.encode('utf-8')
+        metadata_raw = json.dumps(metadata, separators=(',', ':')).encode('utf-8') if metadata else b''
+        raw_size = len(raw) + len(metadata_raw)
+
+        if not self.enabled or raw_size < self.min_bytes:
+            attributes = {'content': content}
+            if metadata:
+                # Convert any float values to Decimal for DynamoDB
+                attributes['metadata'] = json.loads(metadata_raw, parse_float=Decimal)
+            self._record(raw_size, raw_size, compressed=False)
+            return attributes
+
+        attributes = {'codec': self.name, 'content_z': self._compress(raw)}
+        stored_size = len(attributes['content_z'])
+        if metadata_raw:
+            attributes['metadata_z'] = self._compress(metadata_raw)
+            stored_size += len(attributes['metadata_z'])
+        self._record(raw_size, stored_size, compressed=True)
+        return attributes
+
+    def decode(self, item: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Return (content, metadata) from either a compressed or a legacy item."""
+        if 'content_z' not in item:
+            return item.get('content', ''), item.get('metadata')
+
+        codec = item.get('codec', CODEC_ZLIB)
+        content = self._decompress(codec, _binary_value(item['content_z'])).decode('utf-8')
+        metadata = None
+        if 'metadata_z' in item:
+            metadata = json.loads(self._decompress(codec, _binary_value(item['metadata_z'])))
+        return content, metadata
+
+    def decode_content(self, item: Dict[str, Any]) -> str:
+        """Content only - skips metadata decompression on the read path."""
+        if 'content_z' not in item:
+            return item.get('content', '')
+        return self._decompress(item.get('codec', CODEC_ZLIB), _binary_value(item['content_z'])).decode('utf-8')
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and size histograms for logging/monitoring."""
+        return {
+            'codec': self.name,
+            'encoded': self.encoded,
+            'compressed': self.compressed,
+            'raw_bytes': self.raw_bytes,
+            'stored_bytes': self.stored_bytes,
+            'ratio': round(self.stored_bytes / self.raw_bytes, 4) if self.raw_bytes else 1.0,
+            'raw_histogram': dict(self.raw_histogram),
+            'stored_histogram': dict(self.stored_histogram)
+        }
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.name == CODEC_ZSTD:
+            # zstandard (de)compressor objects are not safe for concurrent use across threads
+            with self._zstd_lock:
+                return self._zstd_compressor.compress(data)
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, codec: str, data: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if self._zstd_decompressor is None:
+                raise RuntimeError("History item is zstd-compressed but the zstandard package is not installed")
+            with self._zstd_lock:
+                return self._zstd_decompressor.decompress(data)
+        return zlib.decompress(data)
+
+    def _record(self, raw_size: int, stored_size: int, compressed: bool):
+        with self._lock:
+            self.encoded += 1
+            if compressed:
+                self.compressed += 1
+            self.raw_bytes += raw_size
+            self.stored_bytes += stored_size
+            raw_bucket = _bucket(raw_size)
+            stored_bucket = _bucket(stored_size)
+            self.raw_histogram[raw_bucket] = self.raw_histogram.get(raw_bucket, 0) + 1
+            self.stored_histogram[stored_bucket] = self.stored_histogram.get(stored_bucket, 0) + 1
@@ -0,0 +1,323 @@
+"""
+Storage layouts for conversation history in DynamoDB.
+
+Both layouts share the conversation-history table (caller_id hash key, timestamp range key):
+- per_turn: one item per message, keyed caller_id + ISO timestamp (original layout)
+- rolling:  one item per session at timestamp = ROLLING_DOC_SORT_KEY holding a capped ring of turns
+- migrate:  writes the rolling document, reads it first and falls back to per-turn rows
+            for sessions that started before the switch (seeding the document from them)
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from botocore.exceptions import ClientError
+
+from history_codec import HistoryCodec
+
+logger = logging.getLogger(__name__)
+
+# '#' sorts before ISO timestamps, so per-turn queries can exclude the document with a key condition
+ROLLING_DOC_SORT_KEY = '#conversation'
+HISTORY_TTL_DAYS = 90
+
+LAYOUT_PER_TURN = 'per_turn'
+LAYOUT_ROLLING = 'rolling'
+LAYOUT_MIGRATE = 'migrate'
+
+
+def _ttl() -> int:
+    return int((datetime.utcnow() + timedelta(days=HISTORY_TTL_DAYS)).timestamp())
+
+
+class ItemPerTurnStore:
+    """One DynamoDB item per message. Reads are a Query + sort, trimming is a Query + batch delete."""
+
+    layout = LAYOUT_PER_TURN
+
+    def __init__(self, table, codec: HistoryCodec = None):
+        self.table = table
+        self.codec = codec or HistoryCodec()
+
+    def read(self, session_id: str, max_turns: int = 10) -> List[Dict]:
+        """Return up to max_turns exchanges in chronological order."""
+        # PERFORMANCE OPTIMIZED: Only fetch role and content fields
+        response = self.table.query(
+            KeyConditionExpression='caller_id = :session_id AND #ts > :doc_key',
+            ExpressionAttributeValues={
+                ':session_id': session_id,
+                ':doc_key': ROLLING_DOC_SORT_KEY
+            },
+            ProjectionExpression='#role, content, content_z, codec, #ts',  # Only needed fields
+            ExpressionAttributeNames={
+                '#role': 'role',  # 'role' is reserved word
+                '#ts': 'timestamp'
+            },
+            ScanIndexForward=False,  # Sort descending (newest first)
+            Limit=max_turns * 2  # Get enough for max_turns exchanges (user + assistant)
+        )
+
+        # Sort by timestamp ascending for proper conversation order
+        return [
+            {'role': item['role'], 'content': self.codec.decode_content(item), 'timestamp': item['timestamp']}
+            for item in sorted(response.get('Items', []), key=lambda x: x['timestamp'])
+        ]
+
+    def write(self, session_id: str, messages: List[Dict], caller_id: str = None) -> List[Dict]:
+        """Persist messages (single put_item, or batch_writer for several). Returns the saved turns."""
+        ttl = _ttl()
+        saved_messages = []
+        items = []
+        for msg in messages:
+            timestamp = datetime.utcnow().isoformat()
+            saved_messages.append({'role': msg['role'], 'content': msg['content'], 'timestamp': timestamp})
+
+            item = {
+                'caller_id': session_id,  # Use session_id as partition key
+                'timestamp': timestamp,
+                'role': msg['role'],
+                'ttl': ttl
+            }
+            # content/metadata, compressed when HISTORY_CODEC is enabled and the payload is large
+            item.update(self.codec.encode(msg['content'], msg.get('metadata')))
+            if caller_id:
+                item['phone_number'] = caller_id  # Store phone as attribute for reference
+            items.append(item)
+
+        if len(items) == 1:
+            self.table.put_item(Item=items[0])
+        else:
+            with self.table.batch_writer() as batch:
+                for item in items:
+                    batch.put_item(Item=item)
+        return saved_messages
+
+    def cleanup(self, session_id: str, keep_turns: int = 20) -> int:
+        """Delete all but the newest keep_turns items. Returns the number deleted."""
+        # Only fetch keys for performance
+        response = self.table.query(
+            KeyConditionExpression='caller_id = :session_id AND #ts > :doc_key',
+            ExpressionAttributeValues={
+                ':session_id': session_id,
+                ':doc_key': ROLLING_DOC_SORT_KEY
+            },
+            ProjectionExpression='caller_id, #ts',
+            ExpressionAttributeNames={
+                '#ts': 'timestamp'
+            },
+            ScanIndexForward=False  # Newest first
+        )
+
+        items = response.get('Items', [])
+        if len(items) <= keep_turns:
+            return 0
+
+        items_to_delete = items[keep_turns:]
+        with self.table.batch_writer() as batch:
+            for item in items_to_delete:
+                batch.delete_item(
+                    Key={
+                        'caller_id': item['caller_id'],
+                        'timestamp': item['timestamp']
+                    }
+                )
+        return len(items_to_delete)
+
+
+class RollingDocumentStore:
+    """
+    One compact item per session holding a capped ring of turns.
+
+    Writes are a single conditional UpdateItem with list_append while the ring has room.
+    When an append would overflow max_messages, the ring is rewritten with the newest
+    (max_messages - headroom) turns under an optimistic turn_count check, so trimming is
+    implicit and amortised over several writes. Reads are a single GetItem.
+    """
+
+    layout = LAYOUT_ROLLING
+
+    def __init__(self, table, max_messages: int = 40, headroom: int = None, max_retries: int = 3,
+                 codec: HistoryCodec = None):
+        self.table = table
+        self.codec = codec or HistoryCodec()
+        self.max_messages = max_messages
+        self.headroom = headroom if headroom is not None else max(2, max_messages // 4)
+        self.max_retries = max_retries
+
+    def _key(self, session_id: str) -> Dict[str, str]:
+        return {'caller_id': session_id, 'timestamp': ROLLING_DOC_SORT_KEY}
+
+    def read(self, session_id: str, max_turns: int = 10) -> List[Dict]:
+        """Return up to max_turns exchanges in chronological order (empty list if no document)."""
+        turns = self.read_document(session_id)
+        if turns is None:
+            return []
+        return turns[-max_turns * 2:] if max_turns > 0 else turns
+
+    def read_document(self, session_id: str):
+        """Return the full ring as [{role, content, timestamp}], or None if the session has no document."""
+        response = self.table.get_item(
+            Key=self._key(session_id),
+            ProjectionExpression='turns'
+        )
+        item = response.get('Item')
+        if item is None:
+            return None
+        return [
+            {'role': turn['role'], 'content': self.codec.decode_content(turn), 'timestamp': turn['ts']}
+            for turn in item.get('turns', [])
+        ]
+
+    def write(self, session_id: str, messages: List[Dict], caller_id: str = None) -> List[Dict]:
+        """Append messages to the session ring. Returns the saved turns."""
+        saved_messages = []
+        new_turns = []
+        for msg in messages:
+            timestamp = datetime.utcnow().isoformat()
+            saved_messages.append({'role': msg['role'], 'content': msg['content'], 'timestamp': timestamp})
+            turn = {'role': msg['role'], 'ts': timestamp}
+            turn.update(self.codec.encode(msg['content'], msg.get('metadata')))
+            new_turns.append(turn)
+
+        self.append_turns(session_id, new_turns, caller_id)
+        return saved_messages
+
+    def append_turns(self, session_id: str, new_turns: List[Dict], caller_id: str = None):
+        """Conditional list_append, falling back to an optimistic trim-and-rewrite when the ring is full."""
+        n = len(new_turns)
+        names = {'#ttl': 'ttl'}
+        values = {
+            ':new': new_turns,
+            ':empty': [],
+            ':zero': 0,
+            ':n': n,
+            ':max_before': self.max_messages - n,
+            ':ttl': _ttl(),
+            ':now': datetime.utcnow().isoformat()
+        }
+        update = ('SET turns = list_append(if_not_exists(turns, :empty), :new), '
+                  'turn_count = if_not_exists(turn_count, :zero) + :n, '
+                  '#ttl = :ttl, updated_at = :now')
+        if caller_id:
+            update += ', phone_number = :phone'
+            values[':phone'] = caller_id
+
+        try:
+            self.table.update_item(
+                Key=self._key(session_id),
+                UpdateExpression=update,
+                ConditionExpression='attribute_not_exists(turn_count) OR turn_count <= :max_before',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+
+        # Ring is full - rewrite it with the newest turns (optimistic concurrency on turn_count)
+        keep = max(n, self.max_messages - self.headroom)
+        for attempt in range(self.max_retries):
+            current = self.table.get_item(Key=self._key(session_id), ConsistentRead=True).get('Item', {})
+            observed = current.get('turn_count', 0)
+            ring = (list(current.get('turns', [])) + new_turns)[-keep:]
+            trim_values = {
+                ':turns': ring,
+                ':count': len(ring),
+                ':observed': observed,
+                ':ttl': values[':ttl'],
+                ':now': values[':now']
+            }
+            trim_update = 'SET turns = :turns, turn_count = :count, #ttl = :ttl, updated_at = :now'
+            if caller_id:
+                trim_update += ', phone_number = :phone'
+                trim_values[':phone'] = caller_id
+            try:
+                self.table.update_item(
+                    Key=self._key(session_id),
+                    UpdateExpression=trim_update,
+                    ConditionExpression='attribute_not_exists(turn_count) OR turn_count = :observed',
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=trim_values
+                )
+                logger.info(f"Trimmed rolling history for session {session_id} to {len(ring)} messages")
+                return
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                logger.info(f"Concurrent update on rolling history for {session_id}, retry {attempt + 1}")
+
+        raise RuntimeError(f"Could not append to rolling history for {session_id} after {self.max_retries} attempts")
+
+    def cleanup(self, session_id: str, keep_turns: int = 20) -> int:
+        """Trimming is implicit in write(); nothing to clean up."""
+        return 0
+
+
+class DualReadStore:
+    """
+    Migration mode: writes go to the rolling document; reads try the document first and
+    fall back to per-turn rows, seeding the document from them so later reads are one GetItem.
+    """
+
+    layout = LAYOUT_MIGRATE
+
+    def __init__(self, rolling: RollingDocumentStore, legacy: ItemPerTurnStore):
+        self.rolling = rolling
+        self.legacy = legacy
+
+    def read(self, session_id: str, max_turns: int = 10) -> List[Dict]:
+        turns = self.rolling.read_document(session_id)
+        if turns is not None:
+            return turns[-max_turns * 2:] if max_turns > 0 else turns
+
+        history = self.legacy.read(session_id, max_turns)
+        if history:
+            self._seed(session_id, history)
+        return history
+
+    def write(self, session_id: str, messages: List[Dict], caller_id: str = None) -> List[Dict]:
+        return self.rolling.write(session_id, messages, caller_id)
+
+    def cleanup(self, session_id: str, keep_turns: int = 20) -> int:
+        # Legacy rows still expire via TTL; the document trims itself
+        return 0
+
+    def _seed(self, session_id: str, history: List[Dict]):
+        """Create the rolling document from legacy rows if it does not exist yet."""
+        turns = []
+        for m in history:
+            turn = {'role': m['role'], 'ts': m['timestamp']}
+            turn.update(self.rolling.codec.encode(m['content']))
+            turns.append(turn)
+        try:
+            self.rolling.table.put_item(
+                Item={
+                    'caller_id': session_id,
+                    'timestamp': ROLLING_DOC_SORT_KEY,
+                    'turns': turns[-self.rolling.max_messages:],
+                    'turn_count': min(len(turns), self.rolling.max_messages),
+                    'ttl': _ttl(),
+                    'updated_at': datetime.utcnow().isoformat()
+                },
+                ConditionExpression='attribute_not_exists(caller_id)'
+            )
+            logger.info(f"Seeded rolling history for session {session_id} from {len(turns)} legacy rows")
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                logger.error(f"Error seeding rolling history: {str(e)}")
+
+
+def build_history_store(table, layout: str = LAYOUT_PER_TURN, max_messages: int = 40, codec: HistoryCodec = None):
+    """Create the store for the configured HISTORY_STORAGE_LAYOUT (sharing one codec)."""
+    codec = codec or HistoryCodec()
+    if layout == LAYOUT_ROLLING:
+        return RollingDocumentStore(table, max_messages=max_messages, codec=codec)
+    if layout == LAYOUT_MIGRATE:
+        return DualReadStore(
+            RollingDocumentStore(table, max_messages=max_messages, codec=codec),
+            ItemPerTurnStore(table, codec=codec)
+        )
+    if layout != LAYOUT_PER_TURN:
+        logger.warning(f"Unknown HISTORY_STORAGE_LAYOUT '{layout}', using '{LAYOUT_PER_TURN}'")
+    return ItemPerTurnStore(table, codec=codec)
@@ -0,0 +1,237 @@
+"""
+Compiled keyword matching for handover, queue routing and specialized-intent checks.
+
+Every keyword family is compiled once at import into a single word-level trie. A message is
+tokenized once and scanned once; the result lists every matched family, and families carry a
+group and priority so callers can pick the winning category. Matching is on whole words,
+so "id" no longer fires inside "did", "ok" inside "book", or "person" inside "personal".
+A keyword word ending in "*" matches any word starting with it, for verb and noun families
+whose inflections matter ("transfer*" covers transfers, transferring, transferred).
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)*")
+_TERMINAL = None  # trie key holding the families that end at a node (never a token)
+_PREFIXES = '*'   # trie key holding (stem, child) pairs for prefix words (never a token)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; contractions stay whole ("i'm") and possessives drop "'s" ("customer's")."""
+    return [token[:-2] if token.endswith("'s") else token
+            for token in _TOKEN_RE.findall(text.lower().replace('’', "'"))]
+
+
+class KeywordFamily(NamedTuple):
+    name: str
+    group: str
+    priority: int  # lower wins within a group
+    keywords: Tuple[str, ...]
+
+
+class KeywordMatches:
+    """Families matched in one text, with the keywords that matched them."""
+    __slots__ = ('_found', '_families')
+
+    def __init__(self, found: Dict[str, Tuple[str, ...]], families: Dict[str, KeywordFamily]):
+        self._found = found
+        self._families = families
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._found
+
+    def __bool__(self) -> bool:
+        return bool(self._found)
+
+    def keywords(self, name: str) -> Tuple[str, ...]:
+        return self._found.get(name, ())
+
+    def categories(self) -> List[str]:
+        return sorted(self._found, key=lambda name: (self._families[name].group, self._families[name].priority))
+
+    def best(self, group: str) -> Optional[str]:
+        """Highest-priority matched family in a group, or None."""
+        candidates = [name for name in self._found if self._families[name].group == group]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda name: self._families[name].priority)
+
+
+class KeywordMatcher:
+    """
+    Word-level trie over all keyword phrases.
+
+    Usage:
+        matcher = KeywordMatcher(KEYWORD_FAMILIES)
+        matches = matcher.scan("I want to speak to an agent")
+        if "agent_request" in matches: ...
+        intent = matches.best("specialized_intent")
+    """
+
+    def __init__(self, families: Iterable[KeywordFamily]):
+        self.families: Dict[str, KeywordFamily] = {}
+        self._root: Dict = {}
+        self.max_phrase_words = 1
+
+        for family in families:
+            self.families[family.name] = family
+            for keyword in family.keywords:
+                words = keyword.split()
+                if not words:
+                    continue
+                node = self._root
+                for word in words:
+                    stem = tokenize(word.rstrip('*'))[0]
+                    if word.endswith('*'):
+                        node = self._prefix_child(node, stem)
+                    else:
+                        node = node.setdefault(stem, {})
+                node.setdefault(_TERMINAL, []).append((family.name, keyword))
+                self.max_phrase_words = max(self.max_phrase_words, len(words))
+
+        # Repeated checks on the same utterance within an invocation reuse one scan. The handler
+        # calls clear_cache() when the invocation ends, so utterances are not kept across invocations
+        self._cache: Dict[str, KeywordMatches] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def scan_cached(self, text: str) -> KeywordMatches:
+        matches = self._cache.get(text)
+        if matches is None:
+            self.cache_misses += 1
+            matches = self._cache[text] = self.scan(text)
+        else:
+            self.cache_hits += 1
+        return matches
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'entries': len(self._cache)}
+
+    def scan(self, text: str) -> KeywordMatches:
+        tokens = tokenize(text)
+        found: Dict[str, List[str]] = {}
+        for start in range(len(tokens)):
+            nodes = [self._root]
+            for token in tokens[start:start + self.max_phrase_words]:
+                nodes = [child for node in nodes for child in self._children(node, token)]
+                if not nodes:
+                    break
+                for node in nodes:
+                    for name, keyword in node.get(_TERMINAL, ()):
+                        found.setdefault(name, []).append(keyword)
+        return KeywordMatches({name: tuple(keywords) for name, keywords in found.items()}, self.families)
+
+    @staticmethod
+    def _children(node: Dict, token: str) -> List[Dict]:
+        children = [child for stem, child in node.get(_PREFIXES, ()) if token.startswith(stem)]
+        exact = node.get(token)
+        if exact is not None:
+            children.append(exact)
+        return children
+
+    @staticmethod
+    def _prefix_child(node: Dict, stem: str) -> Dict:
+        prefixes = node.setdefault(_PREFIXES, [])
+        for existing, child in prefixes:
+            if existing == stem:
+                return child
+        child: Dict = {}
+        prefixes.append((stem, child))
+        return child
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Keyword families
+# ---------------------------------------------------------------------------------------------------------------------
+
+HANDOVER_USER = 'handover_user'
+HANDOVER_RESPONSE = 'handover_response'
+QUEUE_ROUTING = 'queue_routing'
+SPECIALIZED_INTENT = 'specialized_intent'
+
+KEYWORD_FAMILIES = [
+    # Customer message, checked by detect_handover_need
+    KeywordFamily('transfer_agreement', HANDOVER_USER, 1, (
+        "yes", "yeah", "yep", "sure", "okay", "ok", "go ahead", "please", "transfer*", "connect me"
+    )),
+    KeywordFamily('security_query', HANDOVER_USER, 2, (
+        "system prompt", "internal working", "how do you work", "what are your instructions",
+        "show me your prompt", "reveal your", "tell me about your system", "what tools do you have",
+        "how are you configured", "what model are you", "show me the code", "explain your architecture",
+        "other customer", "another customer", "different customer", "someone else's account"
+    )),
+    KeywordFamily('agent_request', HANDOVER_USER, 3, (
+        "speak to agent", "human*", "person", "representative*", "talk to someone", "speak to an agent",
+        "talk to an agent"
+    )),
+    KeywordFamily('customer_frustration', HANDOVER_USER, 4, (
+        "frustrat*", "annoy*", "useless", "terrible", "awful", "ridiculous"
+    )),
+
+    # Assistant text (previous turn or the model's reply)
+    KeywordFamily('transfer_offer', HANDOVER_RESPONSE, 1, (
+        "transfer*", "specialist*", "connect you with", "speak to", "agent*"
+    )),
+    KeywordFamily('transfer_response', HANDOVER_RESPONSE, 2, (
+        "let me transfer you", "transfer you to a specialist", "connect you to a specialist",
+        "transfer you to an agent", "connect you with a specialist", "connecting you with",
+        "let me connect you", "i'll transfer you", "transferring you"
+    )),
+    KeywordFamily('capability_limitation', HANDOVER_RESPONSE, 3, (
+        "i cannot", "i'm unable", "beyond my capabilities", "i don't have", "i can't help"
+    )),
+
+    # Queue selection for agent handover (checked in this priority order)
+    KeywordFamily('queue_account', QUEUE_ROUTING, 1, (
+        "balance*", "transaction*", "statement*", "overdraft*", "debit card*", "spending", "savings",
+        "checking", "withdraw*", "deposit*", "transfer* money"
+    )),
+    KeywordFamily('queue_lending', QUEUE_ROUTING, 2, (
+        "loan*", "mortgage*", "credit card*", "borrow*", "lending", "rate", "rates", "interest", "repay*",
+        "debt*"
+    )),
+    KeywordFamily('queue_onboarding', QUEUE_ROUTING, 3, (
+        "open account", "new account", "join*", "switch*", "application*", "sign up", "signing up", "register*",
+        "start*", "document*", "id"
+    )),
+
+    # Deterministic intents handed to the BankingBot / SalesBot
+    KeywordFamily('CheckBalance', SPECIALIZED_INTENT, 1, (
+        "balance*", "how much money", "funds available", "account status"
+    )),
+    KeywordFamily('TransferMoney', SPECIALIZED_INTENT, 2, (
+        "transfer*", "send* money", "sent money", "mak* a payment", "made a payment", "pay* someone",
+        "payment to", "paid someone"
+    )),
+    KeywordFamily('GetStatement', SPECIALIZED_INTENT, 3, (
+        "statement*", "transaction*", "recent movements", "history", "last spending"
+    )),
+    KeywordFamily('CancelDirectDebit', SPECIALIZED_INTENT, 4, (
+        "direct debit*",
+    )),
+    KeywordFamily('CancelStandingOrder', SPECIALIZED_INTENT, 5, (
+        "standing order*", "cancel* payment*", "stop* payment*"
+    )),
+    KeywordFamily('ProductInfo', SPECIALIZED_INTENT, 6, (
+        "interest rate*", "loan rate*", "mortgage rate*", "credit card type*", "product details"
+    )),
+    KeywordFamily('Pricing', SPECIALIZED_INTENT, 7, (
+        "fee", "fees", "charg*", "overcharg*", "pricing", "cost", "costs", "costing"
+    )),
+]
+
+# Bot that handles each specialized intent
+SPECIALIZED_INTENT_BOTS = {
+    'CheckBalance': 'BankingBot',
+    'TransferMoney': 'BankingBot',
+    'GetStatement': 'BankingBot',
+    'CancelDirectDebit': 'BankingBot',
+    'CancelStandingOrder': 'BankingBot',
+    'ProductInfo': 'SalesBot',
+    'Pricing': 'SalesBot'
+}
+
+KEYWORDS = KeywordMatcher(KEYWORD_FAMILIES)
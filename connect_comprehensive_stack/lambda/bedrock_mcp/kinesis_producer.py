@@ -0,0 +1,217 @@
+"""
+Buffered Kinesis Data Streams producer.
+
+Records are queued in memory and sent with PutRecords (up to 500 records / 5 MB per call) on a
+single background thread, so the caller never waits for Kinesis. A flush starts when a full batch
+is queued or the oldest queued record has waited flush_interval_seconds (0: at the next
+flush_if_due() call, i.e. one background send per turn that catches up on anything queued).
+
+PutRecords can fail per record (throttling on a hot shard, internal errors): only the failed
+entries are retried, with exponential backoff, up to max_attempts. The queue is bounded; records
+arriving when it is full are dropped and counted, and so are records that run out of attempts.
+
+Optional aggregation packs queued records into newline-delimited Kinesis records of up to
+max_record_bytes, which cuts the per-record shard limit (1000 records/s) and PutRecords entries
+by the number of records packed; optional gzip compression also cuts bytes. Each user record is
+newline-terminated either way, so Firehose's concatenated S3 objects stay valid JSON Lines, but a
+compressed stream needs a consumer that decompresses records before they reach Athena.
+"""
+import gzip
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PUT_RECORDS_MAX_RECORDS = 500
+PUT_RECORDS_MAX_BYTES = 5 * 1024 * 1024
+RECORD_MAX_BYTES = 1024 * 1024          # data + partition key
+
+
+class KinesisProducer:
+    """
+    Queue records and send them in PutRecords batches on a background thread.
+
+    Usage:
+        producer = KinesisProducer(kinesis, 'ai-reporting-stream', flush_interval_seconds=1)
+        producer.put(json.dumps(record) + '\\n', partition_key=session_id)
+        producer.flush_if_due()          # non-blocking; sends on the producer's thread when due
+        producer.drain(timeout=1.0, due_only=True)   # next invocation: finish a frozen send, send what is due
+        producer.drain(timeout=2.0)      # send everything and wait (shutdown)
+    """
+
+    def __init__(self, client, stream_name: str, flush_interval_seconds: float = 0, max_queue: int = 1000,
+                 max_attempts: int = 3, backoff_seconds: float = 0.05, aggregate: bool = False,
+                 compress: bool = False, max_record_bytes: int = RECORD_MAX_BYTES - 1024,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.client = client
+        self.stream_name = stream_name
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.aggregate = aggregate
+        self.compress = compress
+        self.max_record_bytes = max_record_bytes
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # (data, partition key, time queued)
+        self._queue: Deque[Tuple[bytes, str, float]] = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Optional[Future] = None
+        self.stats_counters = {
+            'queued': 0, 'dropped_queue_full': 0, 'dropped_oversize': 0, 'put_calls': 0, 'sent_records': 0, 'sent_bytes': 0,
+            'kinesis_records': 0, 'retried_records': 0, 'failed_records': 0
+        }
+
+    def put(self, data: Union[str, bytes], partition_key: str) -> bool:
+        """Queue one record. Returns False if it was dropped (queue full, or larger than Kinesis accepts)."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._lock:
+            if len(data) + len(partition_key.encode('utf-8')) > RECORD_MAX_BYTES:
+                self.stats_counters['dropped_oversize'] += 1
+                return False
+            if len(self._queue) >= self.max_queue:
+                self.stats_counters['dropped_queue_full'] += 1
+                return False
+            self._queue.append((data, partition_key, self._clock()))
+            self.stats_counters['queued'] += 1
+        return True
+
+    def flush_if_due(self) -> bool:
+        """Start a background send if a full batch is queued or the oldest record is due."""
+        with self._lock:
+            if not self._due():
+                return False
+            if self._in_flight is not None and not self._in_flight.done():
+                # A running send keeps going until the queue is empty
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kinesis-producer')
+            self._in_flight = self._executor.submit(self._send_queued)
+        return True
+
+    def drain(self, timeout: float = None, due_only: bool = False) -> int:
+        """
+        Wait up to timeout for a background send, then send the queue on the calling thread (with
+        due_only, only if a flush is due). Returns the number of records still queued.
+        """
+        in_flight = self._in_flight
+        if in_flight is not None:
+            wait([in_flight], timeout=timeout)
+        with self._lock:
+            send = self._due() if due_only else bool(self._queue)
+        if send:
+            # On the calling thread: the executor may already be shut down (atexit)
+            self._send_queued()
+        return self.pending
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.stats_counters, pending=len(self._queue))
+
+    # -----------------------------------------------------------------------------------------------------------------
+
+    def _due(self) -> bool:
+        """Caller holds the lock."""
+        return bool(self._queue) and (len(self._queue) >= PUT_RECORDS_MAX_RECORDS
+                                      or self._clock() - self._queue[0][2] >= self.flush_interval_seconds)
+
+    def _send_queued(self):
+        while True:
+            with self._lock:
+                items = [self._queue.popleft() for _ in range(min(len(self._queue), PUT_RECORDS_MAX_RECORDS))]
+            if not items:
+                return
+            entries = self._entries([(data, key) for data, key, _ in items])
+            self._put_with_retries(entries)
+
+    def _entries(self, items: List[Tuple[bytes, str]]) -> List[Dict[str, Any]]:
+        """PutRecords entries, packing records together when aggregation is on."""
+        if not self.aggregate:
+            return [{'Data': self._encode(data), 'PartitionKey': key, '_records': 1} for data, key in items]
+        entries, chunk, size = [], [], 0
+        for data, key in items:
+            if chunk and size + len(data) > self.max_record_bytes:
+                entries.append(self._packed(chunk))
+                chunk, size = [], 0
+            chunk.append((data, key))
+            size += len(data)
+        if chunk:
+            entries.append(self._packed(chunk))
+        return entries
+
+    def _packed(self, chunk: List[Tuple[bytes, str]]) -> Dict[str, Any]:
+        # Records already end in a newline; the first record's key picks the shard
+        data = b''.join(d if d.endswith(b'\n') else d + b'\n' for d, _ in chunk)
+        return {'Data': self._encode(data), 'PartitionKey': chunk[0][1], '_records': len(chunk)}
+
+    def _encode(self, data: bytes) -> bytes:
+        return gzip.compress(data) if self.compress else data
+
+    def _put_with_retries(self, entries: List[Dict[str, Any]]):
+        attempt = 0
+        while entries:
+            attempt += 1
+            failed: List[Dict[str, Any]] = []
+            for batch in self._batches(entries):
+                try:
+                    response = self.client.put_records(
+                        StreamName=self.stream_name,
+                        Records=[{'Data': e['Data'], 'PartitionKey': e['PartitionKey']} for e in batch]
+                    )
+                except Exception as e:
+                    logger.warning(f"[KINESIS] PutRecords failed for {len(batch)} records: {str(e)}")
+                    failed.extend(batch)
+                    continue
+                self._count('put_calls', 1)
+                if response.get('FailedRecordCount'):
+                    for entry, result in zip(batch, response['Records']):
+                        if result.get('ErrorCode'):
+                            failed.append(entry)
+                        else:
+                            self._sent(entry)
+                else:
+                    for entry in batch:
+                        self._sent(entry)
+            if not failed:
+                return
+            if attempt >= self.max_attempts:
+                lost = sum(e['_records'] for e in failed)
+                self._count('failed_records', lost)
+                logger.error(f"[KINESIS] Dropped {lost} records after {attempt} attempts")
+                return
+            self._count('retried_records', sum(e['_records'] for e in failed))
+            self._sleep(self.backoff_seconds * (2 ** (attempt - 1)))
+            entries = failed
+
+    @staticmethod
+    def _batches(entries: List[Dict[str, Any]]):
+        batch, size = [], 0
+        for entry in entries:
+            entry_size = len(entry['Data']) + len(entry['PartitionKey'].encode('utf-8'))
+            if batch and (len(batch) >= PUT_RECORDS_MAX_RECORDS or size + entry_size > PUT_RECORDS_MAX_BYTES):
+                yield batch
+                batch, size = [], 0
+            batch.append(entry)
+            size += entry_size
+        if batch:
+            yield batch
+
+    def _sent(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.stats_counters['sent_records'] += entry['_records']
+            self.stats_counters['kinesis_records'] += 1
+            self.stats_counters['sent_bytes'] += len(entry['Data'])
+
+    def _count(self, name: str, value: int):
+        with self._lock:
+            self.stats_counters[name] += value
@@ -0,0 +1,242 @@
+"""
+Buffered metric publication for the ValidationAgent.
+
+Every validated turn records a handful of metrics. Instead of a synchronous PutMetricData call per
+turn, a sink aggregates them in memory - per metric, dimension set and minute, as value -> count -
+and publishes the aggregate when a flush is due:
+
+    emf              - EMF log lines (metric value arrays, up to 100 values each). No API call at all;
+                       CloudWatch Logs extracts the metrics on ingestion. The default.
+    put_metric_data  - PutMetricData on a background thread, batching every buffered metric into as
+                       few calls as possible, as Values/Counts arrays or (statistic_sets=True) as
+                       StatisticValues.
+
+Either way the published statistics (Average, Sum, SampleCount, Min/Max and, for value arrays,
+percentiles) match the per-turn calls. Samples are bucketed by the minute they were recorded in
+and published with that timestamp, so a flush interval does not move data between periods.
+
+Flushes happen from flush_if_due() (called after recording, it only acts once the interval has
+elapsed or the buffer is full) and from shutdown(). Samples buffered when a container is reclaimed
+without a shutdown signal are lost; keep the interval short relative to the alarm periods.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from emf import build_emf_record
+
+logger = logging.getLogger(__name__)
+
+EMF_MAX_VALUES = 100             # values per metric in one EMF record
+PUT_MAX_VALUES = 150             # distinct values per PutMetricData datum
+PUT_MAX_DATUMS = 1000            # datums per PutMetricData request
+
+# (metric name, unit, sorted dimension items, minute start in epoch seconds)
+MetricKey = Tuple[str, str, Tuple[Tuple[str, str], ...], int]
+
+
+class _BufferedSink:
+    """Aggregation and flush scheduling shared by the sinks; subclasses implement _publish()."""
+
+    def __init__(self, namespace: str, flush_interval_seconds: float = 10, max_samples: int = 10000,
+                 clock: Callable[[], float] = time.time):
+        self.namespace = namespace
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_samples = max_samples
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buffer: Dict[MetricKey, Dict[float, int]] = {}
+        self._samples = 0
+        self._last_flush = clock()
+        self.stats_counters = {'samples': 0, 'flushes': 0, 'published_samples': 0, 'publish_failures': 0,
+                               'dropped_samples': 0}
+
+    def record(self, name: str, value: float, unit: str = 'None', dimensions: Dict[str, str] = None):
+        now = self._clock()
+        key = (name, unit, tuple(sorted((dimensions or {}).items())), int(now // 60) * 60)
+        with self._lock:
+            values = self._buffer.setdefault(key, {})
+            values[value] = values.get(value, 0) + 1
+            self._samples += 1
+            self.stats_counters['samples'] += 1
+
+    def flush_if_due(self) -> bool:
+        """Flush if the interval has elapsed or the buffer is full. Returns True if a flush was started."""
+        if not self._samples:
+            return False
+        if self._samples < self.max_samples and self._clock() - self._last_flush < self.flush_interval_seconds:
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        snapshot = self._take()
+        if snapshot:
+            self._publish(snapshot)
+
+    def shutdown(self, timeout: float = None):
+        self.flush()
+
+    def wait(self, timeout: float = None):
+        """Wait for a flush started in the background (EMF writes synchronously, so nothing to wait for)."""
+
+    @property
+    def buffered(self) -> int:
+        return self._samples
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.stats_counters, buffered=self._samples)
+
+    def _take(self) -> Dict[MetricKey, Dict[float, int]]:
+        with self._lock:
+            snapshot, self._buffer = self._buffer, {}
+            self._samples = 0
+            self._last_flush = self._clock()
+            if snapshot:
+                self.stats_counters['flushes'] += 1
+        return snapshot
+
+    def _publish(self, snapshot: Dict[MetricKey, Dict[float, int]]):
+        raise NotImplementedError
+
+
+class EmfMetricsSink(_BufferedSink):
+    """
+    Aggregates metrics and writes them as EMF records (one per dimension set and minute).
+
+    Usage:
+        sink = EmfMetricsSink('BedrockValidation', flush_interval_seconds=10)
+        sink.record('ValidationLatency', 12, 'Milliseconds')
+        sink.record('HallucinationDetectionRate', 0, 'Count', {'Severity': 'none'})
+        sink.flush_if_due()
+    """
+
+    def __init__(self, namespace: str, stream=None, **kwargs):
+        super().__init__(namespace, **kwargs)
+        self._stream = stream
+
+    def _publish(self, snapshot: Dict[MetricKey, Dict[float, int]]):
+        # Group metrics that share dimensions and minute into records; a metric with more than
+        # EMF_MAX_VALUES samples continues in further records
+        groups: Dict[Tuple, List[Tuple[str, str, List[float]]]] = {}
+        for (name, unit, dimensions, minute), counts in snapshot.items():
+            values = [value for value, count in counts.items() for _ in range(count)]
+            groups.setdefault((dimensions, minute), []).append((name, unit, values))
+
+        out = self._stream or sys.stdout
+        published = 0
+        for (dimensions, minute), metrics in groups.items():
+            offset = 0
+            while True:
+                chunk = {name: (values[offset:offset + EMF_MAX_VALUES], unit) for name, unit, values in metrics
+                         if len(values) > offset}
+                if not chunk:
+                    break
+                record = build_emf_record(self.namespace, chunk, dict(dimensions), timestamp_ms=minute * 1000)
+                out.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
+                published += sum(len(values) for values, _ in chunk.values())
+                offset += EMF_MAX_VALUES
+        out.flush()
+        self.stats_counters['published_samples'] += published
+
+
+class PutMetricDataSink(_BufferedSink):
+    """
+    Aggregates metrics and publishes them with batched PutMetricData calls on a background thread.
+
+    Usage:
+        sink = PutMetricDataSink('BedrockValidation', cloudwatch, flush_interval_seconds=30)
+        sink.record('ValidationLatency', 12, 'Milliseconds')
+        sink.flush_if_due()            # returns immediately; the calls run on the sink's thread
+        sink.shutdown(timeout=2.0)     # final synchronous flush
+    """
+
+    def __init__(self, namespace: str, cloudwatch, statistic_sets: bool = False, **kwargs):
+        super().__init__(namespace, **kwargs)
+        self._cloudwatch = cloudwatch
+        self.statistic_sets = statistic_sets
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = None
+        self.stats_counters['put_calls'] = 0
+
+    def flush(self):
+        """Hand the buffered metrics to the background thread."""
+        snapshot = self._take()
+        if not snapshot:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metrics-sink')
+            self._in_flight = self._executor.submit(self._publish, snapshot)
+
+    def wait(self, timeout: float = None):
+        in_flight = self._in_flight
+        if in_flight is not None:
+            try:
+                in_flight.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"[METRICS] Background flush did not complete: {str(e)}")
+
+    def shutdown(self, timeout: float = None):
+        """Wait for the background flush, then publish what is left on the calling thread."""
+        self.wait(timeout)
+        # The executor may already be shut down (atexit), so the final flush does not use it
+        snapshot = self._take()
+        if snapshot:
+            self._publish(snapshot)
+
+    def datums(self, snapshot: Dict[MetricKey, Dict[float, int]]) -> List[Dict[str, Any]]:
+        datums = []
+        for (name, unit, dimensions, minute), counts in snapshot.items():
+            base = {'MetricName': name, 'Unit': unit, 'Timestamp': minute,
+                    'Dimensions': [{'Name': k, 'Value': v} for k, v in dimensions]}
+            if self.statistic_sets:
+                values = list(counts)
+                datums.append(dict(base, StatisticValues={
+                    'SampleCount': float(sum(counts.values())),
+                    'Sum': float(sum(value * count for value, count in counts.items())),
+                    'Minimum': float(min(values)),
+                    'Maximum': float(max(values))
+                }))
+                continue
+            items = list(counts.items())
+            for start in range(0, len(items), PUT_MAX_VALUES):
+                chunk = items[start:start + PUT_MAX_VALUES]
+                datums.append(dict(base, Values=[float(v) for v, _ in chunk], Counts=[float(c) for _, c in chunk]))
+        return datums
+
+    def _publish(self, snapshot: Dict[MetricKey, Dict[float, int]]):
+        datums = self.datums(snapshot)
+        for start in range(0, len(datums), PUT_MAX_DATUMS):
+            batch = datums[start:start + PUT_MAX_DATUMS]
+            samples = int(sum(d['StatisticValues']['SampleCount'] if 'StatisticValues' in d else sum(d['Counts'])
+                              for d in batch))
+            try:
+                self._cloudwatch.put_metric_data(Namespace=self.namespace, MetricData=batch)
+            except Exception as e:
+                with self._lock:
+                    self.stats_counters['publish_failures'] += 1
+                    self.stats_counters['dropped_samples'] += samples
+                logger.error(f"[METRICS] PutMetricData failed, dropped {samples} samples: {str(e)}")
+                continue
+            with self._lock:
+                self.stats_counters['put_calls'] += 1
+                self.stats_counters['published_samples'] += samples
+
+
+METRICS_SINKS = ('emf', 'put_metric_data')
+
+
+def build_metrics_sink(kind: str, namespace: str, cloudwatch=None, flush_interval_seconds: float = 10,
+                       statistic_sets: bool = False) -> _BufferedSink:
+    """Sink by name (see METRICS_SINKS); unknown names fall back to EMF."""
+    if kind == 'put_metric_data':
+        return PutMetricDataSink(namespace, cloudwatch, statistic_sets=statistic_sets,
+                                 flush_interval_seconds=flush_interval_seconds)
+    if kind != 'emf':
+        logger.warning(f"[METRICS] Unknown metrics sink '{kind}', using emf")
+    return EmfMetricsSink(namespace, flush_interval_seconds=flush_interval_seconds)
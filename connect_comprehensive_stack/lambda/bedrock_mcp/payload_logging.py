@@ -0,0 +1,131 @@
+"""
+Sampled, size-capped logging of large payloads (Lex events, Bedrock responses, Lex replies).
+
+Most turns log a redacted preview built by walking only the first few keys/items of the payload,
+so the cost is bounded by the preview size rather than the payload size. A deterministic share of
+sessions (hash of the session ID) logs full redacted payloads for every turn of the call, so a
+sampled conversation can be followed end to end. Formatting is lazy: nothing is built unless the
+log level is enabled.
+"""
+import json
+import logging
+import re
+import zlib
+from typing import Any, Dict, Iterable, Optional
+
+# Keys whose values are never logged (caller identity)
+DEFAULT_REDACT_KEYS = frozenset([
+    'customer_number', 'customerphonenumber', 'address', 'caller_id', 'phone_number', 'phonenumber'
+])
+# Long digit runs (card, account and phone numbers) keep only their last 4 digits
+_DIGIT_RUN_RE = re.compile(r'(?<!\d)\d{4,}(\d{4})(?!\d)')
+_HAS_DIGIT_RUN = re.compile(r'\d{8}').search
+
+
+def mask_digits(text: str) -> str:
+    return _DIGIT_RUN_RE.sub(lambda m: '*' * (len(m.group(0)) - 4) + m.group(1), text)
+
+
+def redact(value: Any, redact_keys: Iterable[str] = DEFAULT_REDACT_KEYS) -> Any:
+    """Deep copy of a JSON-like value with identity keys replaced and digit runs masked."""
+    if isinstance(value, dict):
+        return {k: '[REDACTED]' if str(k).lower() in redact_keys else redact(v, redact_keys) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, redact_keys) for v in value]
+    if isinstance(value, str):
+        return mask_digits(value) if _HAS_DIGIT_RUN(value) else value
+    return value
+
+
+def preview(value: Any, max_string: int = 80, max_items: int = 6, max_depth: int = 6,
+            redact_keys: Iterable[str] = DEFAULT_REDACT_KEYS) -> Any:
+    """Redacted outline of a payload: long strings cut, containers limited to their first items."""
+    if isinstance(value, str):
+        text = value if len(value) <= max_string else value[:max_string] + f'...(+{len(value) - max_string} chars)'
+        return mask_digits(text) if _HAS_DIGIT_RUN(text) else text
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        if max_depth <= 0:
+            return f'{{...{len(value)} keys}}'
+        out = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i >= max_items:
+                out['...'] = f'{len(value) - max_items} more keys'
+                break
+            out[k] = '[REDACTED]' if str(k).lower() in redact_keys else preview(v, max_string, max_items, max_depth - 1, redact_keys)
+        return out
+    if isinstance(value, (list, tuple)):
+        if max_depth <= 0:
+            return f'[...{len(value)} items]'
+        out = [preview(v, max_string, max_items, max_depth - 1, redact_keys) for v in value[:max_items]]
+        if len(value) > max_items:
+            out.append(f'...{len(value) - max_items} more items')
+        return out
+    return str(value)[:max_string]
+
+
+class _Deferred:
+    """Formats on str(); logging only calls str() when the record is actually emitted."""
+    __slots__ = ('_fn',)
+
+    def __init__(self, fn):
+        self._fn = fn
+
+    def __str__(self) -> str:
+        return self._fn()
+
+
+class PayloadLogger:
+    """
+    Payload logging with per-session deterministic sampling.
+
+    Usage:
+        PAYLOAD_LOG = PayloadLogger(logger, sample_rate=0.01, max_chars=512)
+        PAYLOAD_LOG.begin(session_id)                  # once per invocation
+        PAYLOAD_LOG.log("Received event", event)       # preview, or full payload for sampled sessions
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rate: float = 0.01, max_chars: int = 512,
+                 redact_keys: Iterable[str] = DEFAULT_REDACT_KEYS, full_at_debug: bool = True):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.max_chars = max_chars
+        self.redact_keys = frozenset(k.lower() for k in redact_keys)
+        self.full_at_debug = full_at_debug
+        self.session_sampled = False
+        self.stats_counters = {'full': 0, 'preview': 0, 'skipped': 0}
+
+    def is_sampled(self, session_id: Optional[str]) -> bool:
+        """Same answer for every turn of a session, so sampled calls are logged completely."""
+        if self.sample_rate <= 0 or not session_id:
+            return False
+        if self.sample_rate >= 1:
+            return True
+        return zlib.crc32(session_id.encode('utf-8')) % 10000 < self.sample_rate * 10000
+
+    def begin(self, session_id: Optional[str]):
+        self.session_sampled = self.is_sampled(session_id)
+
+    def log(self, label: str, payload: Any, level: int = logging.INFO):
+        if not self.logger.isEnabledFor(level):
+            self.stats_counters['skipped'] += 1
+            return
+        if self.session_sampled or (self.full_at_debug and self.logger.isEnabledFor(logging.DEBUG)):
+            self.stats_counters['full'] += 1
+            self.logger.log(level, "%s [full]: %s", label, _Deferred(lambda: self._full(payload)))
+        else:
+            self.stats_counters['preview'] += 1
+            self.logger.log(level, "%s [preview]: %s", label, _Deferred(lambda: self._preview(payload)))
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.stats_counters)
+
+    def _full(self, payload: Any) -> str:
+        return json.dumps(redact(payload, self.redact_keys), default=str, separators=(',', ':'))
+
+    def _preview(self, payload: Any) -> str:
+        text = json.dumps(preview(payload, redact_keys=self.redact_keys), default=str, separators=(',', ':'))
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + '...(truncated)'
+        return text
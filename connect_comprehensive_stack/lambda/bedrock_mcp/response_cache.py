@@ -0,0 +1,274 @@
+"""
+Response cache for opening questions.
+
+Callers often open with near-identical questions ("I want to open an account"). While the
+conversation has no real history, the answer depends only on the utterance and a small state
+fingerprint (first message or not, last_action/bot_source memory, tool data versions), so a
+validated answer can be replayed instead of calling Bedrock again.
+
+Lookup order: exact match on the normalized utterance, then (optionally) embedding similarity
+within the same fingerprint, then (optionally) a DynamoDB second tier shared across containers.
+Entries carry the ValidationAgent result they were stored with.
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from keyword_matcher import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words that don't change what is being asked. "ok"/"okay" (agreeing to an offer) and "you" ("can you",
+# "do you") do, so they are kept; "you" is only dropped as part of "thank you"
+_FILLER_WORDS = frozenset([
+    'hi', 'hello', 'hey', 'please', 'um', 'uh', 'er', 'erm', 'so', 'just', 'well',
+    'thanks', 'thank', 'emma', 'there', 'yeah', 'like'
+])
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase word tokens without punctuation or filler words ("Hi, I want to open an account!")."""
+    tokens = tokenize(text)
+    return ' '.join(token for i, token in enumerate(tokens)
+                    if token not in _FILLER_WORDS and not (token == 'you' and i and tokens[i - 1] == 'thank'))
+
+
+def state_fingerprint(is_first_message: bool, session_attributes: Dict[str, str] = None, *versions: Any) -> str:
+    """Everything besides the utterance that can change the answer."""
+    session_attributes = session_attributes or {}
+    parts = [
+        'first' if is_first_message else 'continuing',
+        session_attributes.get('last_action') or '',
+        session_attributes.get('bot_source') or ''
+    ] + [str(v) for v in versions]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def is_trivial_history(conversation_history: List[Dict]) -> bool:
+    """True if the caller hasn't said anything yet (empty history or only the silence/introduction exchange)."""
+    return all(msg.get('role') != 'user' or msg.get('content') == '[silence]' for msg in conversation_history)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedding: hashed word unigrams + bigrams, L2-normalized.
+    Good enough to match reorderings and small wording changes of short utterances.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> Dict[int, float]:
+        tokens = text.split()
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector: Dict[int, float] = {}
+        for feature in features:
+            slot = zlib.crc32(feature.encode('utf-8')) % self.dimensions
+            vector[slot] = vector.get(slot, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {slot: v / norm for slot, v in vector.items()}
+
+    @staticmethod
+    def similarity(a: Dict[int, float], b: Dict[int, float]) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(slot, 0.0) for slot, v in a.items())
+
+
+class BedrockEmbedder:
+    """Titan text embeddings via bedrock-runtime InvokeModel (one extra call per cache lookup)."""
+
+    def __init__(self, client, model_id: str = 'amazon.titan-embed-text-v2:0', dimensions: int = 256):
+        self.client = client
+        self.model_id = model_id
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> List[float]:
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            body=json.dumps({'inputText': text, 'dimensions': self.dimensions, 'normalize': True})
+        )
+        return json.loads(response['body'].read())['embedding']
+
+    @staticmethod
+    def similarity(a: List[float], b: List[float]) -> float:
+        return sum(x * y for x, y in zip(a, b))
+
+
+class DynamoResponseCacheTier:
+    """
+    Second tier shared by all containers: one item per cache key.
+    Table: partition key `cache_key` (S); enable DynamoDB TTL on `expires_at`.
+    """
+
+    def __init__(self, table, ttl_seconds: int):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={'cache_key': cache_key}).get('Item')
+        if not item or int(item.get('expires_at', 0)) < time.time():
+            return None
+        return json.loads(item['entry'])
+
+    def put(self, cache_key: str, entry: Dict[str, Any]):
+        self.table.put_item(Item={
+            'cache_key': cache_key,
+            'entry': json.dumps(entry, separators=(',', ':')),
+            'expires_at': int(time.time()) + self.ttl_seconds
+        })
+
+
+class ResponseCache:
+    """
+    In-memory LRU/TTL cache of validated answers, with optional similarity lookup and second tier.
+
+    Usage:
+        cache = ResponseCache(max_entries=500, ttl_seconds=3600, embedder=HashingEmbedder())
+        fingerprint = state_fingerprint(is_first_message, session_attributes, TOOL_CATALOGUE.version)
+        hit = cache.get(utterance, fingerprint)          # {'response_text', 'validation', ..., 'match'}
+        cache.put(utterance, fingerprint, response_text, validation_details)
+    """
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: int = 3600, embedder=None,
+                 similarity_threshold: float = 0.9, second_tier: DynamoResponseCacheTier = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.second_tier = second_tier
+        self._clock = clock
+        self._lock = threading.RLock()
+        # cache key -> (expires_at, fingerprint, embedding, entry)
+        self._entries: 'OrderedDict[str, Tuple[float, str, Any, Dict[str, Any]]]' = OrderedDict()
+
+        self.stats_counters = {
+            'exact_hits': 0, 'similar_hits': 0, 'tier2_hits': 0, 'misses': 0,
+            'bypasses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0, 'errors': 0
+        }
+
+    @staticmethod
+    def cache_key(normalized: str, fingerprint: str) -> str:
+        return f"{fingerprint}:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+    def get(self, utterance: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        normalized = normalize_utterance(utterance)
+        if not normalized:
+            return None
+        key = self.cache_key(normalized, fingerprint)
+        now = self._clock()
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats_counters['exact_hits'] += 1
+                    return dict(cached[3], match='exact')
+                del self._entries[key]
+                self.stats_counters['expirations'] += 1
+
+        embedding = None
+        if self.embedder is not None:
+            try:
+                embedding = self.embedder.embed(normalized)
+                hit = self._similar(embedding, fingerprint, now)
+                if hit is not None:
+                    return hit
+            except Exception as e:
+                self.stats_counters['errors'] += 1
+                logger.warning(f"[RESPONSE CACHE] Similarity lookup failed: {str(e)}")
+
+        if self.second_tier is not None:
+            try:
+                entry = self.second_tier.get(key)
+                if entry is not None:
+                    self._store(key, fingerprint, embedding, entry, now)
+                    self.stats_counters['tier2_hits'] += 1
+                    return dict(entry, match='tier2')
+            except Exception as e:
+                self.stats_counters['errors'] += 1
+                logger.warning(f"[RESPONSE CACHE] Second tier read failed: {str(e)}")
+
+        self.stats_counters['misses'] += 1
+        return None
+
+    def put(self, utterance: str, fingerprint: str, response_text: str, validation: Dict[str, Any],
+            metadata: Dict[str, Any] = None):
+        normalized = normalize_utterance(utterance)
+        if not normalized or not response_text:
+            return
+        key = self.cache_key(normalized, fingerprint)
+        entry = {
+            'utterance': normalized,
+            'response_text': response_text,
+            'validation': {
+                'severity': validation.get('severity', 'none'),
+                'confidence_score': validation.get('confidence_score', 1.0),
+                'checks_performed': validation.get('checks_performed', [])
+            },
+            'metadata': metadata or {}
+        }
+
+        embedding = None
+        if self.embedder is not None:
+            try:
+                embedding = self.embedder.embed(normalized)
+            except Exception as e:
+                self.stats_counters['errors'] += 1
+                logger.warning(f"[RESPONSE CACHE] Embedding failed, storing exact key only: {str(e)}")
+
+        self._store(key, fingerprint, embedding, entry, self._clock())
+        self.stats_counters['stores'] += 1
+
+        if self.second_tier is not None:
+            try:
+                self.second_tier.put(key, entry)
+            except Exception as e:
+                self.stats_counters['errors'] += 1
+                logger.warning(f"[RESPONSE CACHE] Second tier write failed: {str(e)}")
+
+    def record_bypass(self):
+        self.stats_counters['bypasses'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self.stats_counters)
+        hits = counters['exact_hits'] + counters['similar_hits'] + counters['tier2_hits']
+        lookups = hits + counters['misses']
+        counters['entries'] = len(self._entries)
+        counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return counters
+
+    def _similar(self, embedding, fingerprint: str, now: float) -> Optional[Dict[str, Any]]:
+        best_key, best_score = None, self.similarity_threshold
+        with self._lock:
+            for key, (expires_at, entry_fingerprint, entry_embedding, _) in self._entries.items():
+                if entry_fingerprint != fingerprint or entry_embedding is None or expires_at <= now:
+                    continue
+                score = self.embedder.similarity(embedding, entry_embedding)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.stats_counters['similar_hits'] += 1
+            return dict(self._entries[best_key][3], match='similar', similarity=round(best_score, 4))
+
+    def _store(self, key: str, fingerprint: str, embedding, entry: Dict[str, Any], now: float):
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, fingerprint, embedding, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats_counters['evictions'] += 1
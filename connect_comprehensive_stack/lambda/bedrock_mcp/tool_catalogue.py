@@ -0,0 +1,174 @@
+"""
+Precomputed results for the static banking tools.
+
+The branch/digital account-opening and debit-card tools return fixed content that depends only on
+one enum argument. The content lives in a versioned data file (tool_catalogue.json) and every
+result is serialized once, as compact JSON, when the catalogue is loaded - a tool call is then a
+dict lookup. The catalogue can be reloaded in place from a local file or an S3 object; a reload
+only rebuilds the results when the ETag (content hash for local files) changes. If the configured
+source cannot be loaded at start-up, the bundled tool_catalogue.json is served instead and the
+source is retried on the next reload. An s3:// source needs s3:GetObject on the Lambda role.
+
+Data file layout, per tool:
+    argument  - name of the enum argument (e.g. account_type)
+    default   - value used when the argument is missing or not in `variants`
+    response  - the result object; null fields are filled from the matching variant, and the
+                argument field is set to the value the model passed
+    variants  - value -> fields that differ per value
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOGUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tool_catalogue.json')
+
+
+def serialize_tool_result(result: Any) -> str:
+    """Compact JSON used for tool results (no indentation; £ etc. left unescaped to save tokens)."""
+    return json.dumps(result, separators=(',', ':'), ensure_ascii=False)
+
+
+class ToolCatalogue:
+    """
+    Loads the tool catalogue once and serves pre-serialized results.
+
+    Usage:
+        catalogue = ToolCatalogue()                        # packaged tool_catalogue.json
+        catalogue = ToolCatalogue('s3://bucket/tools.json', reload_interval_seconds=300)
+        text = catalogue.render('get_debit_card_info', {'card_type': 'premium'})
+        catalogue.maybe_reload()                           # cheap; re-fetches at most once per interval
+    """
+
+    def __init__(self, source: str = None, reload_interval_seconds: float = 0, s3_client=None,
+                 clock=time.monotonic):
+        self.source = source or DEFAULT_CATALOGUE_PATH
+        self.reload_interval_seconds = reload_interval_seconds
+        self._s3_client = s3_client
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_check = clock()
+
+        self.version: Optional[str] = None
+        self.etag: Optional[str] = None
+        self.reloads = 0
+        # tool name -> (definition, {argument value -> serialized result})
+        self._tools: Dict[str, Tuple[Dict[str, Any], Dict[str, str]]] = {}
+
+        try:
+            self.load()
+        except Exception as e:
+            if self.source == DEFAULT_CATALOGUE_PATH:
+                raise
+            logger.error(f"[TOOL CATALOGUE] Could not load {self.source}, using the bundled catalogue: {str(e)}")
+            with open(DEFAULT_CATALOGUE_PATH, 'rb') as f:
+                self._install(f.read(), None, DEFAULT_CATALOGUE_PATH)
+
+    def has_tool(self, name: str) -> bool:
+        return name in self._tools
+
+    def render(self, name: str, args: Dict[str, Any]) -> str:
+        """Return the serialized result for a catalogue tool."""
+        definition, results = self._tools[name]
+        value = args.get(definition['argument'], definition['default'])
+        cached = results.get(value)
+        if cached is not None:
+            return cached
+        # Unknown enum value: default content, but echo the value the model asked for
+        return serialize_tool_result(self._build(definition, value, definition['default']))
+
+    def load(self, force: bool = False) -> bool:
+        """
+        Fetch the data file and swap in new results if its ETag changed.
+        Returns True if the catalogue was (re)built.
+        """
+        raw, etag = self._fetch(None if force else self.etag)
+        if raw is None:
+            return False
+        self._install(raw, etag, self.source)
+        return True
+
+    def _install(self, raw: bytes, etag: Optional[str], origin: str):
+        document = json.loads(raw)
+        version = document.get('version')
+
+        tools = {}
+        for name, definition in document.get('tools', {}).items():
+            results = {
+                value: serialize_tool_result(self._build(definition, value, value))
+                for value in definition['variants']
+            }
+            tools[name] = (definition, results)
+
+        with self._lock:
+            self._tools = tools
+            self.version = version
+            self.etag = etag
+            self.reloads += 1
+        logger.info(f"[TOOL CATALOGUE] Loaded version {version} ({len(tools)} tools) from {origin}")
+
+    def maybe_reload(self) -> bool:
+        """Reload if the reload interval has elapsed; errors keep the current catalogue."""
+        if self.reload_interval_seconds <= 0:
+            return False
+        now = self._clock()
+        if now - self._last_check < self.reload_interval_seconds:
+            return False
+        self._last_check = now
+        try:
+            return self.load()
+        except Exception as e:
+            logger.warning(f"[TOOL CATALOGUE] Reload failed, keeping version {self.version}: {str(e)}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'source': self.source,
+            'version': self.version,
+            'etag': self.etag,
+            'reloads': self.reloads,
+            'tools': {name: sorted(results) for name, (_, results) in self._tools.items()}
+        }
+
+    @staticmethod
+    def _build(definition: Dict[str, Any], echo_value: Any, variant_value: Any) -> Dict[str, Any]:
+        response = dict(definition['response'])
+        response.update(definition['variants'][variant_value])
+        response[definition['argument']] = echo_value
+        return response
+
+    def _fetch(self, known_etag: Optional[str]) -> Tuple[Optional[bytes], Optional[str]]:
+        """Return (raw bytes, etag), or (None, etag) if unchanged since known_etag."""
+        if self.source.startswith('s3://'):
+            return self._fetch_s3(known_etag)
+
+        with open(self.source, 'rb') as f:
+            raw = f.read()
+        etag = hashlib.sha256(raw).hexdigest()
+        if etag == known_etag:
+            return None, etag
+        return raw, etag
+
+    def _fetch_s3(self, known_etag: Optional[str]) -> Tuple[Optional[bytes], Optional[str]]:
+        from botocore.exceptions import ClientError
+
+        if self._s3_client is None:
+            from aws_clients import get_client
+            self._s3_client = get_client('s3')
+
+        bucket, _, key = self.source[len('s3://'):].partition('/')
+        request = {'Bucket': bucket, 'Key': key}
+        if known_etag:
+            request['IfNoneMatch'] = known_etag
+        try:
+            response = self._s3_client.get_object(**request)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return None, known_etag
+            raise
+        return response['Body'].read(), response.get('ETag')
@@ -0,0 +1,251 @@
+"""
+Typed facts extracted from a turn's tool results, for the validation checks.
+
+Tool results reach the validator as Converse toolResult blocks whose text is itself a JSON
+document, so json.dumps of the whole payload escapes it twice ('£' becomes '\\u00a3', quotes
+gain backslashes) and nested fields such as documents_required are invisible to a top-level
+lookup. ToolFacts walks the payload once - decoding each embedded JSON document and re-serializing
+it without ASCII escapes - and collects normalized sets of the entities the checks compare against:
+
+    phones     - UK phone numbers in E.164 form ('020 1234 5678' -> '+442012345678')
+    postcodes  - UK postcodes, upper-case with one space ('ec1a1bb' -> 'EC1A 1BB')
+    amounts    - sterling amounts as decimal strings ('£1,000' -> '1000.00')
+    documents  - lower-cased documents_required entries, one per line
+    branches   - branch names from branches lists, lower-cased without a trailing 'Branch'
+    text       - the tool output, lower-cased, with embedded JSON unescaped
+
+A response entity is then checked by normalizing it the same way and testing set membership, so
+'+44 20 1234 5678' in a reply matches '020 1234 5678' in the tool data, and '£25' matches an
+amount of £25 or £25.00 but not the '£25' prefix of '£250'. Branch names are looser: a shortened
+name ('Manchester Branch') matches a tool branch whose name contains all its words, and generic
+names made only of words like 'main' or 'central' ('The Main Branch') name no branch and are skipped.
+
+Facts are extracted per tool output document and cached on the document text: catalogue tools
+return the same pre-serialized string every time, and branch searches repeat for common
+locations, so most turns only pay for the cache lookup.
+"""
+import json
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# Response and tool data use the same patterns, so what is extracted is what can be matched.
+# No capturing groups: the rule engine reports findall() results as whole matches. Each pattern
+# starts with a character class, with a lookbehind where \b would go, so the regex engine can skip
+# straight to candidate characters instead of trying every position.
+PHONE_PATTERN = r'[+0](?:(?<=\+)44\s?(?:\(0\)\s?)?|(?<=0)(?<!\w0))\d{2,4}[\s-]?\d{3,4}[\s-]?\d{3,4}\b'
+POSTCODE_PATTERN = r'[A-Z](?<!\w[A-Z])[A-Z]?\d[A-Z\d]?\s?\d[A-Z]{2}\b'
+AMOUNT_PATTERN = r'£\s?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{1,2})?'
+# One to three capitalised words before 'Branch'; a leading "The"/"Visit"/... is dropped by normalize_branch_name
+BRANCH_NAME_PATTERN = r'[A-Z](?<!\w[A-Z])[a-z]+ (?:[A-Z][a-z]+ ){0,2}Branch\b'
+_BRANCH_NAME_PREFIXES = frozenset(['a', 'an', 'any', 'at', 'our', 'the', 'this', 'that', 'your', 'nearest', 'local',
+                                   'visit', 'each', 'every', 'other', 'another', 'same', 'closest', 'which', 'one'])
+# A branch name made only of these words does not identify a branch ('The Main Branch', 'Each Branch')
+_GENERIC_BRANCH_WORDS = _BRANCH_NAME_PREFIXES | frozenset(['branch', 'branches', 'main', 'central', 'centre', 'center',
+                                                           'city', 'town', 'high', 'street', 'new', 'big', 'head',
+                                                           'office', 'nearby', 'preferred', 'usual', 'home'])
+
+_PHONE_RE = re.compile(PHONE_PATTERN)
+_POSTCODE_RE = re.compile(POSTCODE_PATTERN)
+_AMOUNT_RE = re.compile(AMOUNT_PATTERN)
+
+DOCUMENTS_KEY = 'documents_required'
+BRANCHES_KEY = 'branches'
+
+# Distinct tool output documents whose facts are kept
+DOCUMENT_CACHE_SIZE = 256
+
+
+def normalize_phone(text: str) -> str:
+    """UK number in E.164 form; unrecognised prefixes are returned as bare digits."""
+    digits = re.sub(r'\D', '', text)
+    if text.lstrip().startswith('+'):
+        # +44 (0)20 ... - the trunk 0 is not dialled from abroad
+        if digits.startswith('440'):
+            digits = '44' + digits[3:]
+        return '+' + digits
+    if digits.startswith('00'):
+        return '+' + digits[2:]
+    if digits.startswith('0'):
+        return '+44' + digits[1:]
+    return digits
+
+
+def normalize_postcode(text: str) -> str:
+    compact = re.sub(r'\s', '', text).upper()
+    return f"{compact[:-3]} {compact[-3:]}"
+
+
+def normalize_amount(text: str) -> Optional[str]:
+    try:
+        return str(Decimal(re.sub(r'[£,\s]', '', text)).quantize(Decimal('0.01')))
+    except InvalidOperation:
+        return None
+
+
+def normalize_branch_name(text: str) -> str:
+    """'Visit The London City Branch' and 'London City' both -> 'london city'."""
+    words = text.lower().split()
+    while len(words) > 1 and words[0] in _BRANCH_NAME_PREFIXES:
+        words = words[1:]
+    if len(words) > 1 and words[-1] == 'branch':
+        words = words[:-1]
+    return ' '.join(words)
+
+
+def is_generic_branch_name(name: str) -> bool:
+    """True for a normalized name that identifies no particular branch ('main', 'branch', 'city centre')."""
+    return all(word in _GENERIC_BRANCH_WORDS for word in name.split())
+
+
+class BranchNames:
+    """
+    Normalized tool branch names, matched by word subset.
+
+    Usage:
+        names = BranchNames({'manchester central', 'london city'})
+        'manchester' in names          # True - every word is in a tool branch name
+        'main' in names                # True - generic, not a branch name at all
+        'oxford' in names              # False
+    """
+    __slots__ = ('_names', '_word_sets')
+
+    def __init__(self, names: Iterable[str]):
+        self._names = frozenset(names)
+        self._word_sets = [frozenset(name.split()) for name in self._names]
+
+    def __contains__(self, name: str) -> bool:
+        if name in self._names or is_generic_branch_name(name):
+            return True
+        words = set(name.split())
+        return any(words <= known for known in self._word_sets)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self):
+        return iter(self._names)
+
+
+class DocumentFacts(NamedTuple):
+    text: str                           # lower-cased, JSON re-serialized without ASCII escapes
+    phones: FrozenSet[str]
+    postcodes: FrozenSet[str]
+    amounts: FrozenSet[str]
+    documents: Tuple[str, ...]
+    branches: FrozenSet[str]
+    sections: FrozenSet[str]            # DOCUMENTS_KEY / BRANCHES_KEY if the document has those lists
+
+
+class _Sections:
+    """object_hook for json.loads: collects documents_required and branches lists as the decoder builds dicts."""
+
+    def __init__(self):
+        self.sections: Set[str] = set()
+        self.documents: List[str] = []
+        self.branches: Set[str] = set()
+
+    def __call__(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        documents = obj.get(DOCUMENTS_KEY)
+        if isinstance(documents, list):
+            self.sections.add(DOCUMENTS_KEY)
+            self.documents.extend(str(doc).lower() for doc in documents)
+        branches = obj.get(BRANCHES_KEY)
+        if isinstance(branches, list):
+            self.sections.add(BRANCHES_KEY)
+            self.branches.update(normalize_branch_name(str(branch['name'])) for branch in branches
+                                 if isinstance(branch, dict) and branch.get('name'))
+        return obj
+
+
+def extract_facts(value: str) -> DocumentFacts:
+    """Facts of one tool output string: a JSON document, or plain text if it doesn't parse."""
+    hook = _Sections()
+    text = value
+    if value.lstrip()[:1] in ('{', '['):
+        try:
+            text = json.dumps(json.loads(value, object_hook=hook), ensure_ascii=False)
+        except ValueError:
+            hook = _Sections()
+    return DocumentFacts(
+        text=text.lower(),
+        phones=frozenset(normalize_phone(phone) for phone in set(_PHONE_RE.findall(text))),
+        postcodes=frozenset(normalize_postcode(code) for code in set(_POSTCODE_RE.findall(text.upper()))),
+        amounts=frozenset(filter(None, (normalize_amount(amount) for amount in set(_AMOUNT_RE.findall(text))))),
+        documents=tuple(hook.documents),
+        branches=frozenset(hook.branches),
+        sections=frozenset(hook.sections)
+    )
+
+
+document_facts = lru_cache(maxsize=DOCUMENT_CACHE_SIZE)(extract_facts)
+
+
+class ToolFacts:
+    """
+    Normalized entity sets from one turn's tool results.
+
+    Usage:
+        facts = ToolFacts.from_tool_results({"tool_results": tool_results})
+        normalize_phone('+44 20 1234 5678') in facts.phones
+        'passport' in facts.documents
+        BRANCHES_KEY in facts.sections              # the tools returned a branches list
+    """
+
+    def __init__(self):
+        self.phones: Set[str] = set()
+        self.postcodes: Set[str] = set()
+        self.amounts: Set[str] = set()
+        self.branches: Set[str] = set()
+        self.sections: Set[str] = set()
+        self._documents: List[str] = []
+        self._text: List[str] = []
+
+    @classmethod
+    def from_tool_results(cls, tool_results: Any) -> 'ToolFacts':
+        facts = cls()
+        if tool_results:
+            facts._walk(tool_results)
+        return facts
+
+    @property
+    def documents(self) -> str:
+        """Lower-cased documents_required entries, one per line (a phrase is in it iff it is in one entry)."""
+        return '\n'.join(self._documents)
+
+    @property
+    def text(self) -> str:
+        """Lower-cased tool output, one document per line."""
+        return '\n'.join(self._text)
+
+    def stats(self) -> Dict[str, int]:
+        return {'phones': len(self.phones), 'postcodes': len(self.postcodes), 'amounts': len(self.amounts),
+                'documents': len(self._documents), 'branches': len(self.branches)}
+
+    def _walk(self, value: Any):
+        """Walk the (small) Converse wrapper; every string in it is a tool output document."""
+        if isinstance(value, dict):
+            # Already-decoded results can carry the lists directly
+            sections = _Sections()
+            sections(value)
+            self._documents.extend(sections.documents)
+            self.branches.update(sections.branches)
+            self.sections.update(sections.sections)
+            for item in value.values():
+                self._walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                self._walk(item)
+        elif isinstance(value, str):
+            # Tool output JSON repeats across turns; short ids and plain text aren't worth caching
+            self._add(document_facts(value) if value.lstrip()[:1] in ('{', '[') else extract_facts(value))
+
+    def _add(self, document: DocumentFacts):
+        self._text.append(document.text)
+        self.phones.update(document.phones)
+        self.postcodes.update(document.postcodes)
+        self.amounts.update(document.amounts)
+        self._documents.extend(document.documents)
+        self.branches.update(document.branches)
+        self.sections.update(document.sections)
@@ -0,0 +1,108 @@
+"""
+Per-invocation latency breakdown for the bedrock_mcp handler.
+
+Each handler stage (history fetch, routing, Bedrock calls, tools, validation, persistence, ...)
+is timed with a span; at the end of the invocation all stage timings, the turn path and the
+cold-start/cache flags are published as ONE EMF record, so percentiles per stage are available
+in CloudWatch without a PutMetricData call.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from emf import emit_emf
+
+
+def _camel(name: str) -> str:
+    return ''.join(part.capitalize() for part in name.split('_'))
+
+
+def stage_metric_name(stage: str) -> str:
+    """'bedrock_primary' -> 'BedrockPrimaryMs'."""
+    return _camel(stage) + 'Ms'
+
+
+class TurnTimer:
+    """
+    Stage timings and flags for one invocation.
+
+    Spans with the same name accumulate (e.g. routing checks before and after the model).
+    Only top-level spans count as attributed time; the rest of the wall time is reported as
+    UnattributedMs so untimed work doesn't go unnoticed.
+
+    Usage:
+        turn = TurnTimer(cold_start=True)
+        with turn.span('history_fetch'):
+            history = get_conversation_history_cached(session_id)
+        turn.flag('history_cache_hit', True)
+        turn.set_path('tool_use')
+        turn.emit(METRICS_NAMESPACE)
+    """
+
+    def __init__(self, cold_start: bool = False, clock=time.perf_counter):
+        self.cold_start = cold_start
+        self.path = 'unknown'
+        self.stages: Dict[str, float] = {}
+        self.flags: Dict[str, Any] = {}
+        self._clock = clock
+        self._started = clock()
+        self._depth = 0
+        self._attributed_ms = 0.0
+        self._emitted = False
+
+    @contextmanager
+    def span(self, stage: str):
+        started = self._clock()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            elapsed_ms = (self._clock() - started) * 1000
+            self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+            if self._depth == 0:
+                self._attributed_ms += elapsed_ms
+
+    def flag(self, name: str, value: Any = True):
+        self.flags[name] = value
+
+    def set_path(self, path: str):
+        """How the turn was answered (direct, tool_use, response_cache, handover_pre_model, ...)."""
+        self.path = path
+
+    def elapsed_ms(self) -> float:
+        return (self._clock() - self._started) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        total_ms = self.elapsed_ms()
+        return {
+            'path': self.path,
+            'cold_start': self.cold_start,
+            'total_ms': round(total_ms, 2),
+            'unattributed_ms': round(max(total_ms - self._attributed_ms, 0.0), 2),
+            'stages_ms': {stage: round(ms, 2) for stage, ms in self.stages.items()},
+            'flags': dict(self.flags)
+        }
+
+    def emit(self, namespace: str, properties: Optional[Dict[str, Any]] = None, stream=None) -> Dict[str, Any]:
+        """Publish the turn as one EMF record (dimension TurnPath). Subsequent calls are no-ops."""
+        summary = self.summary()
+        if self._emitted:
+            return summary
+        self._emitted = True
+
+        metrics = {
+            'TurnLatencyMs': (summary['total_ms'], 'Milliseconds'),
+            'UnattributedMs': (summary['unattributed_ms'], 'Milliseconds'),
+            'ColdStart': (1 if self.cold_start else 0, 'Count')
+        }
+        for stage, ms in summary['stages_ms'].items():
+            metrics[stage_metric_name(stage)] = (ms, 'Milliseconds')
+        for name, value in self.flags.items():
+            if isinstance(value, bool):
+                metrics[_camel(name)] = (int(value), 'Count')
+
+        record_properties = dict(properties or {})
+        record_properties['flags'] = summary['flags']
+        emit_emf(namespace, metrics, dimensions={'TurnPath': self.path}, properties=record_properties, stream=stream)
+        return summary
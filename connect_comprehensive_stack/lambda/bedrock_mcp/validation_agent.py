@@ -4,19 +4,85 @@ Validation Agent for detecting and managing hallucinations in Bedrock responses.
 import json
 import logging
 import os
-import re
+import threading
 import uuid
 import time
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Tuple
-import boto3
+
+from aws_clients import DynamoTable, get_client
+from deferred_persistence import DeferredWriter
+from kinesis_producer import KinesisProducer
+from metrics_sink import build_metrics_sink
+from tool_facts import BRANCHES_KEY, DOCUMENTS_KEY
+from validation_rules import (BRANCH_ACCURACY, CUSTOMER_ISOLATION, DOCUMENT_ACCURACY, DOMAIN_BOUNDARY, FABRICATED_DATA,
+                              SECURITY_VIOLATIONS, VALIDATION_RULES, ResponseScan, RuleEngine, ValidationContext)
 
 logger = logging.getLogger()
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'eu-west-2'))
-cloudwatch = boto3.client('cloudwatch', region_name=os.environ.get('AWS_REGION', 'eu-west-2'))
-kinesis = boto3.client('kinesis', region_name=os.environ.get('AWS_REGION', 'eu-west-2'))
+# AWS clients are created on first use (see aws_clients.py)
+AWS_REGION = os.environ.get('AWS_REGION', 'eu-west-2')
+cloudwatch = get_client('cloudwatch', region_name=AWS_REGION)
+kinesis = get_client('kinesis', region_name=AWS_REGION)
+
+# Validation metrics are aggregated in memory and published by a sink (see metrics_sink.py):
+# 'emf' (default) writes EMF log lines, 'put_metric_data' batches PutMetricData calls on a
+# background thread, as Values/Counts arrays or, with STATISTIC_SETS, as statistic sets.
+# EMF is written after every turn by default (a stdout write; nothing is held while the container
+# is idle); put_metric_data batches for 10s by default. Samples still buffered are published once
+# due at the start of the next invocation - without a SIGTERM (no extension registered) they are
+# lost if the container is reclaimed first.
+VALIDATION_METRICS_NAMESPACE = 'BedrockValidation'
+VALIDATION_METRICS_SINK = os.environ.get('VALIDATION_METRICS_SINK', 'emf').lower()
+VALIDATION_METRICS_FLUSH_SECONDS = float(os.environ.get(
+    'VALIDATION_METRICS_FLUSH_SECONDS', '10' if VALIDATION_METRICS_SINK == 'put_metric_data' else '0'))
+VALIDATION_METRICS_STATISTIC_SETS = os.environ.get('VALIDATION_METRICS_STATISTIC_SETS', 'false').lower() == 'true'
+
+# Data lake records are queued and sent with PutRecords on a background thread (see kinesis_producer.py).
+# FLUSH_SECONDS 0 sends at the end of every turn; a longer interval batches more records per call,
+# at the risk of losing the queue if the container is reclaimed without a shutdown signal.
+# AGGREGATE packs records into newline-delimited Kinesis records; COMPRESS gzips them and needs a
+# decompressing consumer in front of S3/Athena.
+DATALAKE_FLUSH_SECONDS = float(os.environ.get('DATALAKE_FLUSH_SECONDS', '0'))
+DATALAKE_MAX_QUEUE = int(os.environ.get('DATALAKE_MAX_QUEUE', '1000'))
+DATALAKE_AGGREGATE = os.environ.get('DATALAKE_AGGREGATE', 'false').lower() == 'true'
+DATALAKE_COMPRESS = os.environ.get('DATALAKE_COMPRESS', 'false').lower() == 'true'
+
+# Telemetry side-effects of a validated turn (hallucination log, metrics, data lake record) run
+# concurrently on a shared background pool while the verdict is returned; the handler joins them
+# at the start of the next invocation (join_telemetry). Failures are counted, not logged, and published as
+# the TelemetryFailures metric. VALIDATION_TELEMETRY_ASYNC=false runs them inline.
+VALIDATION_TELEMETRY_ASYNC = os.environ.get('VALIDATION_TELEMETRY_ASYNC', 'true').lower() == 'true'
+VALIDATION_TELEMETRY_WORKERS = int(os.environ.get('VALIDATION_TELEMETRY_WORKERS', '3'))
+VALIDATION_TELEMETRY_MAX_PENDING = int(os.environ.get('VALIDATION_TELEMETRY_MAX_PENDING', '50'))
+
+# Checks in evaluation order: confidence multiplier applied when the check fails
+CHECK_PENALTIES = {
+    FABRICATED_DATA: 0.5,
+    DOMAIN_BOUNDARY: 0.7,
+    SECURITY_VIOLATIONS: 0.1,  # Severe penalty for security violations
+    CUSTOMER_ISOLATION: 0.1,  # Severe penalty for data isolation violations
+    DOCUMENT_ACCURACY: 0.6,
+    BRANCH_ACCURACY: 0.6
+}
+# Failures logged at INFO, with their label
+LOGGED_CHECKS = {
+    FABRICATED_DATA: 'Fabricated data',
+    DOMAIN_BOUNDARY: 'Domain boundary',
+    SECURITY_VIOLATIONS: 'Security violations',
+    CUSTOMER_ISOLATION: 'Customer isolation'
+}
+SECURITY_VIOLATION_TYPES = [SECURITY_VIOLATIONS, CUSTOMER_ISOLATION]
+
+# Rules are compiled once per container and shared by every ValidationAgent
+_RULE_ENGINE = None
+
+
+def get_rule_engine() -> RuleEngine:
+    global _RULE_ENGINE
+    if _RULE_ENGINE is None:
+        _RULE_ENGINE = RuleEngine(VALIDATION_RULES)
+    return _RULE_ENGINE
 
 
 class ValidationAgent:
@@ -26,8 +92,30 @@ class ValidationAgent:
         """Initialize the validation agent."""
         self.enabled = os.environ.get('ENABLE_HALLUCINATION_DETECTION', 'true').lower() == 'true'
         self.table_name = os.environ.get('HALLUCINATION_TABLE_NAME', '')
-        self.table = dynamodb.Table(self.table_name) if self.table_name else None
+        self.table = DynamoTable(self.table_name, get_client('dynamodb', region_name=AWS_REGION)) if self.table_name else None
         self.stream_name = os.environ.get('AI_INSIGHTS_STREAM_NAME')
+        self.datalake = KinesisProducer(
+            kinesis, self.stream_name,
+            flush_interval_seconds=DATALAKE_FLUSH_SECONDS,
+            max_queue=DATALAKE_MAX_QUEUE,
+            aggregate=DATALAKE_AGGREGATE,
+            compress=DATALAKE_COMPRESS
+        ) if self.stream_name else None
+        self.metrics = build_metrics_sink(
+            VALIDATION_METRICS_SINK, VALIDATION_METRICS_NAMESPACE, cloudwatch,
+            flush_interval_seconds=VALIDATION_METRICS_FLUSH_SECONDS,
+            statistic_sets=VALIDATION_METRICS_STATISTIC_SETS
+        )
+        self.rules = get_rule_engine()
+        self.telemetry = DeferredWriter(
+            max_workers=VALIDATION_TELEMETRY_WORKERS,
+            max_pending=VALIDATION_TELEMETRY_MAX_PENDING,
+            name='validation-telemetry',
+            enabled=VALIDATION_TELEMETRY_ASYNC,
+            log_failures=False
+        )
+        self._reported_failures = 0
+        self._failures_lock = threading.Lock()
         
         # Allowed domain topics
         self.allowed_topics = [
@@ -47,65 +135,80 @@ class ValidationAgent:
         if not self.enabled:
             return (True, {"validation_enabled": False})
         
+        is_valid, validation_details = self.evaluate(user_query, tool_results, model_response)
+        
+        # Calculate latency (the checks; telemetry below runs in the background)
+        end_time = time.time()
+        latency_ms = int((end_time - start_time) * 1000)
+        validation_details['latency_ms'] = latency_ms
+
+        # Log if hallucination detected
+        if not is_valid or validation_details["severity"] != "none":
+            self.telemetry.submit(self.log_hallucination, user_query, tool_results, model_response,
+                                  validation_details, session_id)
+
+        # Publish metrics
+        self.telemetry.submit(self.publish_metrics, validation_details)
+        
+        # Log to Data Lake
+        self.telemetry.submit(self.log_to_datalake, user_query, model_response, validation_details, session_id)
+        
+        return (is_valid, validation_details)
+
+    def join_telemetry(self, timeout: float = None) -> int:
+        """
+        Wait for this invocation's telemetry, then publish the metrics and send the data lake records
+        that are due, all within one timeout. Returns the number of telemetry tasks still running.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        # The three telemetry calls run in parallel, so this waits for the slowest, not their sum
+        pending = self.telemetry.drain(remaining()) if self.telemetry.pending else 0
+        self.metrics.flush_if_due()
+        self.metrics.wait(remaining())
+        if self.datalake:
+            # Due records are sent before the sandbox freezes rather than waiting for a SIGTERM
+            # that only arrives when an extension is registered
+            self.datalake.drain(remaining(), due_only=True)
+        return pending
+    
+    def evaluate(self, user_query: str, tool_results: Dict[str, Any], model_response: str) -> Tuple[bool, Dict[str, Any]]:
+        """Run all checks (no logging, metrics or I/O). The response is scanned and the tool results parsed once."""
         validation_details = {
             "checks_performed": [],
             "issues_found": [],
             "confidence_score": 1.0,
             "severity": "none"
         }
-        
-        # Check for fabricated data
-        fabricated_check = self.check_fabricated_data(tool_results, model_response)
-        validation_details["checks_performed"].append("fabricated_data")
-        if not fabricated_check["passed"]:
-            logger.info(f"Fabricated data check FAILED: {fabricated_check['details']}")
-            validation_details["issues_found"].append(fabricated_check)
-            validation_details["confidence_score"] *= 0.5
-        
-        # Check domain boundaries
-        domain_check = self.check_domain_boundaries(model_response)
-        validation_details["checks_performed"].append("domain_boundary")
-        if not domain_check["passed"]:
-            logger.info(f"Domain boundary check FAILED: {domain_check['details']}")
-            validation_details["issues_found"].append(domain_check)
-            validation_details["confidence_score"] *= 0.7
-        
-        # Check for security violations (internal system disclosure)
-        security_check = self.check_security_violations(model_response)
-        validation_details["checks_performed"].append("security_violations")
-        if not security_check["passed"]:
-            logger.info(f"Security violations check FAILED: {security_check['details']}")
-            validation_details["issues_found"].append(security_check)
-            validation_details["confidence_score"] *= 0.1  # Severe penalty for security violations
-        
-        # Check for customer data isolation violations
-        isolation_check = self.check_customer_isolation(user_query, model_response)
-        validation_details["checks_performed"].append("customer_isolation")
-        if not isolation_check["passed"]:
-            logger.info(f"Customer isolation check FAILED: {isolation_check['details']}")
-            validation_details["issues_found"].append(isolation_check)
-            validation_details["confidence_score"] *= 0.1  # Severe penalty for data isolation violations
-        
-        # Check document accuracy if tool results contain documents
-        if tool_results and 'documents_required' in str(tool_results):
-            doc_check = self.check_document_accuracy(tool_results, model_response)
-            validation_details["checks_performed"].append("document_accuracy")
-            if not doc_check["passed"]:
-                validation_details["issues_found"].append(doc_check)
-                validation_details["confidence_score"] *= 0.6
-        
-        # Check branch accuracy if tool results contain branch info
-        if tool_results and 'branches' in str(tool_results):
-            branch_check = self.check_branch_accuracy(tool_results, model_response)
-            validation_details["checks_performed"].append("branch_accuracy")
-            if not branch_check["passed"]:
-                validation_details["issues_found"].append(branch_check)
-                validation_details["confidence_score"] *= 0.6
+        scan = self.rules.scan(model_response)
+        context = ValidationContext(user_query, tool_results)
+        
+        checks = [
+            self.check_fabricated_data(tool_results, model_response, scan, context),
+            self.check_domain_boundaries(model_response, scan, context),
+            self.check_security_violations(model_response, scan, context),
+            self.check_customer_isolation(user_query, model_response, scan, context)
+        ]
+        # Document/branch accuracy only apply when the tool results carry documents/branches
+        if tool_results and DOCUMENTS_KEY in context.facts.sections:
+            checks.append(self.check_document_accuracy(tool_results, model_response, scan, context))
+        if tool_results and BRANCHES_KEY in context.facts.sections:
+            checks.append(self.check_branch_accuracy(tool_results, model_response, scan, context))
+        
+        for check in checks:
+            validation_details["checks_performed"].append(check["type"])
+            if not check["passed"]:
+                if check["type"] in LOGGED_CHECKS:
+                    logger.info(f"{LOGGED_CHECKS[check['type']]} check FAILED: {check['details']}")
+                validation_details["issues_found"].append(check)
+                validation_details["confidence_score"] *= CHECK_PENALTIES[check["type"]]
         
         # Determine severity - security violations are always critical
-        security_violation_types = ["security_violations", "customer_isolation"]
         has_security_violation = any(
-            issue.get("type") in security_violation_types 
+            issue.get("type") in SECURITY_VIOLATION_TYPES
             for issue in validation_details["issues_found"]
         )
         
@@ -129,282 +232,63 @@ class ValidationAgent:
             validation_details["severity"] = "low"
             is_valid = True  # Allow but log
         
-        # Log if hallucination detected
-        if not is_valid or validation_details["severity"] != "none":
-            self.log_hallucination(
-                user_query=user_query,
-                tool_results=tool_results,
-                model_response=model_response,
-                validation_details=validation_details,
-                session_id=session_id
-            )
-        
-        # Calculate latency
-        end_time = time.time()
-        latency_ms = int((end_time - start_time) * 1000)
-        validation_details['latency_ms'] = latency_ms
-
-        # Publish metrics
-        self.publish_metrics(validation_details)
-        
-        # Log to Data Lake
-        self.log_to_datalake(user_query, model_response, validation_details, session_id)
-        
         return (is_valid, validation_details)
     
-    def check_fabricated_data(self, tool_results: Dict[str, Any], model_response: str) -> Dict[str, Any]:
-        """Detect information not present in tool results."""
-        if not tool_results:
-            return {"passed": True, "type": "fabricated_data"}
-        
-        # Convert tool results to string for searching
-        tool_data_str = json.dumps(tool_results).lower()
-        
-        # Look for specific claims in the response
-        fabricated_indicators = []
-        
-        # Check for specific document requirements mentioned in response but not in tool data
-        doc_patterns = [
-            r'proof of income', r'employment letter', r'tax returns', r'credit check',
-            r'reference letter', r'guarantor', r'co-signer'
-        ]
-        
-        for pattern in doc_patterns:
-            if re.search(pattern, model_response.lower()) and pattern not in tool_data_str:
-                fabricated_indicators.append(f"Mentioned '{pattern}' not in tool results")
-        
-        # Check for specific fees mentioned
-        fee_patterns = [r'\£\d+', r'fee of', r'charge of', r'cost of']
-        response_fees = []
-        for pattern in fee_patterns:
-            matches = re.findall(pattern, model_response.lower())
-            response_fees.extend(matches)
-        
-        # Verify fees are in tool data
-        for fee in response_fees:
-            if fee not in tool_data_str and 'fee' in model_response.lower():
-                fabricated_indicators.append(f"Mentioned fee '{fee}' not in tool results")
-        
-        passed = len(fabricated_indicators) == 0
+    def _run_check(self, check: str, model_response: str, scan: ResponseScan, context: ValidationContext,
+                   user_query: str = '', tool_results: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Findings of one check; scan/context are built here when a check is called on its own."""
+        scan = scan or self.rules.scan(model_response)
+        context = context or ValidationContext(user_query, tool_results or {})
+        details = self.rules.findings(check, scan, context)
+        passed = len(details) == 0
         return {
             "passed": passed,
-            "type": "fabricated_data",
-            "details": fabricated_indicators if not passed else []
+            "type": check,
+            "details": details if not passed else []
         }
     
-    def check_domain_boundaries(self, model_response: str) -> Dict[str, Any]:
+    def check_fabricated_data(self, tool_results: Dict[str, Any], model_response: str,
+                              scan: ResponseScan = None, context: ValidationContext = None) -> Dict[str, Any]:
+        """Detect information not present in tool results."""
+        if not tool_results:
+            return {"passed": True, "type": FABRICATED_DATA}
+        return self._run_check(FABRICATED_DATA, model_response, scan, context, tool_results=tool_results)
+    
+    def check_domain_boundaries(self, model_response: str, scan: ResponseScan = None,
+                                context: ValidationContext = None) -> Dict[str, Any]:
         """Ensure response stays within banking service domain."""
-        response_lower = model_response.lower()
-        
-        # Topics that are out of scope - use multi-word phrases to avoid false positives
-        # e.g., "credit card application" not just "card"
-        off_topic_keywords = [
-            'mortgage application', 'mortgage advice', 'apply for a mortgage',
-            'loan application', 'personal loan', 'business loan',
-            'credit card application', 'apply for credit card', 'new credit card',
-            'investment advice', 'invest in stocks', 'stock market',
-            'insurance policy', 'insurance claim', 'life insurance',
-            'pension plan', 'retirement pension',
-            'cryptocurrency', 'bitcoin', 'ethereum',
-            'forex trading', 'currency trading', 'day trading'
-        ]
-        
-        off_topic_found = []
-        for keyword in off_topic_keywords:
-            if keyword in response_lower:
-                off_topic_found.append(keyword)
-        
-        passed = len(off_topic_found) == 0
-        return {
-            "passed": passed,
-            "type": "domain_boundary",
-            "details": off_topic_found if not passed else []
-        }
+        return self._run_check(DOMAIN_BOUNDARY, model_response, scan, context)
     
-    def check_security_violations(self, model_response: str) -> Dict[str, Any]:
+    def check_security_violations(self, model_response: str, scan: ResponseScan = None,
+                                  context: ValidationContext = None) -> Dict[str, Any]:
         """Check for disclosure of internal system information or technical details."""
-        response_lower = model_response.lower()
-        
-        # Multi-word phrases that specifically indicate internal system disclosure
-        internal_phrases = [
-            'system prompt', 'internal working', 'lambda function', 'bedrock model',
-            'aws service', 'tool definition', 'mcp server', 'validation agent',
-            'anthropic claude', 'api endpoint', 'dynamodb table', 'cloudwatch logs',
-            'terraform configuration', 'code implementation', 'python code',
-            'json schema', 'inference profile', 'system architecture',
-            'how i work', 'how i am configured', 'my instructions',
-            'my system prompt', 'my internal', 'my code', 'my architecture'
-        ]
-        
-        violations_found = []
-        
-        # Check for internal phrases (multi-word)
-        for phrase in internal_phrases:
-            if phrase in response_lower:
-                violations_found.append(f"Internal phrase: '{phrase}'")
-        
-        passed = len(violations_found) == 0
-        return {
-            "passed": passed,
-            "type": "security_violations",
-            "details": violations_found if not passed else []
-        }
+        return self._run_check(SECURITY_VIOLATIONS, model_response, scan, context)
     
-    def check_customer_isolation(self, user_query: str, model_response: str) -> Dict[str, Any]:
+    def check_customer_isolation(self, user_query: str, model_response: str, scan: ResponseScan = None,
+                                 context: ValidationContext = None) -> Dict[str, Any]:
         """Check for references to other customers or unauthorized data."""
-        response_lower = model_response.lower()
-        query_lower = user_query.lower()
-        
-        # Indicators of customer data leakage - use specific multi-word phrases
-        customer_leak_indicators = [
-            'other customer', 'another customer', 'previous customer', 'different customer',
-            'customer john', 'customer mary', 'customer smith', 
-            "mr. john", "mrs. smith", "ms. jones",  # Specific name references
-            'account number is', 'your account number is', 'their account number',
-            'sort code is', 'their sort code', 'balance is £',
-            'transaction history shows', 'recent transactions include',
-            'other account holder', 'different account holder', 
-            "someone else's account", 'another person account'
-        ]
-        
-        # Check if response mentions other customers or accounts
-        violations_found = []
-        for indicator in customer_leak_indicators:
-            if indicator in response_lower and indicator not in query_lower:
-                violations_found.append(f"Customer data reference: '{indicator}'")
-        
-        # Check for specific patterns that might indicate data leakage
-        import re
-        
-        # Account numbers (8 digits) - but not phone numbers or other common numbers
-        account_pattern = r'account number[:\s]+\d{8}\b'
-        if re.search(account_pattern, model_response.lower()):
-            violations_found.append("Potential account number disclosed")
-        
-        # Sort codes (XX-XX-XX format)
-        sort_code_pattern = r'sort code[:\s]+\d{2}-\d{2}-\d{2}\b'
-        if re.search(sort_code_pattern, model_response.lower()):
-            violations_found.append("Potential sort code disclosed")
-        
-        # Names that weren't in the user query
-        name_pattern = r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'
-        response_names = re.findall(name_pattern, model_response)
-        query_names = re.findall(name_pattern, user_query)
-        
-        # Whitelist of legitimate banking terms that look like names but aren't
-        banking_terms = [
-            'Account Opening', 'Open Account', 'Debit Card', 'Customer Service',
-            'Branch Opening', 'Digital Opening', 'Mobile Banking',
-            'National Insurance', 'Insurance Number', 'Your National', 'Photo Id',
-            'Government Issued', 'Proof Address', 'Initial Deposit',
-            'Business Hours', 'Working Days', 'Mobile App',
-            'Bank Transfer', 'Video Verification', 'Biometric Verification',
-            'Mobile Device', 'Physical Card', 'Instant Access',
-            'Digital Access', 'Mobile Number', 'Banking Specialist',
-            'Utility Bill', 'Bank Statement', 'Checking Account', 'Savings Account',
-            'Required Documents', 'Account Types', 'Student Account', 'Business Account',
-            'Online Banking', 'Mobile Banking', 'Digital Process', 'Branch Location',
-            'Application Form', 'Account Details', 'Debit Card Options',
-            'For Branch', 'For Digital', 'Compared To',
-            'Emma Thompson'  # Bot persona name
-        ]
-        
-        for name in response_names:
-            if name not in query_names and name not in banking_terms:
-                violations_found.append(f"Unauthorized name reference: '{name}'")
-        
-        passed = len(violations_found) == 0
-        return {
-            "passed": passed,
-            "type": "customer_isolation",
-            "details": violations_found if not passed else []
-        }
+        return self._run_check(CUSTOMER_ISOLATION, model_response, scan, context, user_query=user_query)
     
-    def check_document_accuracy(self, tool_results: Dict[str, Any], model_response: str) -> Dict[str, Any]:
+    def check_document_accuracy(self, tool_results: Dict[str, Any], model_response: str,
+                                scan: ResponseScan = None, context: ValidationContext = None) -> Dict[str, Any]:
         """Validate document requirements match tool data."""
         try:
-            # Extract documents from tool results
-            tool_data_str = json.dumps(tool_results)
-            tool_data = json.loads(tool_data_str) if isinstance(tool_data_str, str) else tool_results
-            
-            documents_in_tool = []
-            if 'documents_required' in str(tool_data):
-                # Try to extract the documents list
-                if isinstance(tool_data, dict) and 'documents_required' in tool_data:
-                    documents_in_tool = tool_data['documents_required']
-                elif isinstance(tool_data, str):
-                    # Parse JSON string
-                    parsed = json.loads(tool_data)
-                    if 'documents_required' in parsed:
-                        documents_in_tool = parsed['documents_required']
-            
-            if not documents_in_tool:
-                return {"passed": True, "type": "document_accuracy"}
-            
-            # Check if response mentions documents not in the tool results
-            response_lower = model_response.lower()
-            tool_docs_lower = [doc.lower() for doc in documents_in_tool]
-            
-            # Common document types to check
-            doc_types = [
-                'passport', 'driving licence', 'photo id', 'proof of address',
-                'utility bill', 'bank statement', 'national insurance',
-                'student id', 'acceptance letter', 'business registration'
-            ]
-            
-            mismatches = []
-            for doc_type in doc_types:
-                mentioned_in_response = doc_type in response_lower
-                in_tool_results = any(doc_type in tool_doc for tool_doc in tool_docs_lower)
-                
-                if mentioned_in_response and not in_tool_results:
-                    mismatches.append(f"'{doc_type}' mentioned but not in tool results")
-            
-            passed = len(mismatches) == 0
-            return {
-                "passed": passed,
-                "type": "document_accuracy",
-                "details": mismatches if not passed else []
-            }
+            context = context or ValidationContext('', tool_results)
+            if not context.tool_documents:
+                return {"passed": True, "type": DOCUMENT_ACCURACY}
+            return self._run_check(DOCUMENT_ACCURACY, model_response, scan, context)
         except Exception as e:
             logger.error(f"Error checking document accuracy: {str(e)}")
-            return {"passed": True, "type": "document_accuracy", "error": str(e)}
+            return {"passed": True, "type": DOCUMENT_ACCURACY, "error": str(e)}
     
-    def check_branch_accuracy(self, tool_results: Dict[str, Any], model_response: str) -> Dict[str, Any]:
+    def check_branch_accuracy(self, tool_results: Dict[str, Any], model_response: str,
+                              scan: ResponseScan = None, context: ValidationContext = None) -> Dict[str, Any]:
         """Validate branch information matches tool data."""
         try:
-            # Extract branch info from tool results
-            tool_data_str = json.dumps(tool_results)
-            
-            # Check if response mentions specific branch details not in tool results
-            response_lower = model_response.lower()
-            
-            # Look for phone numbers, addresses, hours
-            phone_pattern = r'\d{3,4}\s?\d{3,4}\s?\d{4}'
-            phones_in_response = re.findall(phone_pattern, model_response)
-            
-            mismatches = []
-            for phone in phones_in_response:
-                if phone not in tool_data_str:
-                    mismatches.append(f"Phone number '{phone}' not in tool results")
-            
-            # Check for specific street names or postcodes
-            postcode_pattern = r'[A-Z]{1,2}\d{1,2}\s?\d[A-Z]{2}'
-            postcodes_in_response = re.findall(postcode_pattern, model_response)
-            
-            for postcode in postcodes_in_response:
-                if postcode not in tool_data_str:
-                    mismatches.append(f"Postcode '{postcode}' not in tool results")
-            
-            passed = len(mismatches) == 0
-            return {
-                "passed": passed,
-                "type": "branch_accuracy",
-                "details": mismatches if not passed else []
-            }
+            return self._run_check(BRANCH_ACCURACY, model_response, scan, context, tool_results=tool_results)
         except Exception as e:
             logger.error(f"Error checking branch accuracy: {str(e)}")
-            return {"passed": True, "type": "branch_accuracy", "error": str(e)}
+            return {"passed": True, "type": BRANCH_ACCURACY, "error": str(e)}
     
     def log_hallucination(self, user_query: str, tool_results: Dict[str, Any],
                          model_response: str, validation_details: Dict[str, Any],
@@ -442,66 +326,58 @@ class ValidationAgent:
             logger.info(f"Logged hallucination: {log_id} - Type: {primary_type}, Severity: {validation_details.get('severity')}")
             
         except Exception as e:
-            logger.error(f"Error logging hallucination: {str(e)}")
+            # Counted by the telemetry pool (TelemetryFailures) rather than logged
+            logger.debug(f"Error logging hallucination: {str(e)}")
+            return False
     
     def publish_metrics(self, validation_details: Dict[str, Any]):
-        """Publish validation metrics to CloudWatch."""
+        """Record validation metrics on the metrics sink (published in aggregate, off the critical path)."""
         try:
-            namespace = 'BedrockValidation'
+            severity = validation_details.get('severity', 'unknown')
             
             # Hallucination detection rate
             hallucination_detected = 1 if validation_details.get('severity') != 'none' else 0
             
             # Security violation detection
-            security_violation_types = ["security_violations", "customer_isolation"]
             security_violation_detected = 1 if any(
-                issue.get("type") in security_violation_types 
+                issue.get("type") in SECURITY_VIOLATION_TYPES
                 for issue in validation_details.get("issues_found", [])
             ) else 0
             
             # Validation success rate
             validation_success = 1 if validation_details.get('severity') == 'none' else 0
             
-            # Prepare metric data
-            metric_data = [
-                {
-                    'MetricName': 'HallucinationDetectionRate',
-                    'Value': hallucination_detected,
-                    'Unit': 'Count',
-                    'Dimensions': [{'Name': 'Severity', 'Value': validation_details.get('severity', 'unknown')}]
-                },
-                {
-                    'MetricName': 'SecurityViolationDetectionRate',
-                    'Value': security_violation_detected,
-                    'Unit': 'Count'
-                },
-                {
-                    'MetricName': 'ValidationSuccessRate',
-                    'Value': validation_success,
-                    'Unit': 'Count'
-                },
-                {
-                    'MetricName': 'ValidationConfidenceScore',
-                    'Value': validation_details.get('confidence_score', 1.0),
-                    'Unit': 'None'
-                }
-            ]
+            self.metrics.record('HallucinationDetectionRate', hallucination_detected, 'Count', {'Severity': severity})
+            self.metrics.record('SecurityViolationDetectionRate', security_violation_detected, 'Count')
+            self.metrics.record('ValidationSuccessRate', validation_success, 'Count')
+            self.metrics.record('ValidationConfidenceScore', validation_details.get('confidence_score', 1.0), 'None')
             
             # Include Latency if available
             if 'latency_ms' in validation_details:
-                metric_data.append({
-                    'MetricName': 'ValidationLatency',
-                    'Value': validation_details['latency_ms'],
-                    'Unit': 'Milliseconds'
-                })
+                self.metrics.record('ValidationLatency', validation_details['latency_ms'], 'Milliseconds')
+
+            # Telemetry failures since the last turn (including earlier metric publications)
+            with self._failures_lock:
+                total = self.telemetry.failures
+                failures, self._reported_failures = total - self._reported_failures, total
+            if failures:
+                self.metrics.record('TelemetryFailures', failures, 'Count')
             
-            cloudwatch.put_metric_data(
-                Namespace=namespace,
-                MetricData=metric_data
-            )
+            self.metrics.flush_if_due()
             
         except Exception as e:
-            logger.error(f"Error publishing metrics: {str(e)}")
+            # Counted by the telemetry pool (TelemetryFailures) rather than logged
+            logger.debug(f"Error publishing metrics: {str(e)}")
+            return False
+
+    def shutdown(self, timeout: float = None):
+        """Finish telemetry, publish buffered metrics and send queued data lake records (runtime shutdown)."""
+        self.telemetry.shutdown(timeout)
+        self.metrics.shutdown(timeout)
+        if self.datalake:
+            pending = self.datalake.drain(timeout)
+            if pending:
+                logger.warning(f"[KINESIS] {pending} data lake records not sent at shutdown")
 
     def log_to_datalake(self, user_query: str, model_response: str, 
                        validation_details: Dict[str, Any], session_id: str = None):
@@ -524,10 +400,10 @@ class ValidationAgent:
                 'validation_details': json.dumps(validation_details)
             }
             
-            kinesis.put_record(
-                StreamName=self.stream_name,
-                Data=json.dumps(record),
-                PartitionKey=session_id or str(uuid.uuid4())
-            )
+            # Newline-terminated so the objects Firehose writes to S3 are JSON Lines
+            self.datalake.put(json.dumps(record) + '\n', session_id or str(uuid.uuid4()))
+            self.datalake.flush_if_due()
         except Exception as e:
-            logger.error(f"Error logging to data lake: {str(e)}")
+            # Counted by the telemetry pool (TelemetryFailures) rather than logged
+            logger.debug(f"Error logging to data lake: {str(e)}")
+            return False
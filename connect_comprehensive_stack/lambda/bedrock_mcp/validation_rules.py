@@ -0,0 +1,322 @@
+"""
+Declarative rule set for the ValidationAgent checks.
+
+Every check is a list of rules: phrase rules (substrings of the lower-cased response) and pattern
+rules (regexes). The rule set is compiled once: all phrases of all checks (plus the literal
+triggers of pattern rules) go into one PhraseScanner, so the response is lower-cased and scanned
+once per turn, and a pattern whose trigger wasn't found is never run. Findings are produced in rule
+order, phrase order and match order, so the issue details are the same as the per-check
+substring/regex code this replaces.
+
+Context values used to suppress findings (the user query, the facts extracted from the tool
+results, ...) are computed lazily, once per validation, by ValidationContext. Entity rules (fees,
+phone numbers, postcodes, branch names) normalize each match and test it against the matching
+ToolFacts set instead of searching the serialized tool results.
+"""
+import re
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from tool_facts import (AMOUNT_PATTERN, BRANCH_NAME_PATTERN, PHONE_PATTERN, POSTCODE_PATTERN, BranchNames, ToolFacts,
+                        normalize_amount, normalize_branch_name, normalize_phone, normalize_postcode)
+
+# Trie keys that are never a character: end of a phrase, and the phrases passing through a node
+_END = None
+_BELOW = ''
+
+
+class PhraseScanner:
+    """
+    Finds which of a set of phrases occur as substrings of a text, in one regex pass.
+
+    The phrases are compiled into a single trie-shaped regex. finditer returns the longest phrase
+    at each leftmost position without overlaps; the phrases hidden by that (contained in the match,
+    or starting inside it and running past its end) are recovered from tables built at compile time,
+    so the result equals {p for p in phrases if p in text}.
+
+    Usage:
+        scanner = PhraseScanner(['system prompt', 'my system prompt', 'bitcoin'])
+        scanner.scan('here is my system prompt')   # {'system prompt', 'my system prompt'}
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = sorted({p for p in phrases if p})
+        trie: Dict = {}
+        for phrase in self.phrases:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+                node.setdefault(_BELOW, []).append(phrase)
+            node[_END] = True
+        self._regex = re.compile(self._trie_regex(trie)) if self.phrases else None
+
+        # Phrases that occur whenever `a` matches, and (offset, phrase) pairs that may start inside `a`
+        self._contained = {a: tuple(b for b in self.phrases if b in a) for a in self.phrases}
+        self._overlaps = {a: tuple(self._overlapping(trie, a)) for a in self.phrases}
+
+    def scan(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if self._regex is None:
+            return found
+        for match in self._regex.finditer(text):
+            phrase = match.group()
+            found.update(self._contained[phrase])
+            start = match.start()
+            for offset, other in self._overlaps[phrase]:
+                if text.startswith(other, start + offset):
+                    found.add(other)
+        return found
+
+    @staticmethod
+    def _overlapping(trie: Dict, phrase: str):
+        """(offset, other) for every phrase that starts inside `phrase` and runs past its end."""
+        for offset in range(1, len(phrase)):
+            node = trie
+            for ch in phrase[offset:]:
+                node = node.get(ch)
+                if node is None:
+                    break
+            else:
+                tail = len(phrase) - offset
+                for other in node[_BELOW]:
+                    if len(other) > tail:
+                        yield offset, other
+
+    @classmethod
+    def _trie_regex(cls, node: Dict) -> str:
+        branches = [re.escape(ch) + cls._trie_regex(child) for ch, child in sorted(
+            (k, v) for k, v in node.items() if isinstance(k, str) and k)]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional suffix: the longest phrase at a position wins
+        return f'(?:{body})?' if _END in node else body
+
+
+class Rule(NamedTuple):
+    check: str                          # issue type the findings belong to
+    message: str                        # detail template; {0} is the matched phrase or text
+    phrases: Tuple[str, ...] = ()       # lower-case substrings (reported in this order)
+    count: bool = False                 # phrases: one finding per (non-overlapping) occurrence
+    pattern: Optional[str] = None       # regex, used when there are no phrases
+    trigger: Optional[str] = None       # lower-case literal every match of the pattern contains
+    case_sensitive: bool = False        # run the pattern on the original response, not the lower-cased one
+    every_match: bool = True            # False: one finding if the pattern matches anywhere
+    unless_in: Optional[str] = None     # ValidationContext attribute; skip matches found in it
+    normalize: Optional[Callable[[str], Any]] = None  # applied to a match before the unless_in lookup
+    allow: FrozenSet[str] = frozenset() # matches that are never findings
+    requires: Optional[str] = None      # substring the lower-cased response must also contain
+
+
+class ResponseScan(NamedTuple):
+    text: str
+    lower: str
+    phrases: Set[str]
+
+
+# Capitalised word pairs: candidate personal names in customer-isolation checks
+NAME_PATTERN = r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'
+_NAME_RE = re.compile(NAME_PATTERN)
+
+
+class ValidationContext:
+    """Per-validation values the rules compare against, each computed on first use."""
+
+    def __init__(self, user_query: str, tool_results: Dict[str, Any]):
+        self.user_query = user_query
+        self.tool_results = tool_results
+        self._cache: Dict[str, Any] = {}
+
+    def _cached(self, key: str, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def query_lower(self) -> str:
+        return self._cached('query_lower', self.user_query.lower)
+
+    @property
+    def query_names(self) -> List[str]:
+        return self._cached('query_names', lambda: _NAME_RE.findall(self.user_query))
+
+    @property
+    def facts(self) -> ToolFacts:
+        """Tool results parsed once per turn and shared by every check."""
+        return self._cached('facts', lambda: ToolFacts.from_tool_results(self.tool_results))
+
+    @property
+    def tool_text(self) -> str:
+        return self.facts.text
+
+    @property
+    def tool_documents(self) -> str:
+        return self._cached('tool_documents', lambda: self.facts.documents)
+
+    @property
+    def tool_amounts(self) -> Set[str]:
+        return self.facts.amounts
+
+    @property
+    def tool_phones(self) -> Set[str]:
+        return self.facts.phones
+
+    @property
+    def tool_postcodes(self) -> Set[str]:
+        return self.facts.postcodes
+
+    @property
+    def tool_branches(self) -> BranchNames:
+        return self._cached('tool_branches', lambda: BranchNames(self.facts.branches))
+
+
+class RuleEngine:
+    """
+    Compiled rule set.
+
+    Usage:
+        engine = RuleEngine(VALIDATION_RULES)
+        scan = engine.scan(model_response)
+        details = engine.findings('domain_boundary', scan, ValidationContext(user_query, tool_results))
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: Dict[str, List[Rule]] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        phrases = set()
+        for rule in rules:
+            self.rules.setdefault(rule.check, []).append(rule)
+            phrases.update(rule.phrases)
+            if rule.trigger:
+                phrases.add(rule.trigger)
+            if rule.pattern and rule.pattern not in self._patterns:
+                self._patterns[rule.pattern] = re.compile(rule.pattern)
+        self.scanner = PhraseScanner(phrases)
+
+    def scan(self, model_response: str) -> ResponseScan:
+        lower = model_response.lower()
+        return ResponseScan(model_response, lower, self.scanner.scan(lower))
+
+    def findings(self, check: str, scan: ResponseScan, context: ValidationContext) -> List[str]:
+        details = []
+        for rule in self.rules.get(check, ()):
+            if rule.requires and rule.requires not in scan.lower:
+                continue
+            if rule.phrases:
+                matches = [phrase for phrase in rule.phrases if phrase in scan.phrases]
+                if rule.count:
+                    matches = [phrase for phrase in matches for _ in range(scan.lower.count(phrase))]
+            elif rule.trigger and rule.trigger not in scan.phrases:
+                continue
+            else:
+                regex = self._patterns[rule.pattern]
+                text = scan.text if rule.case_sensitive else scan.lower
+                if rule.every_match:
+                    matches = regex.findall(text)
+                else:
+                    match = regex.search(text)
+                    matches = [match.group()] if match else []
+            if not matches:
+                continue
+            exclude = getattr(context, rule.unless_in) if rule.unless_in else ()
+            for match in matches:
+                key = rule.normalize(match) if rule.normalize else match
+                if key in exclude or match in rule.allow:
+                    continue
+                details.append(rule.message.format(match))
+        return details
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------------------------------------------------
+
+FABRICATED_DATA = 'fabricated_data'
+DOMAIN_BOUNDARY = 'domain_boundary'
+SECURITY_VIOLATIONS = 'security_violations'
+CUSTOMER_ISOLATION = 'customer_isolation'
+DOCUMENT_ACCURACY = 'document_accuracy'
+BRANCH_ACCURACY = 'branch_accuracy'
+
+# Legitimate banking terms (and the persona's name) that look like personal names
+BANKING_TERMS = frozenset([
+    'Account Opening', 'Open Account', 'Debit Card', 'Customer Service',
+    'Branch Opening', 'Digital Opening', 'Mobile Banking',
+    'National Insurance', 'Insurance Number', 'Your National', 'Photo Id',
+    'Government Issued', 'Proof Address', 'Initial Deposit',
+    'Business Hours', 'Working Days', 'Mobile App',
+    'Bank Transfer', 'Video Verification', 'Biometric Verification',
+    'Mobile Device', 'Physical Card', 'Instant Access',
+    'Digital Access', 'Mobile Number', 'Banking Specialist',
+    'Utility Bill', 'Bank Statement', 'Checking Account', 'Savings Account',
+    'Required Documents', 'Account Types', 'Student Account', 'Business Account',
+    'Online Banking', 'Digital Process', 'Branch Location',
+    'Application Form', 'Account Details', 'Debit Card Options',
+    'For Branch', 'For Digital', 'Compared To',
+    'Emma Thompson'
+])
+
+_FEE_MESSAGE = "Mentioned fee '{0}' not in tool results"
+
+VALIDATION_RULES = [
+    # Requirements and fees the response mentions but the tool results don't
+    Rule(FABRICATED_DATA, "Mentioned '{0}' not in tool results", unless_in='tool_text', phrases=(
+        'proof of income', 'employment letter', 'tax returns', 'credit check',
+        'reference letter', 'guarantor', 'co-signer')),
+    Rule(FABRICATED_DATA, _FEE_MESSAGE, pattern=AMOUNT_PATTERN, trigger='£', unless_in='tool_amounts',
+         normalize=normalize_amount, requires='fee'),
+    Rule(FABRICATED_DATA, _FEE_MESSAGE, phrases=('fee of', 'charge of', 'cost of'), count=True,
+         unless_in='tool_text', requires='fee'),
+
+    # Out-of-scope products - multi-word phrases to avoid false positives
+    # (e.g. "credit card application", not just "card")
+    Rule(DOMAIN_BOUNDARY, "{0}", phrases=(
+        'mortgage application', 'mortgage advice', 'apply for a mortgage',
+        'loan application', 'personal loan', 'business loan',
+        'credit card application', 'apply for credit card', 'new credit card',
+        'investment advice', 'invest in stocks', 'stock market',
+        'insurance policy', 'insurance claim', 'life insurance',
+        'pension plan', 'retirement pension',
+        'cryptocurrency', 'bitcoin', 'ethereum',
+        'forex trading', 'currency trading', 'day trading')),
+
+    # Disclosure of internal system information or technical details
+    Rule(SECURITY_VIOLATIONS, "Internal phrase: '{0}'", phrases=(
+        'system prompt', 'internal working', 'lambda function', 'bedrock model',
+        'aws service', 'tool definition', 'mcp server', 'validation agent',
+        'anthropic claude', 'api endpoint', 'dynamodb table', 'cloudwatch logs',
+        'terraform configuration', 'code implementation', 'python code',
+        'json schema', 'inference profile', 'system architecture',
+        'how i work', 'how i am configured', 'my instructions',
+        'my system prompt', 'my internal', 'my code', 'my architecture')),
+
+    # References to other customers or their data (unless the caller said it first)
+    Rule(CUSTOMER_ISOLATION, "Customer data reference: '{0}'", unless_in='query_lower', phrases=(
+        'other customer', 'another customer', 'previous customer', 'different customer',
+        'customer john', 'customer mary', 'customer smith',
+        'mr. john', 'mrs. smith', 'ms. jones',
+        'account number is', 'your account number is', 'their account number',
+        'sort code is', 'their sort code', 'balance is £',
+        'transaction history shows', 'recent transactions include',
+        'other account holder', 'different account holder',
+        "someone else's account", 'another person account')),
+    Rule(CUSTOMER_ISOLATION, "Potential account number disclosed", pattern=r'account number[:\s]+\d{8}\b',
+         trigger='account number', every_match=False),
+    Rule(CUSTOMER_ISOLATION, "Potential sort code disclosed", pattern=r'sort code[:\s]+\d{2}-\d{2}-\d{2}\b',
+         trigger='sort code', every_match=False),
+    Rule(CUSTOMER_ISOLATION, "Unauthorized name reference: '{0}'", pattern=NAME_PATTERN, case_sensitive=True,
+         unless_in='query_names', allow=BANKING_TERMS),
+
+    # Documents the response lists that the tool's documents_required doesn't
+    Rule(DOCUMENT_ACCURACY, "'{0}' mentioned but not in tool results", unless_in='tool_documents', phrases=(
+        'passport', 'driving licence', 'photo id', 'proof of address',
+        'utility bill', 'bank statement', 'national insurance',
+        'student id', 'acceptance letter', 'business registration')),
+
+    # Branch phone numbers, postcodes and names that don't appear in the tool results
+    Rule(BRANCH_ACCURACY, "Phone number '{0}' not in tool results", pattern=PHONE_PATTERN,
+         unless_in='tool_phones', normalize=normalize_phone),
+    Rule(BRANCH_ACCURACY, "Postcode '{0}' not in tool results", pattern=POSTCODE_PATTERN,
+         case_sensitive=True, unless_in='tool_postcodes', normalize=normalize_postcode),
+    Rule(BRANCH_ACCURACY, "Branch '{0}' not in tool results", pattern=BRANCH_NAME_PATTERN,
+         case_sensitive=True, unless_in='tool_branches', normalize=normalize_branch_name),
+]
@@ -0,0 +1,80 @@
+"""
+Warmup invocations for keeping a pool of bedrock_mcp containers ready.
+
+A scheduled EventBridge rule sends {"warmup": true} (optionally "hold_ms") to the function. The
+handler recognises it before any Lex processing and runs a fixed list of warm-up steps - TLS
+connections to Bedrock and DynamoDB, tool catalogue, keyword matcher and prompt rendering -
+without reading or writing conversation state. Each step is timed and isolated, so a failing
+step is reported and the rest still run.
+
+To keep N containers warm, the rule invokes the function N times concurrently with a hold_ms of a
+few hundred milliseconds: each invocation keeps its container busy for that long, so the other
+pings cannot reuse it and land on (or create) separate containers.
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+WARMUP_EVENT_KEY = 'warmup'
+MAX_HOLD_MS = 1000
+
+
+def is_warmup_event(event: Any) -> bool:
+    """{"warmup": true} from a scheduled rule, or a bare EventBridge scheduled event."""
+    if not isinstance(event, dict):
+        return False
+    return event.get(WARMUP_EVENT_KEY) is True or event.get('detail-type') == 'Scheduled Event'
+
+
+class Warmup:
+    """
+    Named warm-up steps, run in order and timed individually.
+
+    Usage:
+        warmup = Warmup()
+        warmup.add('bedrock_connection', lambda: warm_connection(bedrock, ('Converse',)))
+        warmup.add('keyword_matcher', lambda: KEYWORDS.scan('speak to an agent'))
+        report = warmup.run(hold_ms=event.get('hold_ms', 0))
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        self._steps: List[Tuple[str, Callable[[], Any]]] = []
+        self._clock = clock
+        self._sleep = sleep
+        self.stats_counters = {'runs': 0, 'step_failures': 0}
+
+    def add(self, name: str, step: Callable[[], Any]):
+        self._steps.append((name, step))
+
+    def run(self, hold_ms: float = 0) -> Dict[str, Any]:
+        """Run every step; returns per-resource timings and the names of warmed/failed resources."""
+        started = self._clock()
+        resources: Dict[str, Dict[str, Any]] = {}
+        for name, step in self._steps:
+            step_started = self._clock()
+            try:
+                detail = step()
+                resources[name] = {'ok': True, 'ms': round((self._clock() - step_started) * 1000, 1)}
+                if isinstance(detail, dict):
+                    resources[name].update(detail)
+            except Exception as e:
+                self.stats_counters['step_failures'] += 1
+                resources[name] = {'ok': False, 'ms': round((self._clock() - step_started) * 1000, 1),
+                                   'error': f"{type(e).__name__}: {e}"}
+                logger.warning(f"[WARMUP] {name} failed: {str(e)}")
+        warm_ms = (self._clock() - started) * 1000
+
+        # Hold the container so concurrent pings spread across containers
+        remaining_ms = min(max(float(hold_ms or 0), 0.0), MAX_HOLD_MS) - warm_ms
+        if remaining_ms > 0:
+            self._sleep(remaining_ms / 1000)
+
+        self.stats_counters['runs'] += 1
+        return {
+            'warmed': [name for name, r in resources.items() if r['ok']],
+            'failed': [name for name, r in resources.items() if not r['ok']],
+            'warm_ms': round(warm_ms, 1),
+            'resources': resources
+        }
@@ -510,8 +510,8 @@ module "bedrock_guardrail" {
 # Build the Lambda deployment package with dependencies (FastMCP 2.0)
 resource "null_resource" "bedrock_mcp_build" {
   triggers = {
-    # Hash all Python files in the source directory to detect code changes
-    src_hash = sha256(join("", [for f in fileset("${path.module}/${var.bedrock_mcp_lambda.source_dir}", "*.py") : filesha256("${path.module}/${var.bedrock_mcp_lambda.source_dir}/${f}")]))
+    # Hash all Python and JSON data files in the source directory to detect code changes
+    src_hash = sha256(join("", [for f in fileset("${path.module}/${var.bedrock_mcp_lambda.source_dir}", "*.{py,json}") : filesha256("${path.module}/${var.bedrock_mcp_lambda.source_dir}/${f}")]))
     # Hash requirements.txt to detect dependency changes
     req_hash = filesha256("${path.module}/${var.bedrock_mcp_lambda.source_dir}/requirements.txt")
   }
@@ -699,6 +699,7 @@ module "bedrock_mcp_lambda" {
     # Hallucination Detection
     ENABLE_HALLUCINATION_DETECTION  = "true"
     HALLUCINATION_TABLE_NAME        = module.hallucination_logs_table.name
+    VALIDATION_METRICS_SINK         = "emf"
     
     # AI Reporting
     AI_INSIGHTS_STREAM_NAME         = module.kinesis_ai_reporting.name
@@ -706,6 +707,9 @@ module "bedrock_mcp_lambda" {
     # Conversation History
     CONVERSATION_HISTORY_TABLE_NAME = module.conversation_history_table.name
     
+    # Opening-question response cache (off in code unless enabled here)
+    RESPONSE_CACHE_ENABLED          = "true"
+    
     # Queue ARNs for Dynamic Routing
     QUEUE_ARN_GENERAL    = aws_connect_queue.queues["GeneralAgentQueue"].arn
     QUEUE_ARN_ACCOUNT    = aws_connect_queue.queues["AccountQueue"].arn